@@ -4,11 +4,16 @@ Resize multiple images from ZIP file to 224x224 pixels
 """
 
 import streamlit as st
+import json
 import os
 import time
 from datetime import datetime
 import shutil
-from utils.image_processing import process_bulk_resize, ImageProcessor
+import uuid
+from utils.image_processing import (process_bulk_resize, BufferReader, ImageProcessor, available_output_formats,
+                                    normalize_sizes, parse_color, parse_sizes, scan_archive)
+from utils.checkpoint import sweep
+from utils.jobs import JobManager, PreviewStore, Sweeper
 
 # Page configuration
 st.set_page_config(
@@ -70,45 +75,46 @@ def initialize_directories():
         os.makedirs(directory, exist_ok=True)
 
 
-def cleanup_old_files():
-    """Clean up old temporary files"""
+def cleanup_old_files(job_manager):
+    """Clean up old temporary files and finished jobs, keeping running and resumable jobs"""
     try:
-        # Clean uploads older than 1 hour
-        current_time = time.time()
-        for directory in ['uploads', 'outputs']:
-            if os.path.exists(directory):
-                for item in os.listdir(directory):
-                    item_path = os.path.join(directory, item)
-                    if os.path.isdir(item_path):
-                        # Check if directory is older than 1 hour
-                        if current_time - os.path.getctime(item_path) > 3600:
-                            shutil.rmtree(item_path)
+        return sweep(['uploads', 'outputs']) + job_manager.prune()
     except Exception as e:
-        st.warning(f"Warning: Could not clean old files: {str(e)}")
+        print(f"Warning: Could not clean old files: {str(e)}")
+        return 0
 
 
-def display_image_preview(image_paths, title="Preview Gambar"):
-    """Display image preview in grid layout"""
-    if not image_paths:
+# Thumbnails per page of the preview grid (two rows of four)
+PREVIEW_PAGE_SIZE = 8
+
+
+def display_image_preview(images, title="Preview Gambar", key="preview"):
+    """Display (name, thumbnail bytes) pairs in a paged grid; only the current page is sent"""
+    if not images:
         return
 
     st.subheader(title)
 
+    pages = -(-len(images) // PREVIEW_PAGE_SIZE)
+    page = 1
+    if pages > 1:
+        page = st.number_input(f"Halaman (1-{pages})", min_value=1, max_value=pages, value=1, step=1,
+                               key=f"{key}_page")
+    start = (page - 1) * PREVIEW_PAGE_SIZE
+    page_images = images[start:start + PREVIEW_PAGE_SIZE]
+
     # Create columns for image grid
-    cols = st.columns(min(len(image_paths), 4))
+    cols = st.columns(4)
 
-    for i, img_path in enumerate(image_paths[:4]):
-        if os.path.exists(img_path):
-            with cols[i % 4]:
-                try:
-                    st.image(img_path, caption=os.path.basename(
-                        img_path), use_container_width=True)
-                except Exception as e:
-                    st.error(
-                        f"Error displaying {os.path.basename(img_path)}: {str(e)}")
+    for i, (name, data) in enumerate(page_images):
+        with cols[i % 4]:
+            try:
+                st.image(data, caption=name, use_container_width=True)
+            except Exception as e:
+                st.error(
+                    f"Error displaying {name}: {str(e)}")
 
-    if len(image_paths) > 4:
-        st.info(f"Menampilkan 4 dari {len(image_paths)} gambar hasil resize")
+    st.caption(f"Menampilkan {start + 1}-{start + len(page_images)} dari {len(images)} preview")
 
 
 def display_processing_stats(result):
@@ -125,11 +131,358 @@ def display_processing_stats(result):
         st.metric("Gagal", result['failed'], delta=None if result['failed']
                   == 0 else f"-{result['failed']}")
 
+    cache_lookups = result.get('cache_hits', 0) + result.get('cache_misses', 0)
+    if cache_lookups:
+        col1, col2, col3 = st.columns(3)
+
+        with col1:
+            st.metric("Cache Hit", result['cache_hits'])
+
+        with col2:
+            st.metric("Cache Miss", result['cache_misses'])
+
+        with col3:
+            st.metric("Hit Rate", f"{result['cache_hits'] / cache_lookups:.0%}")
+
+
+def get_archive_scan(uploaded_file, processor):
+    """Header-only scan of the upload, kept in the session until the file or settings change"""
+    key = (uploaded_file.name, uploaded_file.size, json.dumps(processor.get_settings(), sort_keys=True))
+    cached = st.session_state.get('scan')
+    if cached is None or cached[0] != key:
+        with st.spinner("🔍 Memindai header gambar..."):
+            cached = (key, scan_archive(processor, BufferReader(uploaded_file.getvalue())))
+        st.session_state['scan'] = cached
+    return cached[1]
+
+
+def display_scan_summary(scan):
+    """Display the pre-scan of an upload: counts, estimate and details"""
+    st.subheader("🔍 Hasil Pindai Arsip")
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.metric("Jumlah Gambar", scan['valid'])
+
+    with col2:
+        st.metric("File Rusak", len(scan['corrupt']))
+
+    with col3:
+        estimate = scan['estimated_seconds']
+        st.metric("Estimasi Waktu", f"{estimate:.0f} detik" if estimate is not None else "-",
+                  help=f"Dengan {scan['recommended_workers']} worker, diukur dari beberapa gambar contoh")
+
+    with st.expander("Detail resolusi, mode dan format"):
+        col1, col2, col3 = st.columns(3)
+
+        with col1:
+            st.caption("Resolusi")
+            st.table({label: [count] for label, count in scan['resolutions'].items() if count})
+
+        with col2:
+            st.caption("Mode warna")
+            st.table({mode: [count] for mode, count in scan['modes'].items()})
+
+        with col3:
+            st.caption("Format")
+            st.table({name: [count] for name, count in scan['formats'].items()})
+
+        if scan['largest']:
+            width, height = scan['largest']['size']
+            st.text(f"Gambar terbesar: {width}x{height} ({scan['largest']['file']})")
+
+    if scan['corrupt']:
+        st.warning("⚠️ File berikut tidak bisa dibaca dan akan dilewati:\n\n" +
+                   "\n".join(f"- {item['file']}: {item['error']}" for item in scan['corrupt'][:20]))
+
+    if scan.get('skipped'):
+        st.warning("⚠️ Entri ZIP berikut dilewati (path tidak aman, ukuran tidak wajar atau bukan gambar):\n\n" +
+                   "\n".join(f"- {item['path']}: {item['reason']}" for item in scan['skipped'][:20]))
+
+
+# Server-wide admission budgets, shared by every session
+MAX_CONCURRENT_JOBS = 2
+SERVER_MEMORY_BUDGET = 2 * 1024 * 1024 * 1024
+SERVER_DISK_BUDGET = 8 * 1024 * 1024 * 1024
+
+# Memory of the resize pipeline per job (``process_bulk_resize`` memory_budget)
+JOB_PIPELINE_MEMORY = 256 * 1024 * 1024
+
+# Assumed largest image when there is no scan (24 MP RGB)
+DEFAULT_LARGEST_IMAGE = (6000, 4000)
+
+# Encoded output bytes per pixel assumed for the disk estimate; JPEG needs far
+# less, PNG of photos somewhat more
+OUTPUT_BYTES_PER_PIXEL = 1.0
+
+# Seconds between runs of the background cleanup
+SWEEP_INTERVAL_SECONDS = 300
+
+# Resampling engine of this deployment: "pillow", "pillow-simd" or "opencv"
+# (see ``python -m utils.benchmark resamplers`` for the fastest one that matches)
+RESAMPLER = 'pillow'
+
+
+@st.cache_resource
+def get_job_manager():
+    """Server-wide job registry and admission controller shared by all sessions and reruns"""
+    return JobManager(max_concurrent_jobs=MAX_CONCURRENT_JOBS, memory_budget=SERVER_MEMORY_BUDGET,
+                      disk_budget=SERVER_DISK_BUDGET, disk_path='outputs')
+
+
+@st.cache_resource
+def get_sweeper():
+    """Server-wide background cleanup, started once instead of sweeping on every rerun"""
+    job_manager = get_job_manager()
+    return Sweeper(lambda: cleanup_old_files(job_manager), SWEEP_INTERVAL_SECONDS)
+
+
+def estimate_job_resources(uploaded_file, scan, target_sizes, workers, export_array=False):
+    """
+    Estimate the peak memory and the disk writes of a resize job for admission
+
+    Memory is the pipeline budget plus one decoded copy of the largest image
+    per worker. Disk is the encoded outputs twice over (checkpoint parts and
+    the final ZIP exist side by side while it is assembled) plus the array
+    export.
+
+    Returns:
+        Tuple of (memory_bytes, disk_bytes)
+    """
+    if scan and scan.get('largest'):
+        width, height = scan['largest']['size']
+    else:
+        width, height = DEFAULT_LARGEST_IMAGE
+    memory = JOB_PIPELINE_MEMORY + workers * width * height * 4
+
+    if scan:
+        pixels_per_image = sum(w * h for w, h in target_sizes)
+        disk = int(scan['valid'] * pixels_per_image * OUTPUT_BYTES_PER_PIXEL * 2)
+        if export_array:
+            disk += scan['valid'] * target_sizes[0][0] * target_sizes[0][1] * 3
+    else:
+        disk = uploaded_file.size * 2
+    return memory, disk
+
+
+@st.cache_resource
+def get_preview_store():
+    """Server-wide LRU of preview thumbnails, keyed by job"""
+    return PreviewStore()
+
+
+def run_resize_job(uploaded_file, target_size, prefix, workers, fast_resize, use_cache,
+                   background_color=(255, 255, 255), output_format=None, encoder_preset='balanced',
+                   scan=None, resize_mode='stretch', dedup=None, export_array=False, metadata='strip',
+                   progress_callback=None):
+    """Background job body: resize and remove the temporary upload afterwards"""
+    result = process_bulk_resize(uploaded_file, target_size, prefix, workers, fast_resize, use_cache,
+                                 progress_callback=progress_callback, background_color=background_color,
+                                 output_format=output_format, encoder_preset=encoder_preset, scan=scan,
+                                 resize_mode=resize_mode, dedup=dedup, export_array=export_array,
+                                 resampler=RESAMPLER, metadata=metadata)
+
+    # Cleanup temporary files
+    for cleanup_dir in result.get('cleanup_dirs', []):
+        if os.path.exists(cleanup_dir):
+            shutil.rmtree(cleanup_dir)
+
+    return result
+
+
+def display_job(job, prefix):
+    """Display live progress of a background job, or its results once finished"""
+    with st.container():
+        if job.is_active:
+            st.subheader("⚡ Memproses Gambar...")
+            position = get_job_manager().queue_position(job)
+
+            if job.status == 'queued':
+                load = get_job_manager().load()
+                st.progress(0)
+                st.text(f"⏳ Menunggu giliran... posisi {position + 1} dalam antrean "
+                        f"({position} proses di depan, {load['running']}/{load['max_concurrent_jobs']} "
+                        f"sedang berjalan)")
+                if position == 0 and load['running']:
+                    st.caption("Proses akan dimulai begitu memori dan ruang disk server cukup")
+            else:
+                st.progress(job.progress)
+                st.text(f"🔄 {job.current}/{job.total} gambar diproses ({job.elapsed:.1f} detik)")
+
+            # Poll until the job finishes; the job itself keeps running between reruns
+            time.sleep(0.5)
+            st.rerun()
+
+        if job.status == 'failed':
+            st.markdown(f"""
+            <div class="error-box">
+                <strong>❌ Error tidak terduga:</strong><br>
+                {job.error}
+            </div>
+            """, unsafe_allow_html=True)
+            return
+
+        result = job.result
+        if not result['success']:
+            st.markdown(f"""
+            <div class="error-box">
+                <strong>❌ Terjadi kesalahan:</strong><br>
+                {result['error']}
+            </div>
+            """, unsafe_allow_html=True)
+            return
+
+        st.progress(100)
+        st.text(f"✅ Selesai! Waktu pemrosesan: {job.elapsed:.2f} detik")
+
+        # Success message
+        st.markdown(f"""
+        <div class="success-box">
+            <strong>🎉 Proses resize berhasil!</strong><br>
+            {result['successful']} gambar berhasil diresize dari total {result['total_processed']} gambar.
+        </div>
+        """, unsafe_allow_html=True)
+
+        if result.get('resumed'):
+            st.info(f"♻️ Melanjutkan proses sebelumnya yang terputus: {result['resumed']} gambar "
+                    f"sudah selesai dan tidak diproses ulang")
+
+        # Display statistics
+        # Display preview
+        display_processing_stats(result)
+        display_encode_stats(result)
+        display_duplicates(result.get('duplicates'))
+        display_timing_breakdown(result.get('timings'))
+        # Thumbnails move from the job result into the preview LRU on first display
+        previews = get_preview_store().get(job.job_id)
+        if previews is None and result.get('preview_images'):
+            previews = result.pop('preview_images')
+            get_preview_store().put(job.job_id, previews)
+        if previews:
+            st.divider()
+            display_image_preview(
+                previews, "🖼️ Preview Hasil Resize", key=f"preview_{job.job_id}")
+
+        # Download section
+        st.divider()
+        st.subheader("📥 Download Hasil")
+
+        if os.path.exists(result['output_zip_path']):
+            # Hand Streamlit the open file so the archive is read once, into its
+            # media store, instead of being copied into a local bytes object first
+            with open(result['output_zip_path'], "rb") as file:
+                st.download_button(
+                    label="📦 Download ZIP Hasil Resize",
+                    data=file,
+                    file_name=f"{prefix}_images_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip",
+                    mime="application/zip",
+                    type="primary",
+                    use_container_width=True
+                )
+
+            zip_size_mb = os.path.getsize(result['output_zip_path']) / (1024 * 1024)
+            st.info(
+                f"📊 Ukuran file ZIP hasil: {zip_size_mb:.2f} MB")
+
+        export = result.get('export')
+        if export and os.path.exists(export['array_path']):
+            st.caption(f"🧮 Array piksel {' x '.join(map(str, export['shape']))} (uint8) untuk training, "
+                       f"{export['rows']} baris terisi; label diambil dari nama folder di ZIP")
+            col1, col2 = st.columns(2)
+            with col1, open(export['array_path'], "rb") as file:
+                st.download_button(
+                    label="🧮 Download Array (.npy)",
+                    data=file,
+                    file_name=f"{prefix}_pixels.npy",
+                    mime="application/octet-stream",
+                    use_container_width=True
+                )
+            with col2, open(export['index_path'], "rb") as file:
+                st.download_button(
+                    label="📄 Download Indeks (.csv)",
+                    data=file,
+                    file_name=f"{prefix}_pixels_index.csv",
+                    mime="text/csv",
+                    use_container_width=True
+                )
+
+
+def display_encode_stats(result):
+    """Display what the chosen format and encoder preset cost in time and bytes"""
+    timings = result.get('timings')
+    if not timings or not result.get('successful'):
+        return
+
+    # Resumed and cached images were never encoded in this run
+    encoded = timings.get('stage_images', {}).get('encode', 0)
+    encode_seconds = timings['stages'].get('encode', 0.0)
+    label = f"{result.get('output_format') or 'Sama dengan input'} ({result.get('encoder_preset', 'balanced')})"
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.metric("Format output", label)
+
+    with col2:
+        st.metric("Waktu encode / gambar", f"{encode_seconds / encoded * 1000:.0f} ms" if encoded else "-")
+
+    with col3:
+        ratio = result['output_bytes'] / result['input_bytes'] if result.get('input_bytes') else 0.0
+        st.metric("Ukuran hasil / gambar", f"{result['output_bytes'] / result['successful'] / 1024:.0f} KB",
+                  delta=f"{ratio:.0%} dari input", delta_color="off")
+
+
+def display_duplicates(report):
+    """Display groups of exact and near-duplicate images found before resizing"""
+    if not report:
+        return
+
+    if not report['count']:
+        st.info("🔍 Tidak ditemukan gambar duplikat")
+        return
+
+    action = "dilewati" if report['action'] == 'skip' else "ditemukan (tetap diproses)"
+    with st.expander(f"🔍 {report['count']} gambar duplikat {action} dalam {len(report['groups'])} grup"):
+        st.caption(f"Hash perseptual {report['method']}, jarak Hamming maksimal {report['threshold']} dari 64 bit")
+        for group in report['groups']:
+            st.markdown(f"**{group['original']}**")
+            for member in group['duplicates']:
+                st.text(f"   = {member['path']} (jarak {member['distance']})")
+
+
+def display_timing_breakdown(timings):
+    """Display per-stage time, latency percentiles and slowest files"""
+    if not timings:
+        return
+
+    with st.expander("⏱️ Rincian Waktu per Tahap"):
+        latency = timings['latency']
+        col1, col2, col3 = st.columns(3)
+
+        with col1:
+            st.metric("Latensi p50", f"{latency['p50'] * 1000:.0f} ms")
+
+        with col2:
+            st.metric("Latensi p95", f"{latency['p95'] * 1000:.0f} ms")
+
+        with col3:
+            st.metric("Latensi maks", f"{latency['max'] * 1000:.0f} ms")
+
+        st.caption("Waktu kumulatif per tahap (dijumlahkan dari semua worker)")
+        st.table([{"Tahap": stage, "Waktu (detik)": f"{seconds:.2f}"}
+                  for stage, seconds in timings['stages'].items()])
+
+        if timings['slowest']:
+            st.caption("File paling lambat")
+            st.table([{"File": item['file'], "Waktu (ms)": f"{item['seconds'] * 1000:.0f}"}
+                      for item in timings['slowest']])
+
 
 def main():
     # Initialize
     initialize_directories()
-    cleanup_old_files()
+    get_sweeper()
+    if 'owner_id' not in st.session_state:
+        st.session_state['owner_id'] = str(uuid.uuid4())
 
     # Header
     st.title("🖼️ Resize Gambar 224x224 px Online")
@@ -145,7 +498,19 @@ def main():
         "Lebar (px)", min_value=64, max_value=2048, value=224, step=32)
     height = st.sidebar.number_input(
         "Tinggi (px)", min_value=64, max_value=2048, value=224, step=32)
-    target_size = (width, height)
+    extra_sizes_text = st.sidebar.text_input(
+        "Ukuran tambahan (opsional)",
+        value="",
+        placeholder="contoh: 299x299, 512x512",
+        help="Buat beberapa ukuran sekaligus dari satu kali decode. Setiap ukuran disimpan di folder sendiri dalam ZIP"
+    )
+    try:
+        extra_sizes = parse_sizes(extra_sizes_text)
+    except ValueError:
+        st.sidebar.error("Format ukuran tidak valid. Gunakan format LEBARxTINGGI, contoh: 299x299")
+        extra_sizes = []
+    target_size = normalize_sizes([(width, height)] + extra_sizes)
+    target_size_label = ", ".join(f"{w}x{h}" for w, h in target_size)
 
     # Output naming settings
     st.sidebar.subheader("🏷️ Penamaan Output")
@@ -162,6 +527,78 @@ def main():
     else:
         prefix = prefix.strip()
 
+    # Performance settings
+    st.sidebar.subheader("🚀 Performa")
+    workers = st.sidebar.number_input(
+        "Jumlah worker",
+        min_value=1,
+        max_value=max(1, os.cpu_count() or 1),
+        value=max(1, os.cpu_count() or 1),
+        step=1,
+        help="Jumlah proses paralel untuk resize. Default: jumlah CPU"
+    )
+    quality_mode = st.sidebar.radio(
+        "Mode resize",
+        ["Kualitas tinggi", "Cepat"],
+        help="Mode cepat men-decode JPEG pada resolusi lebih kecil dan memperkecil bertahap sebelum LANCZOS. "
+             "Jauh lebih cepat untuk foto besar dengan selisih kualitas yang sangat kecil"
+    )
+    fast_resize = quality_mode == "Cepat"
+    use_cache = st.sidebar.checkbox(
+        "Gunakan cache hasil",
+        value=True,
+        help="Gambar yang identik dengan upload sebelumnya (dengan pengaturan yang sama) tidak diproses ulang"
+    )
+    format_labels = {"Sama dengan input": None, **{name: name for name in available_output_formats()}}
+    output_format = format_labels[st.sidebar.selectbox(
+        "Format output",
+        list(format_labels),
+        help="WebP/AVIF menghasilkan file jauh lebih kecil dari JPEG/PNG. "
+             "AVIF hanya tersedia jika Pillow mendukungnya"
+    )]
+    preset_labels = {"Cepat (file lebih besar)": 'fast', "Seimbang": 'balanced',
+                     "Terkecil (encode lebih lama)": 'smallest'}
+    encoder_preset = preset_labels[st.sidebar.selectbox(
+        "Preset encoder",
+        list(preset_labels),
+        index=list(preset_labels.values()).index('balanced'),
+        help="Mengatur optimize, compress_level, method dan quality encoder: "
+             "tukar waktu encode dengan ukuran file"
+    )]
+    mode_labels = {"Stretch (paksa ukuran)": 'stretch', "Crop tengah": 'crop',
+                   "Letterbox (tambah padding)": 'pad', "Crop cerdas (entropi)": 'entropy'}
+    resize_mode = mode_labels[st.sidebar.selectbox(
+        "Mode rasio aspek",
+        list(mode_labels),
+        help="Stretch mengubah rasio aspek, crop memotong bagian tengah, letterbox menambah padding "
+             "warna latar, crop cerdas memilih area paling detail (dihitung dari thumbnail)"
+    )]
+    dedup_labels = {"Nonaktif": None, "Laporkan saja": 'report', "Lewati duplikat": 'skip'}
+    dedup = dedup_labels[st.sidebar.selectbox(
+        "Deteksi duplikat",
+        list(dedup_labels),
+        help="Cari gambar yang sama atau hampir sama (hash perseptual) sebelum resize; "
+             "'Lewati duplikat' hanya memproses gambar pertama dari setiap grup"
+    )]
+    export_array = st.sidebar.checkbox(
+        "Ekspor array NumPy (.npy)",
+        value=False,
+        help="Simpan juga piksel hasil resize (ukuran pertama) sebagai satu array uint8 "
+             "N x H x W x 3 yang bisa di-memory-map, plus indeks CSV nama file dan label folder"
+    )
+    metadata = 'preserve' if st.sidebar.checkbox(
+        "Simpan metadata (EXIF/ICC)",
+        value=False,
+        help="Salin EXIF dan profil warna ke hasil. Jika tidak dicentang, metadata dibuang sehingga file "
+             "lebih kecil. Orientasi EXIF (foto HP) selalu diterapkan, dan profil warna selalu "
+             "dikonversi ke sRGB pada ukuran target"
+    ) else 'strip'
+    background_color = parse_color(st.sidebar.color_picker(
+        "Warna latar gambar transparan",
+        value="#FFFFFF",
+        help="Warna yang menggantikan area transparan (PNG RGBA/palette) pada hasil resize"
+    ))
+
     # Info section
     st.sidebar.subheader("ℹ️ Informasi")
     st.sidebar.info("""
@@ -194,7 +631,7 @@ def main():
             st.markdown(f"""
             <div class="info-box">                <strong>File terpilih:</strong> {uploaded_file.name}<br>
                 <strong>Ukuran:</strong> {file_size_mb:.2f} MB<br>
-                <strong>Target resize:</strong> {width}x{height} pixels<br>
+                <strong>Target resize:</strong> {target_size_label} pixels<br>
                 <strong>Prefix output:</strong> {prefix}
             </div>
             """, unsafe_allow_html=True)
@@ -211,20 +648,36 @@ def main():
         6. **Download** - Unduh ZIP hasil resize
         """)
 
+    job_manager = get_job_manager()
+    job = job_manager.get(st.session_state.get('job_id', ''))
+
     # Processing section
     if uploaded_file is not None:
         st.divider()
 
+        # Header-only scan before starting, so problems and the runtime are known up front; it
+        # samples with the same pipeline settings the job runs with
+        scan = None
+        try:
+            scan = get_archive_scan(uploaded_file, ImageProcessor(
+                target_size, workers=workers, fast_resize=fast_resize, output_format=output_format,
+                encoder_preset=encoder_preset, background_color=background_color, resize_mode=resize_mode,
+                resampler=RESAMPLER, metadata=metadata))
+            display_scan_summary(scan)
+        except Exception as e:
+            st.warning(f"⚠️ Arsip tidak bisa dipindai: {str(e)}")
+
         # Processing button
         col1, col2, col3 = st.columns([1, 2, 1])
         with col2:
             process_button = st.button(
                 "🚀 Start Resize Process",
                 type="primary",
-                use_container_width=True
+                use_container_width=True,
+                disabled=job is not None and job.is_active
             )
 
-        # Process images when button is clicked
+        # Queue a background job when button is clicked
         if process_button:
             # Validate file size (200MB limit)
             if uploaded_file.size > 200 * 1024 * 1024:
@@ -232,94 +685,24 @@ def main():
                     "❌ File terlalu besar! Maksimal ukuran file adalah 200MB.")
                 return
 
-            # Processing container
-            with st.container():
-                st.subheader("⚡ Memproses Gambar...")
-
-                # Progress indicators
-                progress_bar = st.progress(0)
-                status_text = st.empty()                # Start processing
-                start_time = time.time()
-                status_text.text("🔄 Mengekstrak file ZIP...")
-
-                try:
-                    # Process images
-                    result = process_bulk_resize(
-                        uploaded_file, target_size, prefix)
-
-                    # Update progress
-                    progress_bar.progress(100)
-                    processing_time = time.time() - start_time
-
-                    if result['success']:
-                        status_text.text(
-                            f"✅ Selesai! Waktu pemrosesan: {processing_time:.2f} detik")
-
-                        # Success message
-                        st.markdown(f"""
-                        <div class="success-box">
-                            <strong>🎉 Proses resize berhasil!</strong><br>
-                            {result['successful']} gambar berhasil diresize dari total {result['total_processed']} gambar.
-                        </div>
-                        """, unsafe_allow_html=True)
-
-                        # Display statistics
-                        # Display preview
-                        display_processing_stats(result)
-                        if result['resized_files']:
-                            st.divider()
-                            display_image_preview(
-                                result['resized_files'], "🖼️ Preview Hasil Resize")
-
-                        # Download section
-                        st.divider()
-                        st.subheader("📥 Download Hasil")
-
-                        if os.path.exists(result['output_zip_path']):
-                            with open(result['output_zip_path'], "rb") as file:
-                                zip_data = file.read()
-
-                            st.download_button(
-                                label="📦 Download ZIP Hasil Resize",
-                                data=zip_data,
-                                file_name=f"{prefix}_images_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip",
-                                mime="application/zip",
-                                type="primary",
-                                use_container_width=True
-                            )
-
-                            zip_size_mb = len(zip_data) / (1024 * 1024)
-                            st.info(
-                                f"📊 Ukuran file ZIP hasil: {zip_size_mb:.2f} MB")
-
-                        # Cleanup temporary files
-                        for cleanup_dir in result.get('cleanup_dirs', []):
-                            if os.path.exists(cleanup_dir):
-                                shutil.rmtree(cleanup_dir)
-
-                    else:
-                        status_text.text("❌ Proses gagal!")
-                        st.markdown(f"""
-                        <div class="error-box">
-                            <strong>❌ Terjadi kesalahan:</strong><br>
-                            {result['error']}
-                        </div>
-                        """, unsafe_allow_html=True)
-
-                        # Cleanup on error
-                        for cleanup_dir in result.get('cleanup_dirs', []):
-                            if os.path.exists(cleanup_dir):
-                                shutil.rmtree(cleanup_dir)
-
-                except Exception as e:
-                    progress_bar.progress(0)
-                    status_text.text("❌ Terjadi kesalahan!")
-                    st.markdown(f"""
-                    <div class="error-box">
-                        <strong>❌ Error tidak terduga:</strong><br>
-                        {str(e)}
-                    </div>
-                    """, unsafe_allow_html=True)
+            job_workers = min(workers, job_manager.workers_per_job,
+                              scan['recommended_workers'] if scan else workers)
+            memory, disk = estimate_job_resources(uploaded_file, scan, target_size, job_workers, export_array)
+            try:
+                job = job_manager.submit(
+                    st.session_state['owner_id'], run_resize_job,
+                    uploaded_file, target_size, prefix, job_workers,
+                    fast_resize, use_cache, background_color, output_format, encoder_preset, scan, resize_mode,
+                    dedup, export_array, metadata,
+                    description=uploaded_file.name, memory=memory, disk=disk)
+                st.session_state['job_id'] = job.job_id
+                st.session_state['job_prefix'] = prefix
+            except RuntimeError as e:
+                st.warning(f"⏳ {str(e)}")
+
+    # Job progress / results survive reruns through the job registry
+    if job is not None:
+        display_job(job, st.session_state.get('job_prefix', prefix))
 
     # Footer
     st.divider()
@@ -0,0 +1,1223 @@
+"""
+Benchmark Module for Bulk Image Resizer
+Generates synthetic ZIP archives and times the resize pipeline on them
+"""
+
+import argparse
+import io
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import struct
+import sys
+import tempfile
+import time
+import zipfile
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+
+import PIL
+from PIL import Image, ImageChops, ImageCms, ImageOps, ImageStat
+
+from utils.dedup import DEFAULT_THRESHOLD, find_duplicates, hamming_distance
+from utils.image_processing import (ENCODER_PRESET_NAMES, SCHEDULES, ImageProcessor, available_output_formats,
+                                    composite_background, parse_color, parse_sizes, premultiply_alpha,
+                                    scale_to_8bit)
+from utils.metrics import percentile
+from utils.resamplers import available_resamplers, check_parity, get_resampler
+from utils.scheduler import ChunkQueue, fixed_chunks, plan_chunks
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+# Image kinds the dataset generator can produce
+DATASET_KINDS = ('jpeg', 'png', 'rgba', 'palette')
+
+# Kinds in modes some output formats cannot write (CMYK JPEG, 16-bit and grey+alpha PNG)
+MIXED_MODE_KINDS = ('cmyk', 'gray16', 'gray_alpha')
+
+
+def generate_synthetic_zip(zip_path: str, count: int, size=(640, 480), variants: int = 16) -> str:
+    """
+    Write a ZIP archive with ``count`` synthetic JPEG images
+
+    Only ``variants`` distinct images are encoded and then reused, so large
+    archives can be generated quickly without any network or fixture files.
+
+    Args:
+        zip_path: Path of the ZIP file to create
+        count: Number of image members
+        size: Size of every generated image
+        variants: Number of distinct encoded images
+
+    Returns:
+        Path of the created ZIP file
+    """
+    payloads = []
+    for v in range(variants):
+        img = Image.linear_gradient('L').resize(size).convert('RGB')
+        img = img.rotate(v * (360 / variants))
+        buffer = io.BytesIO()
+        img.save(buffer, format='JPEG', quality=90)
+        payloads.append(buffer.getvalue())
+
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_STORED) as zip_ref:
+        for i in range(count):
+            zip_ref.writestr(f"class_{i % 4}/img_{i:06d}.jpg", payloads[i % variants])
+        # A non-image member that the pipeline has to skip
+        zip_ref.writestr("README.txt", "synthetic benchmark archive")
+
+    return zip_path
+
+
+def generate_photo_zip(zip_path: str, count: int, size=(6000, 4000)) -> str:
+    """
+    Write a ZIP archive with ``count`` large, photo-like JPEG images
+
+    The images mix gradients with sensor-like noise so that downscaling
+    quality differences show up in PSNR, unlike flat synthetic fills.
+
+    Args:
+        zip_path: Path of the ZIP file to create
+        count: Number of image members
+        size: Size of every generated image (default: 24 MP)
+
+    Returns:
+        Path of the created ZIP file
+    """
+    gradient = Image.linear_gradient('L').resize(size)
+    noise = Image.effect_noise(size, 48)
+    mandel = Image.effect_mandelbrot(size, (-2.0, -1.25, 0.75, 1.25), 64)
+    img = Image.merge('RGB', [gradient, noise, mandel])
+    buffer = io.BytesIO()
+    img.save(buffer, format='JPEG', quality=92)
+
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_STORED) as zip_ref:
+        for i in range(count):
+            zip_ref.writestr(f"photo_{i:04d}.jpg", buffer.getvalue())
+
+    return zip_path
+
+
+def synthetic_image(kind: str, size: Tuple[int, int], rng: random.Random) -> Tuple[bytes, str]:
+    """
+    Encode one synthetic image of the given kind
+
+    Args:
+        kind: One of ``DATASET_KINDS``
+        size: Image size (width, height)
+        rng: Random generator, so datasets are reproducible from a seed
+
+    Returns:
+        Tuple of (encoded_bytes, file_extension)
+    """
+    gradient = Image.linear_gradient('L').resize(size).rotate(rng.randrange(360))
+    noise = Image.effect_noise(size, rng.randrange(8, 64))
+    img = Image.merge('RGB', [gradient, noise, gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT)])
+    buffer = io.BytesIO()
+
+    if kind in ('jpeg', 'cmyk'):
+        if kind == 'cmyk':
+            img = img.convert('CMYK')
+        img.save(buffer, format='JPEG', quality=90)
+        return buffer.getvalue(), '.jpg'
+    if kind == 'rgba':
+        img.putalpha(gradient)
+    elif kind == 'gray16':
+        img = img.convert('L').convert('I').point(lambda value: value * 257).convert('I;16')
+    elif kind == 'gray_alpha':
+        img = Image.merge('LA', (img.convert('L'), gradient))
+    elif kind == 'palette':
+        img = img.convert('P', palette=Image.Palette.ADAPTIVE, colors=64)
+    elif kind != 'png':
+        raise ValueError(f"Unknown image kind: {kind}")
+
+    img.save(buffer, format='PNG')
+    return buffer.getvalue(), '.png'
+
+
+def generate_dataset_zip(zip_path: str, count: int, kinds: Sequence[str] = DATASET_KINDS,
+                         resolutions: Sequence[Tuple[int, int]] = ((320, 240), (1280, 960)),
+                         seed: int = 0, variants: int = 4) -> dict:
+    """
+    Write a reproducible mixed dataset ZIP (JPEG/PNG/RGBA/palette, several resolutions)
+
+    ``variants`` distinct images are encoded per kind and resolution and then
+    reused, which keeps generation fast for large counts.
+
+    Args:
+        zip_path: Path of the ZIP file to create
+        count: Number of image members
+        kinds: Image kinds to cycle through (see ``DATASET_KINDS``)
+        resolutions: Image sizes to cycle through
+        seed: Seed for the random generator
+        variants: Distinct encoded images per kind and resolution
+
+    Returns:
+        Dictionary describing the generated dataset
+    """
+    rng = random.Random(seed)
+    combos = [(kind, size) for kind in kinds for size in resolutions]
+    payloads = {combo: [synthetic_image(combo[0], combo[1], rng) for _ in range(variants)]
+                for combo in combos}
+    input_bytes = 0
+
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_STORED) as zip_ref:
+        for i in range(count):
+            kind, size = combos[i % len(combos)]
+            data, ext = payloads[(kind, size)][(i // len(combos)) % variants]
+            zip_ref.writestr(f"{kind}/{size[0]}x{size[1]}/img_{i:06d}{ext}", data)
+            input_bytes += len(data)
+
+    return {
+        'count': count,
+        'kinds': list(kinds),
+        'resolutions': [list(size) for size in resolutions],
+        'seed': seed,
+        'input_bytes': input_bytes,
+    }
+
+
+def peak_rss_mb() -> dict:
+    """
+    Peak resident set size so far of this process and of its (reaped) worker processes
+
+    Values are high-water marks, so they never decrease between stages.
+    """
+    if resource is None:
+        return {'self': None, 'children': None}
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1024 * 1024 if platform.system() == 'Darwin' else 1024
+    return {
+        'self': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale,
+        'children': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale,
+    }
+
+
+def _stage(seconds: float, images: int, data_bytes: int) -> dict:
+    return {
+        'seconds': seconds,
+        'images': images,
+        'images_per_sec': images / seconds if seconds else 0.0,
+        'mb_per_sec': data_bytes / (1024 * 1024) / seconds if seconds else 0.0,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def bench_stages(zip_path: str, work_dir: str, workers: Optional[int] = None,
+                 target_size=(224, 224), sample: int = 50) -> dict:
+    """
+    Time each stage of the pipeline separately on one archive
+
+    Stages: ``extract_zip`` (to disk), ``resize_image`` (single process, on
+    the first ``sample`` images), ``resize_images_batch`` (streamed from the
+    ZIP, with ``workers`` processes) and ``create_zip`` (of the batch output).
+
+    Args:
+        zip_path: Archive to process
+        work_dir: Scratch directory
+        workers: Worker processes for the batch stage
+        target_size: Target size for resized images
+        sample: Number of images for the single-image stage
+
+    Returns:
+        Dictionary mapping stage name to its measurements
+    """
+    processor = ImageProcessor(target_size, workers=workers)
+    scratch = os.path.join(work_dir, 'stages')
+    stages = {}
+
+    try:
+        start = time.perf_counter()
+        extracted = processor.extract_zip(zip_path, os.path.join(scratch, 'extracted'))
+        extracted_bytes = sum(os.path.getsize(path) for path in extracted)
+        stages['extract_zip'] = _stage(time.perf_counter() - start, len(extracted), extracted_bytes)
+
+        single_dir = os.path.join(scratch, 'single')
+        os.makedirs(single_dir)
+        subset = extracted[:sample]
+        start = time.perf_counter()
+        for i, path in enumerate(subset):
+            processor.resize_image(path, os.path.join(single_dir, processor.get_output_filename(path, i, 'single')))
+        stages['resize_image'] = _stage(time.perf_counter() - start, len(subset),
+                                        sum(os.path.getsize(path) for path in subset))
+
+        members = processor.list_zip_images(zip_path)
+        start = time.perf_counter()
+        resized, _, _ = processor.resize_images_batch(members, os.path.join(scratch, 'resized'),
+                                                      zip_path=zip_path)
+        stages['resize_images_batch'] = _stage(time.perf_counter() - start, len(members), extracted_bytes)
+
+        output_zip = os.path.join(scratch, 'output.zip')
+        start = time.perf_counter()
+        processor.create_zip(resized, output_zip)
+        stages['create_zip'] = _stage(time.perf_counter() - start, len(resized),
+                                      sum(os.path.getsize(path) for path in resized))
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    return stages
+
+
+def run_suite(counts: Sequence[int], kinds: Sequence[str], resolutions: Sequence[Tuple[int, int]],
+              workers: Optional[int] = None, target_size=(224, 224), seed: int = 0) -> dict:
+    """
+    Run ``bench_stages`` on generated datasets of every requested size
+
+    Returns:
+        Machine-readable results with environment metadata
+    """
+    results = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'pillow': PIL.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'workers': workers or os.cpu_count(),
+            'target_size': list(target_size),
+        },
+        'scenarios': [],
+    }
+
+    with tempfile.TemporaryDirectory(prefix="resize_bench_") as work_dir:
+        for count in counts:
+            zip_path = os.path.join(work_dir, f"dataset_{count}.zip")
+            dataset = generate_dataset_zip(zip_path, count, kinds, resolutions, seed)
+            dataset['stages'] = bench_stages(zip_path, work_dir, workers, target_size)
+            results['scenarios'].append(dataset)
+            os.remove(zip_path)
+
+    return results
+
+
+def scenario_key(scenario: dict) -> tuple:
+    """Identify a scenario independently of its measurements"""
+    return (scenario['count'], tuple(scenario['kinds']),
+            tuple(tuple(size) for size in scenario['resolutions']), scenario['seed'])
+
+
+def compare_results(baseline: dict, current: dict) -> List[dict]:
+    """
+    Compare per-stage throughput of two suite runs
+
+    Returns:
+        One row per matching scenario and stage with both throughputs and their ratio
+    """
+    previous = {scenario_key(scenario): scenario for scenario in baseline['scenarios']}
+    rows = []
+
+    for scenario in current['scenarios']:
+        old = previous.get(scenario_key(scenario))
+        if old is None:
+            continue
+        for stage, measurement in scenario['stages'].items():
+            if stage not in old['stages']:
+                continue
+            before = old['stages'][stage]['images_per_sec']
+            after = measurement['images_per_sec']
+            rows.append({
+                'count': scenario['count'],
+                'stage': stage,
+                'before': before,
+                'after': after,
+                'ratio': after / before if before else 0.0,
+            })
+
+    return rows
+
+
+def print_suite(results: dict):
+    """Print suite results as a table"""
+    for scenario in results['scenarios']:
+        print(f"{scenario['count']} images, {scenario['input_bytes'] / (1024 * 1024):.1f} MB "
+              f"({', '.join(scenario['kinds'])})")
+        for stage, m in scenario['stages'].items():
+            rss = m['peak_rss_mb']
+            rss_text = f"{rss['self']:.0f}/{rss['children']:.0f} MB" if rss['self'] is not None else "n/a"
+            print(f"  {stage:<20} {m['seconds']:8.2f} s | {m['images_per_sec']:8.1f} img/s | "
+                  f"{m['mb_per_sec']:7.1f} MB/s | peak RSS self/workers {rss_text}")
+
+
+def psnr(reference: Image.Image, candidate: Image.Image) -> float:
+    """Peak signal-to-noise ratio in dB between two same-sized images, compared as 8-bit RGB"""
+    diff = ImageChops.difference(scale_to_8bit(reference).convert('RGB'), scale_to_8bit(candidate).convert('RGB'))
+    stat = ImageStat.Stat(diff)
+    pixels = reference.size[0] * reference.size[1]
+    mse = sum(stat.sum2) / (pixels * len(stat.sum2))
+    return float('inf') if mse == 0 else 10 * math.log10(255 ** 2 / mse)
+
+
+def directory_size(directory: str) -> int:
+    """Return the total size in bytes of all files below ``directory``"""
+    total = 0
+    for root, dirs, files in os.walk(directory):
+        for file in files:
+            total += os.path.getsize(os.path.join(root, file))
+    return total
+
+
+def bench_ingest(zip_path: str, work_dir: str, workers: Optional[int] = None) -> List[dict]:
+    """
+    Compare extract-to-disk ingest against streaming ZIP members
+
+    Args:
+        zip_path: Archive to process
+        work_dir: Scratch directory for extracted and resized files
+        workers: Worker processes for resizing
+
+    Returns:
+        One result dictionary per ingest path
+    """
+    processor = ImageProcessor(workers=workers)
+    results = []
+
+    for path in ('extract', 'stream'):
+        scratch = os.path.join(work_dir, path)
+        output_dir = os.path.join(scratch, 'resized')
+
+        start = time.perf_counter()
+        if path == 'extract':
+            image_files = processor.extract_zip(zip_path, os.path.join(scratch, 'extracted'))
+            _, successful, failed = processor.resize_images_batch(image_files, output_dir)
+        else:
+            image_files = processor.list_zip_images(zip_path)
+            _, successful, failed = processor.resize_images_batch(image_files, output_dir, zip_path=zip_path)
+        elapsed = time.perf_counter() - start
+
+        results.append({
+            'path': path,
+            'images': len(image_files),
+            'successful': successful,
+            'failed': failed,
+            'seconds': elapsed,
+            'images_per_sec': len(image_files) / elapsed if elapsed else 0.0,
+            'peak_disk_bytes': directory_size(scratch),
+        })
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    return results
+
+
+def bench_discovery(zip_path: str, repeat: int = 3) -> dict:
+    """
+    Time listing the images of a large archive
+
+    Compares ``list_zip_images`` (central directory, set lookup, junk and
+    safety checks, sorted) with and without magic-byte sniffing against the
+    original per-member check that tested every extension with ``endswith``.
+
+    Args:
+        zip_path: Archive to list
+        repeat: Runs per variant; the fastest is reported
+
+    Returns:
+        Dictionary with the number of entries, images found and seconds per variant
+    """
+    processor = ImageProcessor(workers=1)
+    sniffer = ImageProcessor(workers=1, sniff_images=True)
+    legacy_formats = ['.jpg', '.jpeg', '.png', '.JPG', '.JPEG', '.PNG']
+
+    def legacy():
+        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            return [info.filename for info in zip_ref.infolist() if not info.is_dir()
+                    and any(info.filename.lower().endswith(ext.lower()) for ext in legacy_formats)]
+
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        result = {'entries': len(zip_ref.infolist())}
+
+    for name, func in (('legacy', legacy), ('central_directory', lambda: processor.list_zip_images(zip_path)),
+                       ('sniff', lambda: sniffer.list_zip_images(zip_path))):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            found = func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        result[name] = {'images': len(found), 'seconds': best}
+
+    return result
+
+
+def bench_fast_resize(zip_path: str, target_size=(224, 224)) -> dict:
+    """
+    Compare the full-quality resize path against draft/reducing_gap fast mode
+
+    Runs in a single process so the numbers reflect per-image cost only.
+
+    Args:
+        zip_path: Archive to process
+        target_size: Target size for resized images
+
+    Returns:
+        Dictionary with per-mode throughput, the speedup and mean PSNR
+    """
+    processor = ImageProcessor(target_size, workers=1)
+    members = processor.list_zip_images(zip_path)
+    result = {'images': len(members), 'target_size': target_size}
+    outputs = {}
+
+    for mode, fast in (('full', False), ('fast', True)):
+        processor.fast_resize = fast
+        start = time.perf_counter()
+        outputs[mode] = [processor.resize_image_bytes(member, zip_path) for member in members]
+        elapsed = time.perf_counter() - start
+        result[f'{mode}_seconds'] = elapsed
+        result[f'{mode}_images_per_sec'] = len(members) / elapsed if elapsed else 0.0
+
+    scores = [psnr(Image.open(io.BytesIO(full)), Image.open(io.BytesIO(fast)))
+              for full, fast in zip(outputs['full'], outputs['fast']) if full and fast]
+    result['speedup'] = result['full_seconds'] / result['fast_seconds'] if result['fast_seconds'] else 0.0
+    result['psnr_db'] = sum(scores) / len(scores) if scores else 0.0
+
+    return result
+
+
+def wide_gamut_profile() -> bytes:
+    """
+    A minimal ICC v2 display profile with Display P3 primaries and gamma 2.2
+
+    Pillow can only create sRGB, Lab and XYZ profiles, so this matrix/TRC
+    profile is assembled by hand to give the test photos a colour space that
+    actually needs converting.
+    """
+    def s15(value: float) -> bytes:
+        return struct.pack('>i', round(value * 65536))
+
+    def xyz(x: float, y: float, z: float) -> bytes:
+        return b'XYZ ' + bytes(4) + s15(x) + s15(y) + s15(z)
+
+    description = b'Display P3 (gamma 2.2)\x00'
+    tags = [
+        (b'desc', b'desc' + bytes(4) + struct.pack('>I', len(description)) + description + bytes(4 + 4 + 2 + 1 + 67)),
+        (b'wtpt', xyz(0.9642, 1.0, 0.8249)),
+        (b'rXYZ', xyz(0.5151, 0.2412, -0.0011)),
+        (b'gXYZ', xyz(0.2920, 0.6922, 0.0419)),
+        (b'bXYZ', xyz(0.1571, 0.0666, 0.7841)),
+        (b'rTRC', b'curv' + bytes(4) + struct.pack('>IH', 1, round(2.2 * 256)) + bytes(2)),
+    ]
+    tags += [(b'gTRC', tags[-1][1]), (b'bTRC', tags[-1][1]), (b'cprt', b'text' + bytes(4) + b'No copyright\x00')]
+
+    table, data = b'', b''
+    offset = 128 + 4 + 12 * len(tags)
+    for signature, body in tags:
+        body += bytes(-len(body) % 4)
+        table += signature + struct.pack('>II', offset + len(data), len(body))
+        data += body
+    size = offset + len(data)
+    header = (struct.pack('>I', size) + bytes(4) + struct.pack('>I', 0x02100000) + b'mntrRGB XYZ ' + bytes(12) +
+              b'acsp' + bytes(24) + struct.pack('>I', 0) + s15(0.9642) + s15(1.0) + s15(0.8249) + bytes(48))
+    return header + struct.pack('>I', len(tags)) + table + data
+
+
+def generate_phone_zip(zip_path: str, count: int, size=(4032, 3024), seed: int = 0) -> str:
+    """
+    Write a ZIP archive of phone-style JPEGs: stored sideways with an EXIF
+    orientation, camera EXIF (including a maker note blob) and a Display P3 profile
+
+    Args:
+        zip_path: Path of the ZIP file to create
+        count: Number of images; orientations cycle through 1 to 8
+        size: Stored size of every image
+        seed: Seed for the maker note bytes
+
+    Returns:
+        Path of the created ZIP file
+    """
+    rng = random.Random(seed)
+    gradient = Image.linear_gradient('L').resize(size)
+    img = Image.merge('RGB', [gradient, Image.effect_noise(size, 32), gradient.transpose(Image.Transpose.ROTATE_180)])
+    profile = wide_gamut_profile()
+
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_STORED) as zip_ref:
+        for i in range(count):
+            exif = Image.Exif()
+            exif[0x010F] = "Phone Maker"
+            exif[0x0110] = "Phone 15"
+            exif[0x0132] = "2026:01:01 12:00:00"
+            exif[0x0112] = i % 8 + 1
+            exif[0x927C] = bytes(rng.getrandbits(8) for _ in range(32 * 1024))
+            buffer = io.BytesIO()
+            img.save(buffer, format='JPEG', quality=92, exif=exif.tobytes(), icc_profile=profile)
+            zip_ref.writestr(f"phone/img_{i:04d}.jpg", buffer.getvalue())
+
+    return zip_path
+
+
+def bench_metadata(zip_path: str, target_size=(224, 224)) -> dict:
+    """
+    Compare a separate orientation/colour correction pass with the single-pass resize
+
+    The two-pass baseline does what a correction job did before: decode,
+    ``ImageOps.exif_transpose``, convert to sRGB at full resolution, encode,
+    and then decode the corrected file again to resize it. The single pass
+    is timed with metadata stripped and preserved; its outputs must be
+    upright and match the baseline.
+
+    Args:
+        zip_path: Archive to process (see ``generate_phone_zip``)
+        target_size: Target size
+
+    Returns:
+        Dictionary with one row per variant and the lowest PSNR against the baseline
+    """
+    members = ImageProcessor(workers=1).list_zip_images(zip_path)
+    rows = []
+    outputs = {}
+
+    baseline = ImageProcessor(target_size, workers=1, to_srgb=False)
+    srgb = ImageCms.createProfile('sRGB')
+    start = time.perf_counter()
+    outputs['two-pass'] = []
+    with zipfile.ZipFile(zip_path) as zip_ref:
+        for member in members:
+            with Image.open(io.BytesIO(zip_ref.read(member))) as img:
+                upright = ImageOps.exif_transpose(img)
+                profile = ImageCms.ImageCmsProfile(io.BytesIO(img.info['icc_profile']))
+                corrected = ImageCms.profileToProfile(upright, profile, srgb)
+            buffer = io.BytesIO()
+            corrected.save(buffer, format='JPEG', quality=95)
+            buffer.seek(0)
+            outputs['two-pass'].append(baseline.resize_image_variants(member, source=buffer)[0])
+    rows.append({'variant': 'two-pass', 'seconds': time.perf_counter() - start})
+
+    for metadata in ('strip', 'preserve'):
+        processor = ImageProcessor(target_size, workers=1, metadata=metadata)
+        outputs[metadata] = []
+        encode_seconds = 0.0
+        start = time.perf_counter()
+        for member in members:
+            outputs[metadata].append(processor.resize_image_bytes(member, zip_path))
+            encode_seconds += processor.last_timings.get('encode', 0.0)
+        rows.append({'variant': metadata, 'seconds': time.perf_counter() - start,
+                     'encode_seconds': encode_seconds})
+
+    for row in rows:
+        data = outputs[row['variant']]
+        row['ms_per_image'] = row['seconds'] / len(members) * 1000
+        row['kb_per_image'] = sum(len(item) for item in data) / len(members) / 1024
+        if 'encode_seconds' in row:
+            row['encode_ms_per_image'] = row['encode_seconds'] / len(members) * 1000
+
+    scores = []
+    for reference, candidate in zip(outputs['two-pass'], outputs['strip']):
+        reference, candidate = Image.open(io.BytesIO(reference)), Image.open(io.BytesIO(candidate))
+        scores.append(psnr(reference, candidate) if reference.size == candidate.size else 0.0)
+
+    return {'images': len(members), 'rows': rows, 'psnr_db': min(scores, default=0.0)}
+
+
+def bench_encoders(zip_path: str, target_size=(224, 224), formats: Optional[Sequence[str]] = None,
+                   presets: Sequence[str] = ENCODER_PRESET_NAMES) -> List[dict]:
+    """
+    Measure encode time, output size and quality for every output format and preset
+
+    Runs in a single process. Quality is the mean PSNR against a lossless PNG
+    encode of the same resized images. Generate the archive with
+    ``MIXED_MODE_KINDS`` as well, so every format also gets CMYK, 16-bit and
+    grey+alpha inputs to convert; images that fail to encode are counted.
+
+    Args:
+        zip_path: Archive to process
+        target_size: Target size for resized images
+        formats: Output formats to try (default: every format this Pillow can encode)
+        presets: Encoder presets to try
+
+    Returns:
+        One row per format and preset
+    """
+    reference_processor = ImageProcessor(target_size, workers=1, output_format='PNG', encoder_preset='fast')
+    members = reference_processor.list_zip_images(zip_path)
+    reference = [reference_processor.resize_image_bytes(member, zip_path) for member in members]
+    rows = []
+
+    for output_format in formats or available_output_formats():
+        for preset in presets:
+            processor = ImageProcessor(target_size, workers=1, output_format=output_format, encoder_preset=preset)
+            encode_seconds = 0.0
+            outputs = []
+            for member in members:
+                outputs.append(processor.resize_image_bytes(member, zip_path))
+                encode_seconds += processor.last_timings.get('encode', 0.0)
+
+            pairs = [(old, new) for old, new in zip(reference, outputs) if old and new]
+            scores = [psnr(Image.open(io.BytesIO(old)), Image.open(io.BytesIO(new))) for old, new in pairs]
+            finite = [score for score in scores if score != float('inf')]
+            rows.append({
+                'format': output_format,
+                'preset': preset,
+                'images': len(pairs),
+                'failed': sum(1 for new in outputs if not new),
+                'encode_ms_per_image': encode_seconds / len(pairs) * 1000 if pairs else 0.0,
+                'kb_per_image': sum(len(new) for _, new in pairs) / len(pairs) / 1024 if pairs else 0.0,
+                'psnr_db': sum(finite) / len(finite) if finite else float('inf'),
+            })
+
+    return rows
+
+
+def flatten_then_resize(img: Image.Image, target_size, background=(255, 255, 255)) -> Image.Image:
+    """
+    Reference path: composite RGBA onto the background at full resolution, then resize
+
+    This is how transparent images were handled before compositing moved
+    after the resize; ``bench_alpha`` checks the new path against it.
+    """
+    canvas = Image.new('RGB', img.size, background)
+    canvas.paste(img, mask=img.split()[-1])
+    return canvas.resize(target_size, Image.Resampling.LANCZOS)
+
+
+def bench_alpha(count: int = 20, size=(2000, 1500), target_size=(224, 224),
+                background=(255, 255, 255), seed: int = 0) -> dict:
+    """
+    Check and time resize-then-composite against composite-then-resize on RGBA images
+
+    Compositing is linear in the premultiplied colours, so both paths agree
+    up to rounding and the clipping of LANCZOS ringing at hard alpha edges;
+    the result reports the mean PSNR, the largest per-channel difference and
+    the share of channel values off by more than 2, next to both timings.
+
+    Args:
+        count: Number of RGBA images
+        size: Source image size
+        target_size: Target size for resized images
+        background: Background colour (red, green, blue)
+        seed: Seed for the image generator
+
+    Returns:
+        Dictionary with per-path timings, the speedup and the difference statistics
+    """
+    rng = random.Random(seed)
+    images = []
+    for _ in range(count):
+        data, _ = synthetic_image('rgba', size, rng)
+        with Image.open(io.BytesIO(data)) as img:
+            img.load()
+            images.append(img)
+
+    start = time.perf_counter()
+    reference = [flatten_then_resize(img, target_size, background) for img in images]
+    reference_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    candidate = [composite_background(premultiply_alpha(img).resize(target_size, Image.Resampling.LANCZOS),
+                                      background) for img in images]
+    candidate_seconds = time.perf_counter() - start
+
+    diffs = [ImageChops.difference(old, new) for old, new in zip(reference, candidate)]
+    max_diff = max(max(high for _, high in diff.getextrema()) for diff in diffs)
+    off = sum(sum(diff.histogram()[256 * band + 3:256 * (band + 1)]) for diff in diffs for band in range(3))
+    values = sum(diff.size[0] * diff.size[1] * 3 for diff in diffs)
+    scores = [psnr(old, new) for old, new in zip(reference, candidate)]
+
+    return {
+        'images': count,
+        'reference_seconds': reference_seconds,
+        'premultiplied_seconds': candidate_seconds,
+        'speedup': reference_seconds / candidate_seconds if candidate_seconds else 0.0,
+        'max_diff': max_diff,
+        'off_by_more_than_2': off / values if values else 0.0,
+        'psnr_db': sum(scores) / len(scores) if scores else 0.0,
+    }
+
+
+def generate_duplicates_zip(zip_path: str, count: int, copies: int, size=(1024, 768), seed: int = 0) -> dict:
+    """
+    Write a ZIP archive of distinct images plus near-duplicate copies of some of them
+
+    Distinct images are upscaled random 8x8 grids, so their coarse structure
+    differs the way unrelated photos do. Copies are downscaled, recompressed
+    or brightened versions of a random original. Originals live under
+    ``a_original/`` and copies under ``b_copy/``: discovery sorts members by
+    name, and the first image of a duplicate group is the one kept.
+
+    Args:
+        zip_path: Path of the ZIP file to create
+        count: Number of distinct images
+        copies: Number of near-duplicate copies
+        size: Size of the distinct images
+        seed: Seed for the image generator
+
+    Returns:
+        Mapping of copy member name to the member name of its original
+    """
+    rng = random.Random(seed)
+    originals = []
+    expected = {}
+
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_STORED) as zip_ref:
+        for i in range(count):
+            grid = Image.frombytes('RGB', (8, 8), bytes(rng.randrange(256) for _ in range(192)))
+            img = Image.merge('RGB', [band.resize(size, Image.Resampling.BICUBIC) for band in grid.split()])
+            buffer = io.BytesIO()
+            img.save(buffer, format='JPEG', quality=90)
+            name = f"a_original/img_{i:06d}.jpg"
+            zip_ref.writestr(name, buffer.getvalue())
+            originals.append((name, img))
+
+        for i in range(copies):
+            name, img = rng.choice(originals)
+            edit = i % 3
+            if edit == 0:
+                img = img.resize((size[0] // 2, size[1] // 2), Image.Resampling.BILINEAR)
+            elif edit == 2:
+                img = img.point(lambda value: min(255, value + 20))
+            buffer = io.BytesIO()
+            img.save(buffer, format='JPEG', quality=60 if edit == 1 else 85)
+            copy_name = f"b_copy/img_{i:06d}.jpg"
+            zip_ref.writestr(copy_name, buffer.getvalue())
+            expected[copy_name] = name
+
+    return expected
+
+
+def bench_dedup(count: int = 200, copies: int = 50, threshold: int = DEFAULT_THRESHOLD,
+                index_sizes: Sequence[int] = (1000, 5000, 100000), seed: int = 0) -> dict:
+    """
+    Check duplicate detection on generated data and time the hash index
+
+    The detection part hashes an archive of distinct images and edited
+    copies and counts copies found (recall) and distinct images reported as
+    duplicates (false positives). The index part times ``find_duplicates`` on
+    random hashes against a brute-force pairwise scan, which is quadratic and
+    therefore only run up to 5,000 hashes.
+
+    Args:
+        count: Number of distinct images
+        copies: Number of near-duplicate copies
+        threshold: Maximum Hamming distance between duplicates
+        index_sizes: Numbers of random hashes to time the index with
+        seed: Seed for the generators
+
+    Returns:
+        Dictionary with detection counts, the hashing time and one timing row per index size
+    """
+    work_dir = tempfile.mkdtemp(prefix="bench_dedup_")
+    try:
+        zip_path = os.path.join(work_dir, "duplicates.zip")
+        expected = generate_duplicates_zip(zip_path, count, copies, seed=seed)
+        processor = ImageProcessor(workers=1)
+        members = processor.list_zip_images(zip_path)
+
+        start = time.perf_counter()
+        hashes = processor.hash_images(members, zip_path)
+        hash_seconds = time.perf_counter() - start
+        found = find_duplicates(hashes, threshold)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    detected = {members[i]: members[original] for i, (original, _) in found.items()}
+    result = {
+        'images': len(members),
+        'copies': copies,
+        'found': sum(1 for name, original in expected.items() if detected.get(name) == original),
+        'false_positives': sum(1 for name in detected if name not in expected),
+        'hash_ms_per_image': hash_seconds / len(members) * 1000 if members else 0.0,
+        'index': [],
+    }
+
+    rng = random.Random(seed)
+    for size in index_sizes:
+        values = [rng.getrandbits(64) for _ in range(size)]
+        start = time.perf_counter()
+        find_duplicates(values, threshold)
+        row = {'hashes': size, 'index_seconds': time.perf_counter() - start, 'brute_force_seconds': None}
+
+        if size <= 5000:
+            start = time.perf_counter()
+            originals = []
+            for value in values:
+                if not any(hamming_distance(value, other) <= threshold for other in originals):
+                    originals.append(value)
+            row['brute_force_seconds'] = time.perf_counter() - start
+        result['index'].append(row)
+
+    return result
+
+
+def bench_resamplers(count: int = 8, source=(4000, 3000), target_size=(224, 224), repeat: int = 3,
+                     resamplers: Optional[Sequence[str]] = None) -> List[dict]:
+    """
+    Time every available resampling backend with each of its filters
+
+    Only the resize is timed, on images that are already decoded, so the
+    numbers compare the engines rather than decoding or encoding. Every
+    backend is checked against Pillow with the same filter (see
+    ``utils.resamplers.check_parity``).
+
+    Args:
+        count: Number of source images
+        source: Size of the source images
+        target_size: Output size
+        repeat: Runs per combination; the fastest is reported
+        resamplers: Backends to time (default: all available)
+
+    Returns:
+        One row per backend and filter
+    """
+    images = [Image.merge('RGB', [Image.effect_noise(source, 30 + 10 * i) for _ in range(3)]) for i in range(count)]
+    rows = []
+
+    for name in resamplers or available_resamplers():
+        backend = get_resampler(name)
+        for resample in backend.filters:
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                for img in images:
+                    backend.resize(img, target_size, resample)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            parity = check_parity(name, resample)
+            rows.append({
+                'resampler': name,
+                'filter': resample,
+                'ms_per_image': best / count * 1000,
+                'megapixels_per_sec': count * source[0] * source[1] / 1e6 / best if best else 0.0,
+                'psnr_db': parity['psnr'],
+                'ok': parity['ok'],
+            })
+
+    return rows
+
+
+def generate_skewed_zip(zip_path: str, small: int, large: int, small_size=(320, 240),
+                        large_size=(4000, 3000), seed: int = 0) -> str:
+    """
+    Write a ZIP archive of many small JPEGs followed by a few large noisy PNG scans
+
+    The large images sort after the small ones, which is the worst case for
+    dispatching work in input order.
+
+    Args:
+        zip_path: Path of the ZIP file to create
+        small: Number of small images
+        large: Number of large images
+        small_size: Size of the small images
+        large_size: Size of the large images
+        seed: Seed for the image generator
+
+    Returns:
+        ``zip_path``
+    """
+    rng = random.Random(seed)
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_STORED) as zip_ref:
+        for i in range(small):
+            img = Image.new('RGB', small_size, (rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+            buffer = io.BytesIO()
+            img.save(buffer, format='JPEG', quality=90)
+            zip_ref.writestr(f"a_icons/img_{i:06d}.jpg", buffer.getvalue())
+
+        for i in range(large):
+            # Noise over a gradient: compresses poorly, like a real scan
+            noise = Image.effect_noise(large_size, 48).convert('RGB')
+            gradient = Image.linear_gradient('L').resize(large_size).convert('RGB')
+            buffer = io.BytesIO()
+            Image.blend(noise, gradient, 0.5).save(buffer, format='PNG', compress_level=1)
+            zip_ref.writestr(f"z_scans/scan_{i:03d}.png", buffer.getvalue())
+
+    return zip_path
+
+
+def simulate_makespan(chunks: List[list], costs: Sequence[float], workers: int, split: bool) -> float:
+    """
+    Finish time of a chunk plan on ``workers`` ideal workers, in cost units
+
+    Replays the dispatch loop of ``ImageProcessor._run_parallel`` without
+    running anything: the first worker to free up takes the next chunk from
+    a ``ChunkQueue``, and each chunk takes the sum of its estimated costs.
+    Unlike wall-clock times this does not depend on how many cores the
+    benchmark machine has.
+    """
+    queue = ChunkQueue(chunks, split)
+    free_at = [0.0] * workers
+    while queue:
+        now = min(free_at)
+        worker = free_at.index(now)
+        idle = sum(1 for t in free_at if t <= now) - 1
+        free_at[worker] = now + sum(costs[i] for i, _, _ in queue.take(idle))
+    return max(free_at)
+
+
+def bench_schedule(zip_path: str, work_dir: str, workers: int = 4) -> dict:
+    """
+    Compare in-order and cost-based dispatch on the same archive
+
+    Completion times are taken from the progress callback, so they include
+    everything the parent sees: scheduling, pool round trips and writing.
+    Both runs must produce the same entries with the same bytes; dispatch
+    order must not change output numbering.
+
+    Each row also has the makespan the plan gives on ideal workers (see
+    ``simulate_makespan``) relative to the lower bound, the larger of the
+    total cost spread evenly and the most expensive image. On a machine
+    with fewer cores than ``workers`` the wall-clock numbers mostly measure
+    time slicing, the simulated ratio still shows how good the plan is.
+
+    Args:
+        zip_path: Archive to process (see ``generate_skewed_zip``)
+        work_dir: Scratch directory for the output archives
+        workers: Worker processes
+
+    Returns:
+        Dictionary with a row per schedule and whether the outputs match
+    """
+    result = {'rows': [], 'identical': None}
+    outputs = []
+
+    planner = ImageProcessor(workers=workers)
+    image_files = planner.list_zip_images(zip_path)
+    tasks = [(i, name, name) for i, name in enumerate(image_files)]
+    costs = planner.estimate_costs(image_files, planner.get_source_sizes(image_files, zip_path), zip_path)
+    lower_bound = max(sum(costs) / workers, max(costs, default=0.0)) or 1.0
+    plans = {
+        'order': (fixed_chunks(tasks, max(1, min(32, len(tasks) // (workers * 4)))), False),
+        'cost': (plan_chunks(tasks, costs, workers), True),
+    }
+
+    for schedule in SCHEDULES[::-1]:
+        processor = ImageProcessor(workers=workers, schedule=schedule)
+        chunks, split = plans[schedule]
+        output_zip = os.path.join(work_dir, f"schedule_{schedule}.zip")
+        finished = []
+
+        def progress_callback(current, total):
+            finished.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        _, successful, failed = processor.resize_images_to_zip(image_files, output_zip, zip_path=zip_path,
+                                                              progress_callback=progress_callback)
+        elapsed = time.perf_counter() - start
+
+        with zipfile.ZipFile(output_zip) as zip_ref:
+            outputs.append({name: zip_ref.read(name) for name in zip_ref.namelist()})
+        os.remove(output_zip)
+
+        result['rows'].append({
+            'schedule': schedule,
+            'images': len(image_files),
+            'successful': successful,
+            'failed': failed,
+            'seconds': elapsed,
+            'p50': percentile(finished, 0.50),
+            'p90': percentile(finished, 0.90),
+            'p99': percentile(finished, 0.99),
+            # Time the batch spends finishing its last tenth of the images
+            'tail_seconds': elapsed - percentile(finished, 0.90),
+            'simulated_ratio': simulate_makespan(chunks, costs, workers, split) / lower_bound,
+        })
+
+    result['identical'] = outputs[0] == outputs[1]
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the bulk resize pipeline")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    ingest = subparsers.add_parser('ingest', help="Compare extract-to-disk and streaming ZIP ingest")
+    ingest.add_argument('--counts', type=int, nargs='+', default=[1000, 10000, 50000],
+                        help="Archive sizes (number of images) to benchmark")
+    ingest.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+
+    discovery = subparsers.add_parser('discovery', help="Time listing the images of archives with many entries")
+    discovery.add_argument('--counts', type=int, nargs='+', default=[10000, 100000],
+                           help="Archive sizes (number of images) to list")
+
+    fast = subparsers.add_parser('fast-resize', help="Compare full-quality and fast (draft/reducing_gap) resizing")
+    fast.add_argument('--count', type=int, default=20, help="Number of 24 MP photos to resize")
+    fast.add_argument('--size', type=int, nargs=2, default=[224, 224], metavar=('WIDTH', 'HEIGHT'),
+                      help="Target size")
+
+    encoders = subparsers.add_parser('encoders', help="Compare encode time, size and PSNR per output format "
+                                                      "and encoder preset")
+    encoders.add_argument('--count', type=int, default=40, help="Number of images in the generated dataset")
+    encoders.add_argument('--resolutions', default="1280x960", help="Source resolutions, e.g. '640x480, 1920x1080'")
+    encoders.add_argument('--size', type=int, nargs=2, default=[224, 224], metavar=('WIDTH', 'HEIGHT'),
+                          help="Target size")
+    encoders.add_argument('--formats', nargs='+', type=str.upper, choices=available_output_formats(),
+                          default=None, help="Output formats (default: all supported)")
+    encoders.add_argument('--seed', type=int, default=0, help="Seed for the dataset generator")
+
+    alpha = subparsers.add_parser('alpha', help="Check premultiplied resize-then-composite against the "
+                                                "full-resolution flatten and time both")
+    alpha.add_argument('--count', type=int, default=20, help="Number of RGBA images")
+    alpha.add_argument('--source', type=int, nargs=2, default=[2000, 1500], metavar=('WIDTH', 'HEIGHT'),
+                       help="Source image size")
+    alpha.add_argument('--size', type=int, nargs=2, default=[224, 224], metavar=('WIDTH', 'HEIGHT'),
+                       help="Target size")
+    alpha.add_argument('--background', default="#ffffff", help="Background colour")
+    alpha.add_argument('--min-psnr', type=float, default=40.0,
+                       help="Lowest mean PSNR in dB accepted as matching (exit status 1 below it)")
+
+    dedup = subparsers.add_parser('dedup', help="Check near-duplicate detection and time the hash index "
+                                                "against a brute-force scan")
+    dedup.add_argument('--count', type=int, default=200, help="Number of distinct images")
+    dedup.add_argument('--copies', type=int, default=50, help="Number of edited copies")
+    dedup.add_argument('--threshold', type=int, default=DEFAULT_THRESHOLD, help="Maximum hash distance")
+    dedup.add_argument('--index-sizes', type=int, nargs='+', default=[1000, 5000, 100000],
+                       help="Numbers of random hashes to time the index with")
+    dedup.add_argument('--seed', type=int, default=0, help="Seed for the generators")
+
+    schedule = subparsers.add_parser('schedule', help="Compare tail latency of in-order and cost-based dispatch "
+                                                      "on a skewed dataset")
+    schedule.add_argument('--small', type=int, default=400, help="Number of small images")
+    schedule.add_argument('--large', type=int, default=4, help="Number of large images, sorted last")
+    schedule.add_argument('--large-size', type=int, nargs=2, default=[4000, 3000], metavar=('WIDTH', 'HEIGHT'),
+                          help="Size of the large images")
+    schedule.add_argument('--workers', type=int, default=4, help="Worker processes (default: 4)")
+    schedule.add_argument('--seed', type=int, default=0, help="Seed for the dataset generator")
+
+    resamplers = subparsers.add_parser('resamplers', help="Time each resampling backend and filter and check "
+                                                          "it against Pillow")
+    resamplers.add_argument('--count', type=int, default=8, help="Number of source images")
+    resamplers.add_argument('--source', type=int, nargs=2, default=[4000, 3000], metavar=('WIDTH', 'HEIGHT'),
+                            help="Size of the source images")
+    resamplers.add_argument('--size', type=int, nargs=2, default=[224, 224], metavar=('WIDTH', 'HEIGHT'),
+                            help="Target size")
+    resamplers.add_argument('--resamplers', nargs='+', choices=available_resamplers(), default=None,
+                            help="Backends to time (default: all available)")
+
+    metadata = subparsers.add_parser('metadata', help="Compare a separate orientation/colour correction pass "
+                                                      "with single-pass EXIF and ICC handling")
+    metadata.add_argument('--count', type=int, default=16, help="Number of phone photos (orientations 1-8)")
+    metadata.add_argument('--source', type=int, nargs=2, default=[4032, 3024], metavar=('WIDTH', 'HEIGHT'),
+                          help="Stored size of the photos")
+    metadata.add_argument('--size', type=int, nargs=2, default=[224, 224], metavar=('WIDTH', 'HEIGHT'),
+                          help="Target size")
+    metadata.add_argument('--min-psnr', type=float, default=35.0,
+                          help="Lowest PSNR against the two-pass result that counts as matching")
+
+    suite = subparsers.add_parser('suite', help="Time every pipeline stage on generated datasets")
+    suite.add_argument('--counts', type=int, nargs='+', default=[100, 1000], help="Dataset sizes")
+    suite.add_argument('--kinds', nargs='+', choices=DATASET_KINDS + MIXED_MODE_KINDS, default=list(DATASET_KINDS),
+                       help="Image kinds in the dataset")
+    suite.add_argument('--resolutions', default="320x240, 1280x960",
+                       help="Source resolutions, e.g. '320x240, 1920x1080'")
+    suite.add_argument('--size', type=int, nargs=2, default=[224, 224], metavar=('WIDTH', 'HEIGHT'),
+                       help="Target size")
+    suite.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    suite.add_argument('--seed', type=int, default=0, help="Seed for the dataset generator")
+    suite.add_argument('--output', default=None, help="Write results as JSON to this file")
+    suite.add_argument('--compare', default=None, help="Previous JSON results to compare against")
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'alpha':
+        result = bench_alpha(args.count, tuple(args.source), tuple(args.size), parse_color(args.background))
+        ok = result['psnr_db'] >= args.min_psnr
+        print(f"full-res flatten: {result['reference_seconds']:.2f} s | "
+              f"premultiplied: {result['premultiplied_seconds']:.2f} s | speedup x{result['speedup']:.2f}")
+        print(f"PSNR {result['psnr_db']:.2f} dB | max diff {result['max_diff']} | "
+              f"{result['off_by_more_than_2']:.2%} of values off by more than 2 | {'OK' if ok else 'MISMATCH'}")
+        return 0 if ok else 1
+
+    if args.command == 'resamplers':
+        rows = bench_resamplers(args.count, tuple(args.source), tuple(args.size), resamplers=args.resamplers)
+        for row in rows:
+            parity = "identical" if math.isinf(row['psnr_db']) else f"{row['psnr_db']:.1f} dB"
+            print(f"{row['resampler']:<11} {row['filter']:<8} | {row['ms_per_image']:7.1f} ms/image | "
+                  f"{row['megapixels_per_sec']:7.1f} MP/s | PSNR vs Pillow {parity} | "
+                  f"{'OK' if row['ok'] else 'MISMATCH'}")
+        return 0 if all(row['ok'] for row in rows) else 1
+
+    if args.command == 'dedup':
+        result = bench_dedup(args.count, args.copies, args.threshold, args.index_sizes, args.seed)
+        ok = result['found'] == result['copies'] and not result['false_positives']
+        print(f"{result['images']} images: {result['found']}/{result['copies']} copies found, "
+              f"{result['false_positives']} false positives, {result['hash_ms_per_image']:.1f} ms/image to hash | "
+              f"{'OK' if ok else 'MISMATCH'}")
+        for row in result['index']:
+            brute = row['brute_force_seconds']
+            print(f"{row['hashes']:>8} hashes: index {row['index_seconds']:.3f} s | brute force "
+                  f"{'-' if brute is None else f'{brute:.3f} s'}")
+        return 0 if ok else 1
+
+    if args.command == 'suite':
+        results = run_suite(args.counts, args.kinds, parse_sizes(args.resolutions), args.workers,
+                            tuple(args.size), args.seed)
+        print_suite(results)
+
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(results, f, indent=2)
+
+        if args.compare:
+            with open(args.compare) as f:
+                baseline = json.load(f)
+            print("\nCompared to", args.compare)
+            for row in compare_results(baseline, results):
+                print(f"  {row['count']:>7} {row['stage']:<20} {row['before']:8.1f} -> "
+                      f"{row['after']:8.1f} img/s (x{row['ratio']:.2f})")
+        return
+
+    with tempfile.TemporaryDirectory(prefix="resize_bench_") as work_dir:
+        if args.command == 'encoders':
+            zip_path = os.path.join(work_dir, "dataset.zip")
+            generate_dataset_zip(zip_path, args.count, DATASET_KINDS + MIXED_MODE_KINDS,
+                                 resolutions=parse_sizes(args.resolutions), seed=args.seed)
+            for row in bench_encoders(zip_path, tuple(args.size), args.formats):
+                print(f"{row['format']:<5} {row['preset']:<9} | {row['encode_ms_per_image']:7.1f} ms/image | "
+                      f"{row['kb_per_image']:7.1f} KB/image | PSNR {row['psnr_db']:6.2f} dB | "
+                      f"{row['failed']} failed")
+            return
+
+        if args.command == 'discovery':
+            for count in args.counts:
+                zip_path = generate_synthetic_zip(os.path.join(work_dir, f"discovery_{count}.zip"), count,
+                                                  size=(32, 32))
+                result = bench_discovery(zip_path)
+                print(f"{result['entries']:>8} entries | " + " | ".join(
+                    f"{name} {result[name]['seconds']:.3f} s ({result[name]['images']} images)"
+                    for name in ('legacy', 'central_directory', 'sniff')))
+                os.remove(zip_path)
+            return
+
+        if args.command == 'schedule':
+            zip_path = generate_skewed_zip(os.path.join(work_dir, "skewed.zip"), args.small, args.large,
+                                           large_size=tuple(args.large_size), seed=args.seed)
+            result = bench_schedule(zip_path, work_dir, args.workers)
+            for row in result['rows']:
+                print(f"{row['schedule']:<5} | {row['seconds']:6.2f} s | p50 {row['p50']:6.2f} s | "
+                      f"p90 {row['p90']:6.2f} s | p99 {row['p99']:6.2f} s | tail {row['tail_seconds']:6.2f} s | "
+                      f"simulated x{row['simulated_ratio']:.2f} of optimum | {row['successful']}/{row['images']} ok")
+            print("outputs identical" if result['identical'] else "outputs DIFFER")
+            return 0 if result['identical'] else 1
+
+        if args.command == 'metadata':
+            zip_path = generate_phone_zip(os.path.join(work_dir, "phone.zip"), args.count, tuple(args.source))
+            result = bench_metadata(zip_path, tuple(args.size))
+            for row in result['rows']:
+                encode = f" | encode {row['encode_ms_per_image']:5.1f} ms/image" if 'encode_ms_per_image' in row else ""
+                print(f"{row['variant']:<9} | {row['ms_per_image']:7.1f} ms/image | "
+                      f"{row['kb_per_image']:6.1f} KB/image{encode}")
+            ok = result['psnr_db'] >= args.min_psnr
+            print(f"single pass vs two-pass: lowest PSNR {result['psnr_db']:.1f} dB | {'OK' if ok else 'MISMATCH'}")
+            return 0 if ok else 1
+
+        if args.command == 'fast-resize':
+            zip_path = generate_photo_zip(os.path.join(work_dir, "photos.zip"), args.count)
+            result = bench_fast_resize(zip_path, tuple(args.size))
+            print(f"full: {result['full_images_per_sec']:.2f} img/s | "
+                  f"fast: {result['fast_images_per_sec']:.2f} img/s | "
+                  f"speedup x{result['speedup']:.2f} | PSNR {result['psnr_db']:.2f} dB")
+            return
+
+        for count in args.counts:
+            zip_path = generate_synthetic_zip(os.path.join(work_dir, f"synthetic_{count}.zip"), count)
+            for result in bench_ingest(zip_path, work_dir, args.workers):
+                print(f"{count:>7} images | {result['path']:<7} | {result['seconds']:8.2f} s | "
+                      f"{result['images_per_sec']:8.1f} img/s | "
+                      f"peak disk {result['peak_disk_bytes'] / (1024 * 1024):8.1f} MB")
+            os.remove(zip_path)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""
+Result Cache for Bulk Image Resizer
+Content-addressed on-disk cache of encoded resize results with LRU eviction
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from typing import Optional
+
+
+class ResultCache:
+    def __init__(self, cache_dir: str = "cache", max_bytes: int = 1024 * 1024 * 1024):
+        """
+        Initialize ResultCache
+
+        Entries are keyed by the hash of the source bytes plus the resize and
+        encode parameters, so the same image uploaded again (under any name)
+        is served without decoding or encoding it. Recency is tracked through
+        file modification times, which keeps the LRU order across restarts
+        and lets worker processes share the cache without coordination.
+
+        Args:
+            cache_dir: Directory to store cached results in
+            max_bytes: Size budget; ``evict`` trims least recently used entries beyond it
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def hash_source(self, source) -> str:
+        """
+        Hash the bytes of a source image
+
+        Args:
+            source: Seekable binary file object with the source image; it is rewound afterwards
+
+        Returns:
+            Hex digest of the source bytes
+        """
+        digest = hashlib.blake2b(digest_size=20)
+        for block in iter(lambda: source.read(1024 * 1024), b''):
+            digest.update(block)
+        source.seek(0)
+        return digest.hexdigest()
+
+    def make_key(self, source_hash: str, params: dict) -> str:
+        """
+        Build the cache key for a source image and its processing parameters
+
+        Args:
+            source_hash: Digest from ``hash_source``
+            params: Resize/encode parameters that influence the output
+
+        Returns:
+            Hex digest identifying the result
+        """
+        digest = hashlib.blake2b(source_hash.encode(), digest_size=20)
+        digest.update(json.dumps(params, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key[2:])
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Look up a cached result and mark it as recently used
+
+        Args:
+            key: Cache key from ``make_key``
+
+        Returns:
+            Cached bytes, or None on a miss
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes) -> bool:
+        """
+        Store a result; concurrent writers of the same key are harmless
+
+        Args:
+            key: Cache key from ``make_key``
+            data: Encoded image bytes
+
+        Returns:
+            True if successful, False otherwise
+        """
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            return True
+        except Exception as e:
+            print(f"Error writing cache entry {key}: {str(e)}")
+            return False
+
+    def size(self) -> int:
+        """Return the total size in bytes of all cached entries"""
+        return sum(size for _, _, size in self._entries())
+
+    def _entries(self):
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith('.tmp'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                yield entry.path, stat.st_mtime, stat.st_size
+
+    def evict(self) -> int:
+        """
+        Delete least recently used entries until the cache fits ``max_bytes``
+
+        Returns:
+            Number of entries removed
+        """
+        entries = sorted(self._entries(), key=lambda entry: entry[1])
+        total = sum(size for _, _, size in entries)
+        removed = 0
+
+        for path, _, size in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                removed += 1
+            except OSError:
+                continue
+
+        return removed
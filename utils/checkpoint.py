@@ -0,0 +1,308 @@
+"""
+Checkpoints for Bulk Image Resizer
+Resumable job directories with segmented output parts, a manifest of completed
+entries, heartbeats and the retention sweep for temporary files
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+import zipfile
+from typing import Dict, Iterable, List, Optional, Set
+
+from utils.writers import ZipStreamWriter
+
+
+MANIFEST_FILE = 'manifest.jsonl'
+SETTINGS_FILE = 'job.json'
+HEARTBEAT_FILE = 'heartbeat'
+PARTS_DIR = 'parts'
+
+# A job whose heartbeat is older than this is considered interrupted
+HEARTBEAT_STALE_SECONDS = 300
+
+
+def job_key(source, settings: dict) -> str:
+    """
+    Identify a job by its input bytes and settings
+
+    Uploading the same archive again with the same settings yields the same
+    key, which is what lets an interrupted job be found and resumed.
+
+    Args:
+        source: Seekable binary file object with the input archive; it is rewound afterwards
+        settings: JSON serializable settings that influence the output
+
+    Returns:
+        Short hex digest
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    source.seek(0)
+    for block in iter(lambda: source.read(1024 * 1024), b''):
+        digest.update(block)
+    source.seek(0)
+    digest.update(json.dumps(settings, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def touch_heartbeat(job_dir: str):
+    """Mark a job directory as in use right now"""
+    with open(os.path.join(job_dir, HEARTBEAT_FILE), 'a'):
+        pass
+    os.utime(os.path.join(job_dir, HEARTBEAT_FILE))
+
+
+def is_active(job_dir: str, stale_after: float = HEARTBEAT_STALE_SECONDS) -> bool:
+    """True if the job in ``job_dir`` sent a heartbeat within ``stale_after`` seconds"""
+    try:
+        return time.time() - os.path.getmtime(os.path.join(job_dir, HEARTBEAT_FILE)) < stale_after
+    except OSError:
+        return False
+
+
+def is_resumable(job_dir: str) -> bool:
+    """True if ``job_dir`` holds a manifest of completed work that a rerun can pick up"""
+    return os.path.exists(os.path.join(job_dir, MANIFEST_FILE))
+
+
+def sweep(directories: Iterable[str], retention_seconds: float = 3600,
+          resume_retention_seconds: float = 24 * 3600,
+          stale_after: float = HEARTBEAT_STALE_SECONDS) -> int:
+    """
+    Remove expired temporary files and job directories
+
+    Retention policy, by entry:
+
+    - directories with a fresh heartbeat (running jobs) are never removed;
+    - interrupted jobs with a manifest are kept for ``resume_retention_seconds``
+      after their last heartbeat, so they can still be resumed;
+    - everything else is removed ``retention_seconds`` after its last modification.
+
+    Args:
+        directories: Directories whose direct children are swept (e.g. ``uploads``, ``outputs``)
+        retention_seconds: Lifetime of finished jobs and output files
+        resume_retention_seconds: Lifetime of interrupted, resumable jobs
+        stale_after: Heartbeat age after which a job no longer counts as running
+
+    Returns:
+        Number of entries removed
+    """
+    now = time.time()
+    removed = 0
+
+    for directory in directories:
+        if not os.path.isdir(directory):
+            continue
+        for entry in os.scandir(directory):
+            try:
+                if entry.is_dir():
+                    if is_active(entry.path, stale_after):
+                        continue
+                    if is_resumable(entry.path):
+                        heartbeat = os.path.join(entry.path, HEARTBEAT_FILE)
+                        last_seen = os.path.getmtime(heartbeat) if os.path.exists(heartbeat) \
+                            else entry.stat().st_mtime
+                        if now - last_seen > resume_retention_seconds:
+                            shutil.rmtree(entry.path)
+                            removed += 1
+                    elif now - entry.stat().st_mtime > retention_seconds:
+                        shutil.rmtree(entry.path)
+                        removed += 1
+                elif now - entry.stat().st_mtime > retention_seconds:
+                    os.remove(entry.path)
+                    removed += 1
+            except OSError as e:
+                print(f"Error removing {entry.path}: {str(e)}")
+
+    return removed
+
+
+class CheckpointWriter:
+    def __init__(self, job_dir: str, settings: Optional[dict] = None, checkpoint_entries: int = 256,
+                 checkpoint_bytes: int = 64 * 1024 * 1024, heartbeat_interval: float = 5.0):
+        """
+        Initialize CheckpointWriter
+
+        An output writer (see ``utils.writers``) that appends entries to a
+        sequence of part archives in ``job_dir``. Every ``checkpoint_entries``
+        entries or ``checkpoint_bytes`` bytes the current part is closed and
+        its entry names are appended to the manifest, so a crash loses at most
+        one part. ``merge`` combines the parts into the final archive.
+
+        A job directory left by a run with different ``settings`` is reset.
+
+        Args:
+            job_dir: Directory holding the manifest, parts and heartbeat
+            settings: JSON serializable settings the checkpoint is only valid for
+            checkpoint_entries: Entries per part
+            checkpoint_bytes: Bytes per part
+            heartbeat_interval: Minimum seconds between heartbeat updates
+        """
+        self.job_dir = job_dir
+        self.checkpoint_entries = checkpoint_entries
+        self.checkpoint_bytes = checkpoint_bytes
+        self.heartbeat_interval = heartbeat_interval
+        self.bytes_written = 0
+        self._parts_dir = os.path.join(job_dir, PARTS_DIR)
+        self._manifest_path = os.path.join(job_dir, MANIFEST_FILE)
+        self._part = None
+        self._part_name = None
+        self._pending: List[str] = []
+        self._pending_bytes = 0
+        self._last_heartbeat = 0.0
+
+        os.makedirs(self._parts_dir, exist_ok=True)
+        self._reset_if_changed(settings or {})
+        self.parts = self._load_manifest()
+        self._discard_uncommitted_parts()
+        self._heartbeat(force=True)
+
+    def _reset_if_changed(self, settings: dict):
+        settings_path = os.path.join(self.job_dir, SETTINGS_FILE)
+        try:
+            with open(settings_path) as f:
+                previous = json.load(f)
+        except (OSError, ValueError):
+            previous = None
+
+        if previous != settings:
+            if os.path.exists(self._manifest_path):
+                os.remove(self._manifest_path)
+            shutil.rmtree(self._parts_dir, ignore_errors=True)
+            os.makedirs(self._parts_dir, exist_ok=True)
+            with open(settings_path, 'w') as f:
+                json.dump(settings, f, sort_keys=True)
+
+    def _load_manifest(self) -> Dict[str, List[str]]:
+        parts = {}
+        torn = False
+        try:
+            with open(self._manifest_path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        torn = True  # Final line cut short by a crash; its part is discarded
+                        break
+                    parts[record['part']] = record['entries']
+        except OSError:
+            return parts
+
+        if torn:
+            # Rewrite without the torn line so later appends start on a clean line
+            with open(self._manifest_path + '.tmp', 'w') as f:
+                for part, entries in parts.items():
+                    f.write(json.dumps({'part': part, 'entries': entries}) + "\n")
+            os.replace(self._manifest_path + '.tmp', self._manifest_path)
+        return parts
+
+    def _discard_uncommitted_parts(self):
+        for name in os.listdir(self._parts_dir):
+            if name not in self.parts:
+                os.remove(os.path.join(self._parts_dir, name))
+
+    def _heartbeat(self, force: bool = False):
+        now = time.time()
+        if force or now - self._last_heartbeat >= self.heartbeat_interval:
+            touch_heartbeat(self.job_dir)
+            self._last_heartbeat = now
+
+    def completed_entries(self) -> Set[str]:
+        """Entry names written by earlier runs and committed to the manifest"""
+        return {name for entries in self.parts.values() for name in entries}
+
+    def target(self, name: str) -> str:
+        """Return the entry name ``write`` produces for ``name``"""
+        return name
+
+    def write(self, name: str, data: bytes) -> str:
+        """
+        Append one encoded image to the current part
+
+        Args:
+            name: Name of the entry in the final archive
+            data: Encoded image bytes
+
+        Returns:
+            Name of the written entry
+        """
+        if self._part is None:
+            self._part_name = f"part_{len(self.parts):05d}.zip"
+            self._part = ZipStreamWriter(os.path.join(self._parts_dir, self._part_name))
+
+        self._part.write(name, data)
+        self._pending.append(name)
+        self._pending_bytes += len(data)
+        self.bytes_written += len(data)
+        self._heartbeat()
+
+        if len(self._pending) >= self.checkpoint_entries or self._pending_bytes >= self.checkpoint_bytes:
+            self.checkpoint()
+        return name
+
+    def checkpoint(self):
+        """Close the current part and commit its entries to the manifest"""
+        if self._part is None:
+            return
+
+        self._part.close()
+        with open(self._manifest_path, 'a') as f:
+            f.write(json.dumps({'part': self._part_name, 'entries': self._pending}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.parts[self._part_name] = self._pending
+        self._part = None
+        self._pending = []
+        self._pending_bytes = 0
+        self._heartbeat(force=True)
+
+    def merge(self, output_zip_path: str, names: Optional[List[str]] = None, store_compressed: bool = True) -> int:
+        """
+        Combine the committed parts into one archive
+
+        Args:
+            output_zip_path: Path of the final ZIP file
+            names: Entry names in the order they should appear (default: part order)
+            store_compressed: Store already-compressed formats without DEFLATE
+
+        Returns:
+            Number of entries written
+        """
+        location = {name: part for part, entries in self.parts.items() for name in entries}
+        if names is None:
+            names = [name for entries in self.parts.values() for name in entries]
+
+        handles = {}
+        try:
+            with ZipStreamWriter(output_zip_path, store_compressed=store_compressed) as writer:
+                for name in names:
+                    part = location[name]
+                    if part not in handles:
+                        handles[part] = zipfile.ZipFile(os.path.join(self._parts_dir, part), 'r')
+                    writer.write(name, handles[part].read(name))
+                    self._heartbeat()
+        finally:
+            for handle in handles.values():
+                handle.close()
+
+        return len(names)
+
+    def close(self):
+        """Commit the last part; the parts stay on disk until ``merge``"""
+        self.checkpoint()
+
+    def release(self):
+        """Drop the heartbeat so the job no longer counts as running (it stays resumable)"""
+        try:
+            os.remove(os.path.join(self.job_dir, HEARTBEAT_FILE))
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
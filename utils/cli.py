@@ -0,0 +1,219 @@
+"""
+Command Line Interface for Bulk Image Resizer
+Runs the resize pipeline headless, e.g. for batch jobs and benchmarks
+
+Usage:
+    python -m utils.cli INPUT OUTPUT [--size 224 224 ...] [--workers N] [--prefix NAME]
+                        [--format jpeg|png|webp|avif] [--preset fast|balanced|smallest]
+                        [--mode stretch|crop|pad|entropy] [--dedup report|skip] [--export-npy PATH]
+                        [--schedule cost|order] [--resampler pillow|pillow-simd|opencv] [--filter NAME]
+                        [--metadata strip|preserve] [--no-srgb]
+"""
+
+import argparse
+import logging
+import sys
+
+from utils.cache import ResultCache
+from utils.dedup import HASH_METHODS, HASH_SIZE
+from utils.image_processing import (DEDUP_ACTIONS, DEDUP_THRESHOLD, ENCODER_PRESET_NAMES, ImageProcessor,
+                                    METADATA_MODES, OUTPUT_EXTENSIONS, RESIZE_MODES, SCHEDULES, parse_color,
+                                    run_bulk_resize, scan_archive)
+from utils.resamplers import RESAMPLE_FILTERS, RESAMPLER_NAMES
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Create the argument parser for the CLI"""
+    parser = argparse.ArgumentParser(
+        prog="python -m utils.cli",
+        description="Resize every image in a ZIP file or directory")
+    parser.add_argument('input', help="Input ZIP file or directory")
+    parser.add_argument('output', help="Output ZIP file (*.zip) or directory")
+    parser.add_argument('--size', type=int, nargs=2, action='append', metavar=('WIDTH', 'HEIGHT'),
+                        help="Target size (default: 224 224); repeat to write one folder per size "
+                             "from a single decode")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--prefix', default="resized", help="Prefix for output filenames (default: resized)")
+    parser.add_argument('--format', dest='output_format', choices=[f.lower() for f in OUTPUT_EXTENSIONS],
+                        default=None, help="Output format (default: same as input; avif needs Pillow 11.2+)")
+    parser.add_argument('--preset', choices=ENCODER_PRESET_NAMES, default='balanced',
+                        help="Encoder effort: fast encodes quickest, smallest writes the smallest files "
+                             "(default: balanced)")
+    parser.add_argument('--background', type=parse_color, default=(255, 255, 255), metavar='COLOR',
+                        help="Colour transparent images are flattened onto, e.g. '#000000' (default: white)")
+    parser.add_argument('--mode', choices=RESIZE_MODES, default='stretch',
+                        help="Aspect ratio handling: stretch to the size, crop the centre, pad (letterbox) "
+                             "onto the background colour or crop the most detailed region (default: stretch)")
+    parser.add_argument('--dedup', choices=DEDUP_ACTIONS, default=None,
+                        help="Detect exact and near-duplicate images by perceptual hash: report lists them, "
+                             "skip also leaves them out of the output")
+    parser.add_argument('--dedup-threshold', type=int, default=DEDUP_THRESHOLD, metavar='BITS',
+                        help=f"Maximum hash distance (0-64) between duplicates (default: {DEDUP_THRESHOLD})")
+    parser.add_argument('--dedup-method', choices=HASH_METHODS, default='dhash',
+                        help="Perceptual hash used by --dedup (default: dhash)")
+    parser.add_argument('--export-npy', default=None, metavar='PATH',
+                        help="Also write the pixels of the first size as a uint8 array (images x height x "
+                             "width x 3) to this .npy file, with a CSV index of filenames and folder labels")
+    parser.add_argument('--sniff', action='store_true',
+                        help="Check the leading bytes of every image and skip files that are not JPEG/PNG")
+    parser.add_argument('--resampler', choices=RESAMPLER_NAMES, default='pillow',
+                        help="Resampling engine: pillow, pillow-simd (when it is the installed PIL) or opencv "
+                             "(INTER_AREA, needs opencv-python) (default: pillow)")
+    parser.add_argument('--filter', dest='resample_filter', choices=RESAMPLE_FILTERS, default=None,
+                        help="Resampling filter (default: lanczos for Pillow, area for OpenCV)")
+    parser.add_argument('--metadata', choices=METADATA_MODES, default='strip',
+                        help="strip leaves EXIF and ICC metadata out (smaller files), preserve copies them; "
+                             "the EXIF orientation is applied to the pixels either way (default: strip)")
+    parser.add_argument('--no-srgb', dest='to_srgb', action='store_false', default=None,
+                        help="Keep the pixels of images with a colour profile as they are instead of "
+                             "converting them to sRGB")
+    parser.add_argument('--fast', action='store_true', help="Use draft decoding and reducing_gap fast resize")
+    parser.add_argument('--schedule', choices=SCHEDULES, default='cost',
+                        help="How work is spread over the workers: cost sends the largest images first and "
+                             "batches small ones, order sends fixed-size chunks in input order (default: cost)")
+    parser.add_argument('--memory-budget', type=int, default=256, metavar='MB',
+                        help="Approximate memory for data in flight, independent of archive size (default: 256)")
+    parser.add_argument('--checkpoint-dir', default=None,
+                        help="Commit progress to this directory (ZIP output only); rerunning the same command "
+                             "after an interruption resumes instead of starting over")
+    parser.add_argument('--cache-dir', default=None, help="Enable the result cache in this directory")
+    parser.add_argument('--plan', action='store_true',
+                        help="Scan image headers first, print the plan, size the worker pool by estimated cost "
+                             "and process the largest images first")
+    parser.add_argument('--dry-run', action='store_true', help="Only scan and print the plan, do not resize")
+    parser.add_argument('--log-metrics', action='store_true',
+                        help="Emit the timing breakdown as a JSON log record on stderr")
+    parser.add_argument('--quiet', action='store_true', help="Do not print progress")
+    return parser
+
+
+def print_progress(current: int, total: int):
+    """Progress callback writing a single updating line to stderr"""
+    sys.stderr.write(f"\r{current}/{total} images")
+    if current == total:
+        sys.stderr.write("\n")
+    sys.stderr.flush()
+
+
+def print_plan(plan: dict):
+    """Print a ``scan_archive`` summary"""
+    print(f"Images:     {plan['images']} ({plan['valid']} readable, {len(plan['corrupt'])} corrupt), "
+          f"{plan['megapixels']:.1f} MP, {plan['input_bytes'] / (1024 * 1024):.1f} MB")
+    print("Formats:    " + ", ".join(f"{name} {count}" for name, count in plan['formats'].items()))
+    print("Modes:      " + ", ".join(f"{name} {count}" for name, count in plan['modes'].items()))
+    print("Resolution: " + ", ".join(f"{label} {count}" for label, count in plan['resolutions'].items() if count))
+    if plan['largest']:
+        print(f"Largest:    {plan['largest']['size'][0]}x{plan['largest']['size'][1]}  {plan['largest']['file']}")
+    if plan['estimated_seconds'] is not None:
+        print(f"Estimate:   {plan['estimated_seconds']:.1f} s with {plan['recommended_workers']} worker(s) "
+              f"({plan['seconds_per_megapixel'] * 1000:.0f} ms/MP measured)")
+    for item in plan['corrupt']:
+        print(f"Corrupt:    {item['file']}: {item['error']}")
+    for item in plan.get('skipped', []):
+        print(f"Skipped:    {item['path']}: {item['reason']}")
+
+
+def print_duplicates(report: dict):
+    """Print the duplicates report of run_bulk_resize"""
+    action = "skipped" if report['action'] == 'skip' else "found"
+    print(f"Duplicates: {report['count']} {action} in {len(report['groups'])} group(s) "
+          f"({report['method']}, distance <= {report['threshold']})")
+    for group in report['groups'][:10]:
+        print(f"  {group['original']}")
+        for member in group['duplicates']:
+            print(f"    = {member['path']} (distance {member['distance']})")
+    if len(report['groups']) > 10:
+        print(f"  ... {len(report['groups']) - 10} more group(s)")
+
+
+def main(argv=None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.log_metrics:
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if not 0 <= args.dedup_threshold <= HASH_SIZE * HASH_SIZE:
+        parser.error(f"--dedup-threshold must be between 0 and {HASH_SIZE * HASH_SIZE}")
+
+    cache = ResultCache(args.cache_dir) if args.cache_dir else None
+    sizes = [tuple(size) for size in args.size] if args.size else [(224, 224)]
+    try:
+        processor = ImageProcessor(sizes, workers=args.workers, fast_resize=args.fast,
+                                   cache=cache, output_format=args.output_format,
+                                   memory_budget=args.memory_budget * 1024 * 1024,
+                                   background_color=args.background, encoder_preset=args.preset,
+                                   resize_mode=args.mode, sniff_images=args.sniff,
+                                   schedule=args.schedule, resampler=args.resampler,
+                                   resample_filter=args.resample_filter, metadata=args.metadata,
+                                   to_srgb=args.to_srgb)
+    except ValueError as e:
+        parser.error(str(e))
+
+    try:
+        plan = None
+        if args.plan or args.dry_run:
+            plan = scan_archive(processor, args.input)
+            print_plan(plan)
+            if args.dry_run:
+                return 0
+            processor.workers = min(processor.workers, plan['recommended_workers'])
+
+        result = run_bulk_resize(processor, args.input, args.output, args.prefix,
+                                 None if args.quiet else print_progress, args.log_metrics,
+                                 checkpoint_dir=args.checkpoint_dir, scan=plan, dedup=args.dedup,
+                                 dedup_threshold=args.dedup_threshold, dedup_method=args.dedup_method,
+                                 export_path=args.export_npy)
+    except Exception as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        return 1
+
+    elapsed = result['elapsed']
+    images_per_sec = result['total_processed'] / elapsed if elapsed else 0.0
+    mb_per_sec = result['input_bytes'] / (1024 * 1024) / elapsed if elapsed else 0.0
+
+    print(f"Images:     {result['total_processed']} ({result['successful']} ok, {result['failed']} failed)")
+    if result['skipped']:
+        reasons = {}
+        for item in result['skipped']:
+            reasons[item['reason']] = reasons.get(item['reason'], 0) + 1
+        print(f"Skipped:    {len(result['skipped'])} members ("
+              + ", ".join(f"{count} {reason}" for reason, count in sorted(reasons.items())) + ")")
+    if result['resumed']:
+        print(f"Resumed:    {result['resumed']} images completed by an earlier run")
+    print(f"Time:       {elapsed:.2f} s with {processor.workers} worker(s)")
+    print(f"Throughput: {images_per_sec:.1f} images/s, {mb_per_sec:.1f} MB/s input")
+    print(f"Size:       {result['input_bytes'] / (1024 * 1024):.1f} MB in, "
+          f"{result['output_bytes'] / (1024 * 1024):.1f} MB out")
+    # Per source image, all sizes together, as on the results screen of the app;
+    # resumed images and cache hits were not encoded in this run
+    encoded = result['timings'].get('stage_images', {}).get('encode', 0)
+    encode_seconds = result['timings']['stages'].get('encode', 0.0)
+    print(f"Encode:     {processor.output_format or 'same as input'} ({args.preset}), "
+          f"{encode_seconds:.2f} s total, {encode_seconds / encoded * 1000 if encoded else 0.0:.1f} ms/image, "
+          f"{result['output_bytes'] / result['successful'] / 1024 if result['successful'] else 0.0:.1f} KB/image")
+    if cache:
+        print(f"Cache:      {result['cache_hits']} hits, {result['cache_misses']} misses")
+    if 'duplicates' in result:
+        print_duplicates(result['duplicates'])
+    if 'export' in result:
+        export = result['export']
+        print(f"Export:     {export['rows']} rows of {'x'.join(map(str, export['shape']))} uint8 in "
+              f"{export['array_path']}, index {export['index_path']}")
+
+    timings = result['timings']
+    latency = timings['latency']
+    print(f"Latency:    p50 {latency['p50'] * 1000:.1f} ms, p95 {latency['p95'] * 1000:.1f} ms, "
+          f"max {latency['max'] * 1000:.1f} ms")
+    print("Stages (cumulative):")
+    for stage, seconds in timings['stages'].items():
+        print(f"  {stage:<13} {seconds:8.2f} s")
+    if timings['slowest']:
+        print("Slowest:")
+        for item in timings['slowest']:
+            print(f"  {item['seconds'] * 1000:8.1f} ms  {item['file']}")
+
+    return 0 if result['successful'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+"""
+Duplicate Detection for Bulk Image Resizer
+Perceptual hashes of tiny grayscale decodes and a multi-index for fast
+Hamming-distance lookup of exact and near-duplicate images
+"""
+
+import math
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image
+
+
+HASH_METHODS = ('dhash', 'ahash')
+
+# Side of the hash grid; hashes have HASH_SIZE * HASH_SIZE bits
+HASH_SIZE = 8
+
+# Hamming distance (out of 64 bits) up to which two images count as duplicates.
+# 0 only matches images that look identical after the tiny decode
+DEFAULT_THRESHOLD = 4
+
+
+def perceptual_hash(img: Image.Image, method: str = 'dhash') -> int:
+    """
+    Perceptual hash of an image
+
+    The image is reduced to a tiny grayscale grid, so re-encodes, resizes and
+    small edits of the same picture produce hashes a few bits apart.
+
+    - ``ahash``: each bit tells whether a cell is brighter than the mean;
+    - ``dhash``: each bit tells whether a cell is brighter than its right
+      neighbour, which is more robust to brightness and contrast changes.
+
+    Args:
+        img: Image to hash; draft decoding it beforehand is enough
+        method: One of ``HASH_METHODS``
+
+    Returns:
+        Hash as an integer of ``HASH_SIZE * HASH_SIZE`` bits
+    """
+    if method not in HASH_METHODS:
+        raise ValueError(f"Unknown hash method: {method}")
+
+    width = HASH_SIZE + 1 if method == 'dhash' else HASH_SIZE
+    img = img.convert('L')
+    # Box-reduce most of the way first; LANCZOS on a large image is wasted on an 8x8 grid
+    factor = min(img.width // (width * 4), img.height // (HASH_SIZE * 4))
+    if factor > 1:
+        img = img.reduce(factor)
+    pixels = img.resize((width, HASH_SIZE), Image.Resampling.LANCZOS).tobytes()
+
+    value = 0
+    if method == 'dhash':
+        for row in range(HASH_SIZE):
+            for col in range(HASH_SIZE):
+                left = pixels[row * width + col]
+                value = (value << 1) | (left > pixels[row * width + col + 1])
+    else:
+        mean = sum(pixels) / len(pixels)
+        for pixel in pixels:
+            value = (value << 1) | (pixel > mean)
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two hashes"""
+    return bin(a ^ b).count('1')
+
+
+# Narrowest band the index uses; with fewer bits per band the buckets get
+# crowded on large archives and lookups degrade towards a linear scan
+MIN_BAND_BITS = 16
+
+# Number of hashes the band layout is tuned for
+INDEX_CAPACITY = 100000
+
+
+class HashIndex:
+    def __init__(self, threshold: int = DEFAULT_THRESHOLD, bits: int = HASH_SIZE * HASH_SIZE):
+        """
+        Initialize HashIndex
+
+        A multi-index over hashes for near-neighbour lookup by Hamming
+        distance. Each hash is split into ``m`` bands and every band is
+        indexed in its own dictionary. Two hashes within ``threshold`` bits of
+        each other differ in at most ``threshold // m`` bits on at least one
+        band (pigeonhole), so a lookup probes every band value within that
+        radius and only compares against the hashes found there, instead of
+        against every hash seen so far.
+
+        The number of bands is the one with the lowest expected lookup cost
+        (probes plus bucket entries at ``INDEX_CAPACITY`` hashes) among those
+        whose bands are at least ``MIN_BAND_BITS`` wide, so lookups stay cheap
+        for archives of 100,000+ images.
+
+        Probing only pays off while a lookup probes fewer band values than
+        there are hashes to compare against. Lookups scan every hash linearly
+        until the index holds more hashes than that, and at high thresholds,
+        where a lookup would probe more than ``INDEX_CAPACITY`` values, the
+        bands are never built and every lookup is a linear scan.
+
+        Args:
+            threshold: Maximum Hamming distance a lookup matches
+            bits: Number of bits per hash
+        """
+        self.threshold = threshold
+        self.bits = bits
+        bands = min(range(1, max(1, min(threshold + 1, bits // MIN_BAND_BITS)) + 1),
+                    key=lambda m: self._lookup_cost(bits, m, threshold))
+        self.radius = threshold // bands
+        self.probes = self._probes(bits, bands, self.radius)
+        self.linear = self.probes > INDEX_CAPACITY
+        # Band boundaries as (shift, width), spreading the remainder over the first bands
+        self._bands = []
+        start = 0
+        for band in range(bands):
+            width = bits // bands + (band < bits % bands)
+            self._bands.append((bits - start - width, width))
+            start += width
+        # Built on the first lookup that probes, which small archives never reach
+        self._flips: Optional[List[List[int]]] = None
+        self._tables: List[Dict[int, List[int]]] = [] if self.linear else [{} for _ in self._bands]
+        self._hashes: List[int] = []
+        self._keys: List[object] = []
+
+    @staticmethod
+    def _probes(bits: int, bands: int, radius: int) -> int:
+        # Band values a lookup probes: every value within ``radius`` bits, on every band
+        width = bits // bands
+        return bands * sum(math.comb(width, k) for k in range(radius + 1))
+
+    @classmethod
+    def _lookup_cost(cls, bits: int, bands: int, threshold: int) -> float:
+        return cls._probes(bits, bands, threshold // bands) * (1 + INDEX_CAPACITY / 2 ** (bits // bands))
+
+    @staticmethod
+    def _flip_masks(width: int, radius: int) -> List[int]:
+        # Every mask of at most ``radius`` set bits out of ``width``
+        masks = {0}
+        for _ in range(radius):
+            masks |= {mask | (1 << bit) for mask in masks for bit in range(width)}
+        return sorted(masks)
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def add(self, value: int, key=None):
+        """Index ``value``; ``key`` is returned by lookups that match it"""
+        position = len(self._hashes)
+        self._hashes.append(value)
+        self._keys.append(key)
+        for table, (shift, width) in zip(self._tables, self._bands):
+            table.setdefault((value >> shift) & ((1 << width) - 1), []).append(position)
+
+    def query(self, value: int) -> List[Tuple[object, int]]:
+        """
+        Find every indexed hash within ``threshold`` bits of ``value``
+
+        Returns:
+            (key, distance) pairs, closest first, ties in insertion order
+        """
+        if self.linear or self.probes > len(self._hashes):
+            candidates = range(len(self._hashes))
+        else:
+            candidates = self._candidates(value)
+
+        matches = []
+        for position in candidates:
+            distance = hamming_distance(value, self._hashes[position])
+            if distance <= self.threshold:
+                matches.append((distance, position))
+        matches.sort()
+        return [(self._keys[position], distance) for distance, position in matches]
+
+    def _candidates(self, value: int) -> set:
+        # Positions of the hashes sharing a band within ``radius`` bits of ``value``
+        if self._flips is None:
+            self._flips = [self._flip_masks(width, self.radius) for _, width in self._bands]
+        candidates = set()
+        for table, flips, (shift, width) in zip(self._tables, self._flips, self._bands):
+            band = (value >> shift) & ((1 << width) - 1)
+            for flip in flips:
+                bucket = table.get(band ^ flip)
+                if bucket:
+                    candidates.update(bucket)
+        return candidates
+
+
+def find_duplicates(hashes: List[Optional[int]], threshold: int = DEFAULT_THRESHOLD) -> Dict[int, Tuple[int, int]]:
+    """
+    Mark every image that duplicates an earlier one
+
+    Images are visited in order; the first image of each group is the
+    original and later images within ``threshold`` bits of an original are
+    its duplicates. Only originals are indexed, so groups do not chain.
+
+    Args:
+        hashes: Hash per image, None for images that could not be hashed
+        threshold: Maximum Hamming distance between duplicates
+
+    Returns:
+        Mapping of duplicate index to (original index, distance)
+    """
+    index = HashIndex(threshold)
+    duplicates = {}
+
+    for i, value in enumerate(hashes):
+        if value is None:
+            continue
+        matches = index.query(value)
+        if matches:
+            duplicates[i] = matches[0]
+        else:
+            index.add(value, i)
+
+    return duplicates
+
+
+def duplicates_report(image_files: List[str], duplicates: Dict[int, Tuple[int, int]], action: str,
+                      method: str = 'dhash', threshold: int = DEFAULT_THRESHOLD) -> dict:
+    """
+    Summarize ``find_duplicates`` for a result dictionary
+
+    Returns:
+        Dictionary with the ``action`` taken, the hash ``method`` and
+        ``threshold``, the ``count`` of duplicates and the ``groups``, each an
+        original path with its duplicates and their distances
+    """
+    groups: Dict[int, List[dict]] = {}
+    for i in sorted(duplicates):
+        original, distance = duplicates[i]
+        groups.setdefault(original, []).append({'path': image_files[i], 'distance': distance})
+
+    return {
+        'action': action,
+        'method': method,
+        'threshold': threshold,
+        'count': len(duplicates),
+        'groups': [{'original': image_files[original], 'duplicates': members}
+                   for original, members in sorted(groups.items())],
+    }
@@ -0,0 +1,190 @@
+"""
+Input Discovery for Bulk Image Resizer
+Finds the images in a ZIP central directory or a directory tree, skipping junk
+members and guarding against zip bombs and path traversal
+"""
+
+import os
+import posixpath
+import zipfile
+from typing import Iterable, List, Optional, Tuple
+
+
+# Extensions of supported images, lowercase, for O(1) lookups
+IMAGE_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.png'})
+
+# Leading bytes of every supported format
+MAGIC_SIGNATURES = (
+    (b'\xff\xd8\xff', 'JPEG'),
+    (b'\x89PNG\r\n\x1a\n', 'PNG'),
+)
+SNIFF_BYTES = 8
+
+# Folders and files that archivers and operating systems add next to real content
+JUNK_NAMES = frozenset({'__MACOSX', 'Thumbs.db', 'desktop.ini'})
+
+# Zip bomb limits, checked against the central directory before anything is
+# read. zipfile stops reading a member at its declared size, so these hold for
+# the data actually decompressed as well
+MAX_MEMBER_BYTES = 512 * 1024 * 1024
+MAX_TOTAL_BYTES = 16 * 1024 * 1024 * 1024
+MAX_COMPRESSION_RATIO = 200
+# Members smaller than this are exempt from the ratio check (flat images compress very well)
+RATIO_CHECK_BYTES = 1024 * 1024
+
+
+def has_image_extension(filename: str, extensions: Iterable[str] = IMAGE_EXTENSIONS) -> bool:
+    """Check whether a filename ends in one of ``extensions`` (lowercase, with the dot)"""
+    return os.path.splitext(filename)[1].lower() in extensions
+
+
+def sniff_format(header: bytes) -> Optional[str]:
+    """
+    Identify a supported format from the first bytes of a file
+
+    Returns:
+        Format name (e.g. ``JPEG``), or None if no signature matches
+    """
+    for signature, image_format in MAGIC_SIGNATURES:
+        if header.startswith(signature):
+            return image_format
+    return None
+
+
+def is_junk(name: str) -> bool:
+    """
+    True for hidden files and folders, AppleDouble ``._*`` resource forks,
+    ``__MACOSX`` folders and OS metadata files, at any depth of ``name``
+    """
+    return any((part.startswith('.') and part not in ('.', '..')) or part in JUNK_NAMES
+               for part in name.replace('\\', '/').split('/'))
+
+
+def is_safe_member_name(name: str) -> bool:
+    """
+    True if a member name stays inside the extraction directory
+
+    Rejects absolute paths, Windows drive letters and ``..`` components, with
+    either slash as separator.
+    """
+    normalized = name.replace('\\', '/')
+    if normalized.startswith('/') or (len(normalized) > 1 and normalized[1] == ':'):
+        return False
+    return '..' not in normalized.split('/')
+
+
+def check_archive(infos: List[zipfile.ZipInfo], max_total_bytes: int = MAX_TOTAL_BYTES):
+    """
+    Reject archives whose members decompress to more than ``max_total_bytes``
+
+    Raises:
+        ValueError: If the declared uncompressed size is above the limit
+    """
+    total = sum(info.file_size for info in infos)
+    if total > max_total_bytes:
+        raise ValueError(f"Archive expands to {total / (1024 ** 3):.1f} GB, "
+                         f"more than the {max_total_bytes / (1024 ** 3):.0f} GB limit")
+
+
+def member_problem(info: zipfile.ZipInfo, max_member_bytes: int = MAX_MEMBER_BYTES,
+                   max_ratio: float = MAX_COMPRESSION_RATIO) -> Optional[str]:
+    """
+    Reason to skip an image member, from its central directory record alone
+
+    Returns:
+        Short reason, or None if the member looks fine
+    """
+    if not is_safe_member_name(info.filename):
+        return "unsafe path"
+    if info.file_size > max_member_bytes:
+        return "too large"
+    if info.file_size > RATIO_CHECK_BYTES and info.file_size > max_ratio * max(1, info.compress_size):
+        return "suspicious compression ratio"
+    return None
+
+
+def discover_zip_members(zip_ref: zipfile.ZipFile, extensions: Iterable[str] = IMAGE_EXTENSIONS,
+                         sniff: bool = False) -> Tuple[List[str], List[Tuple[str, str]]]:
+    """
+    Find the image members of an archive from its central directory
+
+    Nothing is decompressed unless ``sniff`` is set, so this stays fast for
+    archives with 100,000+ entries. Junk members are ignored silently;
+    members that look like images but are unsafe, oversized or (with
+    ``sniff``) not actually images are reported as skipped.
+
+    Args:
+        zip_ref: Open archive
+        extensions: Accepted extensions, lowercase with the dot
+        sniff: Also read the first bytes of every candidate and check its signature
+
+    Returns:
+        Tuple of (member names sorted by name, [(member name, reason)] of skipped members)
+
+    Raises:
+        ValueError: If the whole archive expands beyond ``MAX_TOTAL_BYTES``
+    """
+    extensions = frozenset(extensions)
+    infos = zip_ref.infolist()
+    check_archive(infos)
+
+    names = []
+    skipped = []
+    for info in infos:
+        name = info.filename
+        if name.endswith('/') or os.path.splitext(name)[1].lower() not in extensions or is_junk(name):
+            continue
+        problem = member_problem(info)
+        if problem is None and sniff:
+            with zip_ref.open(info) as member:
+                if sniff_format(member.read(SNIFF_BYTES)) is None:
+                    problem = "not an image"
+        if problem is None:
+            names.append(name)
+        else:
+            skipped.append((name, problem))
+
+    names.sort()
+    return names, skipped
+
+
+def discover_directory_images(directory: str, extensions: Iterable[str] = IMAGE_EXTENSIONS,
+                              sniff: bool = False) -> Tuple[List[str], List[Tuple[str, str]]]:
+    """
+    Find the images below a directory
+
+    Hidden and junk folders are pruned instead of walked. Paths are sorted
+    by their path relative to ``directory`` with ``/`` separators, the same
+    order an archive of that directory gets.
+
+    Args:
+        directory: Directory to search recursively
+        extensions: Accepted extensions, lowercase with the dot
+        sniff: Also read the first bytes of every candidate and check its signature
+
+    Returns:
+        Tuple of (file paths, [(file path, reason)] of skipped files)
+    """
+    extensions = frozenset(extensions)
+    found = []
+    skipped = []
+
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = [name for name in dirs if not is_junk(name)]
+        for name in files:
+            if os.path.splitext(name)[1].lower() not in extensions or is_junk(name):
+                continue
+            path = os.path.join(root, name)
+            if sniff:
+                try:
+                    with open(path, 'rb') as f:
+                        if sniff_format(f.read(SNIFF_BYTES)) is None:
+                            skipped.append((path, "not an image"))
+                            continue
+                except OSError as e:
+                    skipped.append((path, str(e)))
+                    continue
+            found.append((posixpath.join(*os.path.relpath(path, directory).split(os.sep)), path))
+
+    found.sort()
+    return [path for _, path in found], skipped
@@ -0,0 +1,139 @@
+"""
+Array Export for Bulk Image Resizer
+Writes resized pixels into a memory-mappable .npy array with a CSV index of
+filenames and folder labels, for training code that should not decode images
+"""
+
+import csv
+import os
+import posixpath
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # Optional; only needed for array export
+    np = None
+
+
+INDEX_SUFFIX = '_index.csv'
+
+
+def folder_label(image_path: str, root: Optional[str] = None) -> str:
+    """
+    Label of an image from the folder it is in, e.g. ``cat`` for ``dataset/cat/001.jpg``
+
+    Args:
+        image_path: ZIP member name, or file path when ``root`` is given
+        root: Input directory the file path is relative to
+
+    Returns:
+        Name of the immediate parent folder, '' for images at the top level
+    """
+    if root is not None:
+        image_path = os.path.relpath(image_path, root).replace(os.sep, '/')
+    return posixpath.basename(posixpath.dirname(image_path))
+
+
+def index_path(array_path: str) -> str:
+    """Path of the CSV index written next to ``array_path``"""
+    return os.path.splitext(array_path)[0] + INDEX_SUFFIX
+
+
+class ArrayExport:
+    def __init__(self, array_path: str, count: int, size: Tuple[int, int], sources: List[str],
+                 labels: List[str]):
+        """
+        Initialize ArrayExport
+
+        Pixels go into a ``uint8`` array of shape (count, height, width, 3)
+        created with ``numpy.lib.format.open_memmap``, one row per image in
+        input order. Rows are copied into the shared mapping as images
+        finish, so the export never holds more than one image in memory and
+        rows written before a crash are kept. An existing array of the same
+        shape is reopened rather than recreated, which lets a resumed job
+        keep the rows of its earlier run; ``reopened`` tells whether it was.
+
+        ``close`` writes the index: one CSV row per exported image with its
+        array row, output filename, source path, folder label and label id
+        (position of the label in the sorted list of labels). Rows of images
+        that failed stay zero and are not listed.
+
+        Args:
+            array_path: Path of the .npy file
+            count: Number of images (array rows)
+            size: Size of every image (width, height)
+            sources: Source path per row
+            labels: Label per row (see ``folder_label``)
+        """
+        if np is None:
+            raise ValueError("Array export requires NumPy")
+
+        self.array_path = array_path
+        self.size = tuple(size)
+        self.sources = sources
+        self.labels = labels
+        self.rows: Dict[int, str] = {}
+        shape = (count, size[1], size[0], 3)
+
+        array = None
+        if os.path.exists(array_path):
+            try:
+                array = np.load(array_path, mmap_mode='r+')
+            except (OSError, ValueError):
+                array = None
+            if array is not None and (array.shape != shape or array.dtype != np.uint8):
+                array = None
+        # Rows of an earlier run only survive in a reopened array
+        self.reopened = array is not None
+        if array is None:
+            array = np.lib.format.open_memmap(array_path, mode='w+', dtype=np.uint8, shape=shape)
+        self._array = array
+
+    def write(self, row: int, filename: str, pixels: bytes):
+        """
+        Store the pixels of one image
+
+        Args:
+            row: Position of the image in the input
+            filename: Output filename of the image, for the index
+            pixels: RGB bytes of the resized image (``Image.tobytes()``)
+        """
+        self._array[row] = np.frombuffer(pixels, dtype=np.uint8).reshape(self._array.shape[1:])
+        self.rows[row] = filename
+
+    def mark(self, row: int, filename: str):
+        """List a row written by an earlier run of the same job in the index"""
+        self.rows[row] = filename
+
+    def discard(self, row: int):
+        """Leave a row out of the index, e.g. when writing its image failed"""
+        self.rows.pop(row, None)
+
+    def close(self) -> str:
+        """
+        Flush the array and write the index
+
+        Returns:
+            Path of the CSV index
+        """
+        if self._array is None:
+            return index_path(self.array_path)
+
+        self._array.flush()
+        self._array = None
+
+        label_ids = {label: i for i, label in enumerate(sorted(set(self.labels[row] for row in self.rows)))}
+        path = index_path(self.array_path)
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['row', 'filename', 'source', 'label', 'label_id'])
+            for row in sorted(self.rows):
+                writer.writerow([row, self.rows[row], self.sources[row], self.labels[row],
+                                 label_ids[self.labels[row]]])
+        return path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
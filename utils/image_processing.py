@@ -3,156 +3,1464 @@ Image Processing Module for Bulk Image Resizer
 Handles image extraction, resizing, and ZIP creation
 """
 
+import copy
+import io
+import math
+import multiprocessing
 import os
 import zipfile
 import shutil
+import sys
+import threading
+import time
 import uuid
-from PIL import Image
-from typing import List, Tuple
+from functools import lru_cache
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from PIL import Image, ImageColor, features
+from typing import List, Optional, Tuple, Union
 import tempfile
 
+from utils.cache import ResultCache
+from utils.checkpoint import CheckpointWriter, is_active, is_resumable, job_key
+from utils.dedup import (DEFAULT_THRESHOLD as DEDUP_THRESHOLD, HASH_SIZE, duplicates_report, find_duplicates,
+                         perceptual_hash)
+from utils.discovery import IMAGE_EXTENSIONS, discover_directory_images, discover_zip_members, has_image_extension
+from utils.export import ArrayExport, folder_label, index_path
+from utils.metrics import PipelineMetrics, StageClock, timed
+from utils.pipeline import BackgroundWriter, ByteBudget, prefetch
+from utils.resamplers import get_resampler, verify_resampler
+from utils.scheduler import SCHEDULES, ChunkQueue, estimate_cost, fixed_chunks, plan_chunks
+from utils.writers import DirectoryWriter, ZipStreamWriter
+
+try:
+    import numpy as np
+except ImportError:  # Optional; compositing falls back to Pillow
+    np = None
+
+try:
+    from PIL import ImageCms
+except ImportError:  # Pillow built without LittleCMS; colour profiles are left alone
+    ImageCms = None
+
+
+# File extension written for each explicit output format
+OUTPUT_EXTENSIONS = {'JPEG': '.jpg', 'PNG': '.png', 'WEBP': '.webp', 'AVIF': '.avif'}
+
+# ``Image.save`` options per output format and encoder effort preset. "fast"
+# favours encode time, "smallest" favours output size, "balanced" sits in
+# between (and matches the historical JPEG settings).
+ENCODER_PRESETS = {
+    'JPEG': {
+        'fast': {'quality': 95, 'optimize': False},
+        'balanced': {'quality': 95, 'optimize': True},
+        'smallest': {'quality': 85, 'optimize': True, 'progressive': True},
+    },
+    'PNG': {
+        'fast': {'compress_level': 1},
+        'balanced': {'compress_level': 6},
+        'smallest': {'optimize': True},
+    },
+    'WEBP': {
+        'fast': {'quality': 90, 'method': 0},
+        'balanced': {'quality': 90, 'method': 4},
+        'smallest': {'quality': 80, 'method': 6},
+    },
+    'AVIF': {
+        'fast': {'quality': 80, 'speed': 10},
+        'balanced': {'quality': 75, 'speed': 8},
+        'smallest': {'quality': 65, 'speed': 6},
+    },
+}
+ENCODER_PRESET_NAMES = ('fast', 'balanced', 'smallest')
+
+
+def available_output_formats() -> List[str]:
+    """
+    Output formats the installed Pillow can encode
+
+    WebP and AVIF depend on optional libraries Pillow may be built without;
+    AVIF support only exists in Pillow 11.2 and later.
+    """
+    formats = ['JPEG', 'PNG']
+    if features.check_module('webp'):
+        formats.append('WEBP')
+    if 'avif' in features.modules and features.check_module('avif'):
+        formats.append('AVIF')
+    return formats
+
+
+def normalize_sizes(target_size) -> List[Tuple[int, int]]:
+    """
+    Turn a single (width, height) or a list of them into a list of size tuples
+
+    Duplicates are dropped while keeping the first occurrence's position.
+    """
+    if not target_size:
+        raise ValueError("At least one target size is required")
+    if isinstance(target_size[0], int):
+        target_size = [target_size]
+
+    sizes = []
+    for width, height in target_size:
+        size = (int(width), int(height))
+        if size not in sizes:
+            sizes.append(size)
+    return sizes
+
+
+def parse_sizes(text: str) -> List[Tuple[int, int]]:
+    """
+    Parse sizes written as ``224x224, 299x299`` (a bare ``512`` means 512x512)
+
+    Args:
+        text: Comma or whitespace separated list of sizes
+
+    Returns:
+        List of (width, height) tuples
+    """
+    sizes = []
+    for token in text.replace(',', ' ').split():
+        width, _, height = token.lower().partition('x')
+        sizes.append((int(width), int(height or width)))
+    return sizes
+
+
+def variant_dirname(size: Tuple[int, int]) -> str:
+    """Folder name used for one size variant in the output, e.g. ``224x224``"""
+    return f"{size[0]}x{size[1]}"
+
+
+def parse_color(text: str) -> Tuple[int, int, int]:
+    """
+    Parse a colour such as ``#ffffff``, ``white`` or ``rgb(255, 255, 255)``
+
+    Args:
+        text: Any colour string understood by ``PIL.ImageColor``
+
+    Returns:
+        (red, green, blue) tuple
+    """
+    return ImageColor.getrgb(text)[:3]
+
+
+def premultiply_alpha(img: Image.Image) -> Image.Image:
+    """
+    Prepare a decoded image for resizing
+
+    Images with transparency become premultiplied ``RGBa``, so resampling
+    weighs every colour by its coverage and the background can be composited
+    after resizing, at target size. Palette images without transparency are
+    converted to RGB; other modes are returned unchanged.
+
+    Args:
+        img: Decoded image
+
+    Returns:
+        Image in ``RGBa`` mode if it has an alpha channel, otherwise without one
+    """
+    if img.mode == 'P':
+        img = img.convert('RGBA' if 'transparency' in img.info else 'RGB')
+    if img.mode in ('LA', 'PA'):
+        img = img.convert('RGBA')
+    if img.mode == 'RGBA':
+        img = img.convert('RGBa')
+    return img
+
+
+def composite_background(img: Image.Image, background: Tuple[int, int, int] = (255, 255, 255)) -> Image.Image:
+    """
+    Flatten a premultiplied ``RGBa`` image onto a solid background
+
+    With premultiplied colours this is ``rgb + background * (1 - alpha)`` per
+    pixel, computed on NumPy arrays when available. Images in other modes are
+    returned unchanged.
+
+    Args:
+        img: Image from ``premultiply_alpha``, usually already resized
+        background: Background colour (red, green, blue)
+
+    Returns:
+        RGB image (or ``img`` itself when it has no alpha)
+    """
+    if img.mode != 'RGBa':
+        return img
+
+    if np is not None:
+        pixels = np.asarray(img, dtype=np.uint16)
+        alpha = pixels[..., 3:]
+        backdrop = (np.array(background, dtype=np.uint16) * (255 - alpha) + 127) // 255
+        flat = np.minimum(pixels[..., :3] + backdrop, 255).astype(np.uint8)
+        return Image.fromarray(flat)
+
+    rgba = img.convert('RGBA')
+    canvas = Image.new('RGB', img.size, background)
+    canvas.paste(rgba, mask=rgba)
+    return canvas
+
+
+# Modes each encoder writes as they are; images in other modes are converted before saving
+ENCODER_MODES = {
+    'JPEG': ('L', 'RGB'),
+    'PNG': ('1', 'L', 'I;16', 'RGB', 'RGBA'),
+    'WEBP': ('RGB', 'RGBA'),
+    'AVIF': ('RGB', 'RGBA'),
+}
+
+
+def scale_to_8bit(img: Image.Image) -> Image.Image:
+    """
+    Scale a 16-bit or 32-bit integer image (``I;16``, ``I``) down to ``L``
+
+    Pillow's own conversion clips every value above 255 instead of scaling,
+    which turns most of a 16-bit image white. Other modes are returned unchanged.
+    """
+    if not img.mode.startswith('I'):
+        return img
+    return img.convert('I').point(lambda value: value / 256).convert('L')
+
+
+def encodable_image(img: Image.Image, output_format: str) -> Image.Image:
+    """
+    Convert a resized image to a mode ``output_format`` can write
+
+    Alpha has already been flattened onto the background by then, so CMYK,
+    16-bit and other modes the encoder lacks become ``L`` (single band, where
+    the format has it) or RGB.
+
+    Args:
+        img: Image about to be saved
+        output_format: Pillow format name, e.g. ``JPEG``
+
+    Returns:
+        ``img`` itself if the encoder takes its mode, otherwise a converted copy
+    """
+    modes = ENCODER_MODES.get(output_format, ('RGB',))
+    if img.mode in modes:
+        return img
+    img = scale_to_8bit(img)
+    if img.mode in modes:
+        return img
+    return img.convert('L' if img.mode in ('1', 'L') and 'L' in modes else 'RGB')
+
+
+# Longest side of the preview thumbnails made during a batch
+PREVIEW_SIZE = 192
+
+
+def make_preview(img: Image.Image, size: int = PREVIEW_SIZE) -> bytes:
+    """Encode a small JPEG thumbnail of an already resized image for previews"""
+    thumbnail = encodable_image(img, 'JPEG')
+    if max(thumbnail.size) > size:
+        thumbnail = thumbnail.copy()
+        thumbnail.thumbnail((size, size), Image.Resampling.BILINEAR)
+    buffer = io.BytesIO()
+    thumbnail.save(buffer, format='JPEG', quality=80)
+    return buffer.getvalue()
+
+
+# How the aspect ratio is reconciled with the target size: squash, crop the
+# centre, fit and pad, or crop the most detailed (highest entropy) region
+RESIZE_MODES = ('stretch', 'crop', 'pad', 'entropy')
+
+# Longest side of the thumbnail the entropy crop is searched on
+ENTROPY_THUMBNAIL_SIZE = 128
+
+
+def fit_size(source_size: Tuple[int, int], target_size: Tuple[int, int]) -> Tuple[int, int]:
+    """Largest size with the source's aspect ratio that fits inside ``target_size``"""
+    scale = min(target_size[0] / source_size[0], target_size[1] / source_size[1])
+    return max(1, round(source_size[0] * scale)), max(1, round(source_size[1] * scale))
+
+
+def center_crop_box(source_size: Tuple[int, int],
+                    target_size: Tuple[int, int]) -> Tuple[float, float, float, float]:
+    """
+    Largest centred window of the source with the target's aspect ratio
+
+    Returns:
+        (left, upper, right, lower) in source pixels, suitable for ``Image.resize(box=...)``
+    """
+    width, height = source_size
+    if width * target_size[1] > height * target_size[0]:
+        crop_width = height * target_size[0] / target_size[1]
+        left = (width - crop_width) / 2
+        return left, 0.0, left + crop_width, float(height)
+    crop_height = width * target_size[1] / target_size[0]
+    upper = (height - crop_height) / 2
+    return 0.0, upper, float(width), upper + crop_height
+
+
+def entropy_crop_box(source_size: Tuple[int, int], target_size: Tuple[int, int],
+                     thumbnail: Image.Image, steps: int = 16) -> Tuple[float, float, float, float]:
+    """
+    Window of the target's aspect ratio that holds the most detail
+
+    The window spans the full short side of the source and slides along the
+    long side; every candidate position is scored by the entropy of that part
+    of a small grayscale ``thumbnail``, so the search never touches the
+    full-resolution pixels.
+
+    Args:
+        source_size: Size of the image the box applies to
+        target_size: Size of the output
+        thumbnail: Grayscale thumbnail of the whole source image
+        steps: Number of candidate positions
+
+    Returns:
+        (left, upper, right, lower) in source pixels
+    """
+    left, upper, right, lower = center_crop_box(source_size, target_size)
+    horizontal = upper == 0.0
+    slack = (source_size[0] - (right - left)) if horizontal else (source_size[1] - (lower - upper))
+    if slack < 1:
+        return left, upper, right, lower
+
+    scale_x = thumbnail.width / source_size[0]
+    scale_y = thumbnail.height / source_size[1]
+    center = slack / 2
+    best = None
+
+    for step in range(steps + 1):
+        offset = slack * step / steps
+        if horizontal:
+            box = (offset, upper, offset + right - left, lower)
+        else:
+            box = (left, offset, right, offset + lower - upper)
+        thumb_box = (int(box[0] * scale_x), int(box[1] * scale_y),
+                     max(int(box[0] * scale_x) + 1, round(box[2] * scale_x)),
+                     max(int(box[1] * scale_y) + 1, round(box[3] * scale_y)))
+        # Prefer the more central window when scores tie
+        score = (round(thumbnail.crop(thumb_box).entropy(), 3), -abs(offset - center))
+        if best is None or score > best[0]:
+            best = (score, box)
+
+    return best[1]
+
+
+def entropy_thumbnail(img: Image.Image) -> Image.Image:
+    """
+    Small grayscale copy of ``img`` for ``entropy_crop_box``, made by box averaging
+
+    The box filter covers the whole image, unlike ``Image.reduce`` which
+    drops the remainder at the right and bottom edges, so the thumbnail of a
+    flipped or rotated image is the flipped or rotated thumbnail.
+    """
+    factor = max(1, max(img.size) // ENTROPY_THUMBNAIL_SIZE)
+    thumbnail = img.resize((max(1, round(img.width / factor)), max(1, round(img.height / factor))),
+                           Image.Resampling.BOX) if factor > 1 else img
+    return thumbnail.convert('RGBA').convert('L') if thumbnail.mode == 'RGBa' else thumbnail.convert('L')
+
+
+def pad_to_size(img: Image.Image, target_size: Tuple[int, int],
+                background: Tuple[int, int, int] = (255, 255, 255)) -> Image.Image:
+    """Centre a fitted image on a ``target_size`` canvas of the background colour (letterbox)"""
+    if img.size == tuple(target_size):
+        return img
+    # 16-bit images are scaled, not clipped, like everywhere else on the way to the encoder
+    img = scale_to_8bit(img)
+    if img.mode not in ('RGB', 'L'):
+        img = img.convert('RGB')
+    canvas = Image.new('RGB', target_size, background).convert(img.mode)
+    canvas.paste(img, ((target_size[0] - img.width) // 2, (target_size[1] - img.height) // 2))
+    return canvas
+
+
+# EXIF orientation tag, and the transpose that turns the stored pixels upright
+# for every orientation other than 1 (as in ``ImageOps.exif_transpose``)
+ORIENTATION_TAG = 0x0112
+ORIENTATION_TRANSPOSES = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+# What happens to EXIF and ICC metadata: left out of the outputs, or copied into them
+METADATA_MODES = ('strip', 'preserve')
+
+
+def exif_orientation(img: Image.Image) -> int:
+    """EXIF orientation of an opened image, 1 (upright) when missing or invalid"""
+    try:
+        orientation = img.getexif().get(ORIENTATION_TAG, 1)
+    except Exception:
+        return 1
+    return orientation if orientation in ORIENTATION_TRANSPOSES else 1
+
+
+def oriented_size(size: Tuple[int, int], orientation: int) -> Tuple[int, int]:
+    """Size after applying an EXIF orientation; width and height swap for orientations 5 to 8"""
+    return (size[1], size[0]) if orientation >= 5 else (size[0], size[1])
+
+
+def stored_box(box: Optional[tuple], orientation: int, stored_size: Tuple[int, int]) -> Optional[tuple]:
+    """
+    Map a box on the upright image to the same region of the stored pixels
+
+    Args:
+        box: (left, upper, right, lower) on the upright image, or None for the whole image
+        orientation: EXIF orientation of the image
+        stored_size: Size of the image as decoded, before orientation
+
+    Returns:
+        (left, upper, right, lower) in stored pixels, or None
+    """
+    if box is None or orientation == 1:
+        return box
+    left, upper, right, lower = box
+    width, height = stored_size
+    return {
+        2: (width - right, upper, width - left, lower),
+        3: (width - right, height - lower, width - left, height - upper),
+        4: (left, height - lower, right, height - upper),
+        5: (upper, left, lower, right),
+        6: (upper, height - right, lower, height - left),
+        7: (width - lower, height - right, width - upper, height - left),
+        8: (width - lower, left, width - upper, right),
+    }[orientation]
+
+
+@lru_cache(maxsize=1)
+def srgb_profile_bytes() -> bytes:
+    """The built-in sRGB profile, embedded in converted outputs that keep their metadata"""
+    return ImageCms.ImageCmsProfile(ImageCms.createProfile('sRGB')).tobytes()
+
+
+@lru_cache(maxsize=32)
+def srgb_transform(icc_profile: bytes, mode: str):
+    """
+    Colour transform from an embedded ICC profile to sRGB, built once per profile and process
+
+    Args:
+        icc_profile: Embedded profile
+        mode: Image mode the transform is applied to (``RGB``, ``RGBA`` or ``CMYK``)
+
+    Returns:
+        ``ImageCms`` transform, or None if the profile already is sRGB, does not fit the mode
+        or cannot be parsed
+    """
+    try:
+        profile = ImageCms.ImageCmsProfile(io.BytesIO(icc_profile))
+        if 'srgb' in ImageCms.getProfileDescription(profile).lower():
+            return None
+        color_space = profile.profile.xcolor_space.strip()
+        if (color_space, mode) not in (('RGB', 'RGB'), ('RGB', 'RGBA'), ('CMYK', 'CMYK')):
+            return None
+        return ImageCms.buildTransform(profile, ImageCms.createProfile('sRGB'), mode,
+                                       'RGBA' if mode == 'RGBA' else 'RGB')
+    except (ImageCms.PyCMSError, OSError, ValueError):
+        return None
+
+
+def convert_to_srgb(img: Image.Image, icc_profile: bytes) -> Tuple[Image.Image, bool]:
+    """
+    Convert an image with an embedded ICC profile to sRGB
+
+    Meant for images that are already resized, where the conversion touches
+    few pixels. Premultiplied ``RGBa`` images are converted through ``RGBA``.
+
+    Returns:
+        Tuple of (converted image or ``img`` itself, whether it was converted)
+    """
+    premultiplied = img.mode == 'RGBa'
+    transform = srgb_transform(icc_profile, 'RGBA' if premultiplied else img.mode)
+    if transform is None:
+        return img, False
+    if premultiplied:
+        return ImageCms.applyTransform(img.convert('RGBA'), transform).convert('RGBa'), True
+    return ImageCms.applyTransform(img, transform), True
+
+
+# ZIP members up to this size are buffered in memory, larger ones spill to a temp file
+ZIP_MEMBER_SPOOL_SIZE = 32 * 1024 * 1024
+
+_zip_handles = threading.local()
+
+# Start method of the process pool. Forking copies only the calling thread,
+# so a lock held by the Streamlit server, the background writer or the
+# prefetch thread stays locked forever in the child; forkserver forks workers
+# from a single-threaded server process instead (spawn where it is missing)
+POOL_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+
+def pool_context():
+    """Multiprocessing context for the process pool, with this module preloaded by the fork server"""
+    context = multiprocessing.get_context(POOL_START_METHOD)
+    # Run as ``python -m utils.image_processing`` this module is also the main
+    # module, which workers re-run as __mp_main__; preloading it under its own
+    # name first makes runpy warn and execute it twice
+    main_spec = getattr(sys.modules.get('__main__'), '__spec__', None)
+    if POOL_START_METHOD == 'forkserver' and getattr(main_spec, 'name', None) != __name__:
+        context.set_forkserver_preload([__name__])
+    return context
+
+
+class BufferReader(io.RawIOBase):
+    def __init__(self, buffer):
+        """
+        Initialize BufferReader
+
+        A read-only, seekable file over an in-memory buffer (e.g. the bytes of
+        an upload) that does not copy it. Each reader keeps its own position,
+        so the buffer itself is never shared state.
+
+        Args:
+            buffer: Any bytes-like object
+        """
+        self._view = memoryview(buffer).cast('B')
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._pos + offset
+        elif whence == io.SEEK_END:
+            position = len(self._view) + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if position < 0:
+            raise ValueError("Negative seek position")
+        self._pos = position
+        return position
+
+    def read(self, size: int = -1) -> bytes:
+        end = len(self._view) if size is None or size < 0 else min(len(self._view), self._pos + size)
+        data = self._view[self._pos:end].tobytes()
+        self._pos += len(data)
+        return data
+
+    def reader(self) -> 'BufferReader':
+        """Another reader over the same buffer, starting at the beginning"""
+        return BufferReader(self._view)
+
+    def readall(self) -> bytes:
+        return self.read()
+
+    def readinto(self, buffer) -> int:
+        data = self._view[self._pos:self._pos + len(buffer)]
+        buffer[:len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+
+def _get_zip_handle(zip_path) -> zipfile.ZipFile:
+    """
+    Return a ZipFile for ``zip_path`` cached per thread (and so per worker process)
+
+    Opening an archive parses its whole central directory, so reopening it for
+    every member would make ingest quadratic in the number of entries. An
+    already open ZipFile (e.g. over an in-memory upload) is returned as is;
+    ZipFile serializes member reads internally, so threads can share it.
+    """
+    if isinstance(zip_path, zipfile.ZipFile):
+        return zip_path
+    handle = getattr(_zip_handles, 'handle', None)
+    if handle is None or _zip_handles.path != zip_path:
+        _close_zip_handle()
+        _zip_handles.handle = zipfile.ZipFile(zip_path, 'r')
+        _zip_handles.path = zip_path
+    return _zip_handles.handle
+
+
+def _close_zip_handle():
+    """Close the ZipFile cached for the current thread, if any"""
+    handle = getattr(_zip_handles, 'handle', None)
+    if handle is not None:
+        handle.close()
+        _zip_handles.handle = None
+        _zip_handles.path = None
+
+
+def open_zip_member(zip_path, member: str):
+    """
+    Copy a ZIP member into a bounded, seekable buffer
+
+    Small members stay in memory, large ones spill to a temporary file, so
+    decoding never requires extracting the archive to disk.
+
+    Args:
+        zip_path: Path to the ZIP file, or an open ZipFile
+        member: Name of the member inside the archive
+
+    Returns:
+        Seekable file object positioned at the start of the member data
+    """
+    buffer = tempfile.SpooledTemporaryFile(max_size=ZIP_MEMBER_SPOOL_SIZE)
+    with _get_zip_handle(zip_path).open(member) as source:
+        shutil.copyfileobj(source, buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def _resize_chunk(processor: 'ImageProcessor', chunk: List[Tuple[int, str, str]],
+                  zip_path: Optional[str] = None,
+                  payloads: Optional[List[bytes]] = None) -> Tuple[List[Tuple[int, Optional[List[bytes]], dict]], dict]:
+    """
+    Worker entry point: resize one chunk of (index, input_path, output_name) tasks
+
+    Runs inside a pool process, so it must stay a module-level function. The
+    encoded bytes and per-stage timings are returned so the parent can hand
+    them to a single writer, together with the counters the worker's copy of
+    the processor collected. Sources the worker cannot open itself (members of
+    an in-memory archive) arrive as ``payloads``, one per task.
+    """
+    if processor.cache is not None:
+        processor.cache.hits = processor.cache.misses = 0
+
+    results = []
+    for k, (index, input_path, _) in enumerate(chunk):
+        source = io.BytesIO(payloads[k]) if payloads is not None else None
+        variants = processor.resize_image_variants(input_path, zip_path, source,
+                                                   preview=index in processor.preview_indexes)
+        results.append((index, variants, processor.last_timings))
+
+    stats = {}
+    if processor.cache is not None:
+        stats['cache_hits'] = processor.cache.hits
+        stats['cache_misses'] = processor.cache.misses
+    return results, stats
+
 
 class ImageProcessor:
-    def __init__(self, target_size: Tuple[int, int] = (224, 224)):
+    def __init__(self, target_size: Union[Tuple[int, int], List[Tuple[int, int]]] = (224, 224), workers: Optional[int] = None,
+                 chunk_size: Optional[int] = None, fast_resize: bool = False, reducing_gap: float = 2.0,
+                 cache: Optional[ResultCache] = None, output_format: Optional[str] = None,
+                 memory_budget: int = 256 * 1024 * 1024,
+                 background_color: Tuple[int, int, int] = (255, 255, 255), encoder_preset: str = 'balanced',
+                 resize_mode: str = 'stretch', sniff_images: bool = False, schedule: str = 'cost',
+                 resampler: str = 'pillow', resample_filter: Optional[str] = None, metadata: str = 'strip',
+                 to_srgb: Optional[bool] = None):
         """
         Initialize ImageProcessor with target size
 
         Args:
-            target_size: Target size for resized images (width, height)
+            target_size: Target size for resized images (width, height), or a list of sizes to
+                produce several variants from a single decode
+            workers: Number of worker processes for batch resizing (default: CPU count, 1 disables the pool)
+            chunk_size: Number of images dispatched to a worker at once (default: derived from batch size)
+            fast_resize: Use JPEG draft decoding and reduce-then-resample instead of a full-resolution LANCZOS pass
+            reducing_gap: How much larger than the target the image is kept before the final LANCZOS pass
+                (only used with ``fast_resize``; higher is slower but closer to the full-quality result)
+            cache: Optional result cache; hits skip decoding and encoding entirely
+            output_format: Output format for every image (see ``OUTPUT_EXTENSIONS``); None keeps the input format
+            memory_budget: Approximate bytes of source and encoded data held in flight by a batch; a quarter
+                goes to read-ahead, a quarter to pending writes and half to work queued on pool workers
+            background_color: Colour transparent images are flattened onto (red, green, blue)
+            encoder_preset: Encoder effort, one of ``ENCODER_PRESET_NAMES`` (see ``ENCODER_PRESETS``)
+            resize_mode: How the aspect ratio is handled, one of ``RESIZE_MODES``: "stretch" squashes,
+                "crop" crops the centre, "pad" letterboxes onto ``background_color`` and "entropy"
+                crops the most detailed region
+            sniff_images: Check the leading bytes of every listed image and skip files that are not
+                actually JPEG or PNG (costs one small read per image)
+            schedule: How work is spread over the pool, one of ``SCHEDULES``: "cost" dispatches
+                expensive images first and batches cheap ones (see ``utils.scheduler``), "order"
+                dispatches fixed-size chunks in input order
+            resampler: Resampling backend, one of ``available_resamplers()`` (see ``utils.resamplers``);
+                backends other than Pillow are checked against Pillow once per process
+            resample_filter: Resampling filter, one of ``RESAMPLE_FILTERS`` that the backend supports
+                (default: its first, LANCZOS for Pillow and INTER_AREA for OpenCV)
+            metadata: EXIF and ICC metadata of the outputs, one of ``METADATA_MODES``: "strip" writes
+                none (smaller files, faster encodes), "preserve" copies them (EXIF without the
+                orientation, which is applied to the pixels either way)
+            to_srgb: Convert images with an embedded colour profile to sRGB, at target size
+                (default: when Pillow has LittleCMS)
         """
-        self.target_size = target_size
-        self.supported_formats = ['.jpg', '.jpeg',
-                                  '.png', '.JPG', '.JPEG', '.PNG']
+        self.target_sizes = normalize_sizes(target_size)
+        self.target_size = self.target_sizes[0]
+        self.fast_resize = fast_resize
+        self.reducing_gap = reducing_gap
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.chunk_size = chunk_size
+        self.cache = cache
+        self.memory_budget = memory_budget
+        self.background_color = tuple(background_color)
+        self.metrics = PipelineMetrics()
+        self.last_timings = {}
+        # Set while a batch exports pixels or makes previews (see ``resize_images_to_writer``)
+        self.export_pixels = False
+        self.preview_indexes = frozenset()
+        # Preview thumbnails of the last batch, as (output name, JPEG bytes) in input order
+        self.last_previews: List[Tuple[str, bytes]] = []
+        self.output_format = output_format.upper() if output_format else None
+        if self.output_format and self.output_format not in OUTPUT_EXTENSIONS:
+            raise ValueError(f"Unsupported output format: {output_format}")
+        if self.output_format and self.output_format not in available_output_formats():
+            raise ValueError(f"Output format {self.output_format} is not supported by this Pillow build")
+        if encoder_preset not in ENCODER_PRESET_NAMES:
+            raise ValueError(f"Unknown encoder preset: {encoder_preset}")
+        self.encoder_preset = encoder_preset
+        if resize_mode not in RESIZE_MODES:
+            raise ValueError(f"Unknown resize mode: {resize_mode}")
+        self.resize_mode = resize_mode
+        if schedule not in SCHEDULES:
+            raise ValueError(f"Unknown schedule: {schedule}")
+        self.schedule = schedule
+        self.resampler = get_resampler(resampler)
+        self.resample_filter = resample_filter or self.resampler.filters[0]
+        verify_resampler(self.resampler.name, self.resample_filter)
+        if metadata not in METADATA_MODES:
+            raise ValueError(f"Unknown metadata mode: {metadata}")
+        self.metadata = metadata
+        if to_srgb and ImageCms is None:
+            raise ValueError("Colour profile conversion requires Pillow with LittleCMS")
+        self.to_srgb = ImageCms is not None if to_srgb is None else to_srgb
+        self.supported_formats = IMAGE_EXTENSIONS
+        self.sniff_images = sniff_images
+        # Members skipped by the last listing, as (name, reason)
+        self.last_skipped: List[Tuple[str, str]] = []
+
+    def __getstate__(self) -> dict:
+        # Metrics, previews and skipped members grow with the batch and only
+        # live in the parent; keep them out of the copy pickled to pool
+        # workers for every chunk
+        state = self.__dict__.copy()
+        state['metrics'] = PipelineMetrics()
+        state['last_previews'] = []
+        state['last_skipped'] = []
+        return state
 
     def extract_zip(self, zip_file_path: str, extract_to: str) -> List[str]:
         """
-        Extract ZIP file and return list of image file paths
+        Extract the image members of a ZIP file and return their paths
+
+        Only members found by ``list_zip_images`` are extracted, so junk,
+        unsafe and oversized members never reach the disk.
 
         Args:
             zip_file_path: Path to the ZIP file
             extract_to: Directory to extract files to
 
         Returns:
-            List of extracted image file paths
+            List of extracted image file paths, sorted by member name
         """
-        image_files = []
-
         try:
             with zipfile.ZipFile(zip_file_path, 'r') as zip_ref:
-                # Extract all files
-                zip_ref.extractall(extract_to)
+                return [zip_ref.extract(name, extract_to) for name in self.list_zip_images(zip_ref)]
+
+        except Exception as e:
+            raise Exception(f"Error extracting ZIP file: {str(e)}")
+
+    def is_supported_image(self, filename: str) -> bool:
+        """Check whether a filename has a supported image extension"""
+        return has_image_extension(filename, self.supported_formats)
+
+    def list_directory_images(self, directory: str) -> List[str]:
+        """
+        List supported images below a directory
+
+        Hidden files and folders are skipped; with ``self.sniff_images`` files
+        whose content is not a supported image are skipped as well and listed
+        in ``self.last_skipped``.
 
-                # Get list of extracted files
-                for root, dirs, files in os.walk(extract_to):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        # Check if file is a supported image format
-                        if any(file.lower().endswith(ext.lower()) for ext in self.supported_formats):
-                            image_files.append(file_path)
+        Args:
+            directory: Directory to search recursively
+
+        Returns:
+            List of image file paths, sorted by relative path
+        """
+        image_files, self.last_skipped = discover_directory_images(directory, self.supported_formats,
+                                                                   self.sniff_images)
+        return image_files
 
+    def list_zip_images(self, zip_file_path: str) -> List[str]:
+        """
+        List image members of a ZIP file from its central directory, without extracting it
+
+        ``__MACOSX`` folders, ``._*`` resource forks and hidden members are
+        ignored. Members with unsafe paths, implausible sizes or compression
+        ratios (and, with ``self.sniff_images``, content that is not a
+        supported image) are skipped and listed in ``self.last_skipped``.
+
+        Args:
+            zip_file_path: Path to the ZIP file (or a file object with it, or an open ZipFile)
+
+        Returns:
+            List of member names of supported images, sorted by name
+        """
+        try:
+            if isinstance(zip_file_path, zipfile.ZipFile):
+                image_files, self.last_skipped = discover_zip_members(zip_file_path, self.supported_formats,
+                                                                      self.sniff_images)
+            else:
+                with zipfile.ZipFile(zip_file_path, 'r') as zip_ref:
+                    image_files, self.last_skipped = discover_zip_members(zip_ref, self.supported_formats,
+                                                                          self.sniff_images)
             return image_files
 
         except Exception as e:
-            raise Exception(f"Error extracting ZIP file: {str(e)}")
+            raise Exception(f"Error reading ZIP file: {str(e)}")
+
+    def resize_image_bytes(self, input_path: str, zip_path: Optional[str] = None) -> Optional[bytes]:
+        """
+        Resize a single image to target size and encode it in memory
 
-    def resize_image(self, input_path: str, output_path: str) -> bool:
+        Args:
+            input_path: Path to input image, or member name when ``zip_path`` is given
+            zip_path: Optional ZIP file to read ``input_path`` from
+
+        Returns:
+            Encoded image bytes (of the first target size) if successful, None otherwise
+        """
+        variants = self.resize_image_variants(input_path, zip_path)
+        return variants[0] if variants else None
+
+    def resize_image_variants(self, input_path: str, zip_path: Optional[str] = None,
+                              source=None, preview: bool = False) -> Optional[List[bytes]]:
+        """
+        Decode an image once and encode it at every target size
+
+        Variants are produced largest first, and each smaller one is resized
+        from the previous result when it fits inside it, so only the first
+        resize has to touch the full-resolution image. Transparent images are
+        resized with premultiplied alpha and flattened onto the background
+        colour per variant, at target size. Crop windows are computed from
+        the image size (and for entropy crops a small thumbnail) and applied
+        through ``Image.resize(box=...)``, so only the window is resampled.
+
+        EXIF orientation is honoured without an extra pass over the source:
+        windows and sizes are worked out on the upright image and mapped back
+        to the stored pixels, and only the resized variant is rotated or
+        flipped. Conversion from an embedded colour profile to sRGB likewise
+        runs on each variant at target size.
+
+        Args:
+            input_path: Path to input image, or member name when ``zip_path`` is given
+            zip_path: Optional ZIP file to read ``input_path`` from
+            source: Optional already opened file object with the image data (it is closed afterwards)
+            preview: Also make a ``make_preview`` thumbnail from the smallest variant
+
+        Returns:
+            Encoded image bytes in ``self.target_sizes`` order if successful, None otherwise. With
+            ``self.export_pixels`` the RGB bytes of the first size follow as an extra element, and
+            with ``preview`` the thumbnail comes last
+        """
+        clock = StageClock()
+        self.last_timings = clock.timings
+
+        try:
+            # Read straight from the archive when a ZIP is given
+            if source is None:
+                source = open_zip_member(zip_path, input_path) if zip_path else open(input_path, 'rb')
+            encode_params = self.get_encode_params(input_path)
+            clock.lap('read')
+
+            with source as fp:
+                cache_keys = []
+                if self.cache is not None:
+                    source_hash = self.cache.hash_source(fp)
+                    cache_keys = [self.cache.make_key(source_hash, self.get_cache_params(encode_params, size))
+                                  for size in self.target_sizes]
+                    if self.export_pixels:
+                        cache_keys.append(self.cache.make_key(source_hash, {
+                            **self.get_cache_params(encode_params, self.target_size), 'pixels': 'RGB'}))
+                    cached = [self.cache.get(key) for key in cache_keys]
+                    clock.lap('cache')
+                    if all(data is not None for data in cached):
+                        if preview:
+                            smallest = min(range(len(self.target_sizes)),
+                                           key=lambda k: self.target_sizes[k][0] * self.target_sizes[k][1])
+                            with Image.open(io.BytesIO(cached[smallest])) as img:
+                                cached.append(make_preview(img))
+                            clock.lap('preview')
+                        return cached
+
+                # Open and resize image
+                with Image.open(fp) as img:
+                    order = sorted(range(len(self.target_sizes)),
+                                   key=lambda k: self.target_sizes[k][0] * self.target_sizes[k][1], reverse=True)
+                    largest = self.target_sizes[order[0]]
+
+                    # Metadata comes from the header, before anything is decoded
+                    orientation = exif_orientation(img)
+                    transpose = ORIENTATION_TRANSPOSES.get(orientation)
+                    icc_profile = img.info.get('icc_profile') if self.to_srgb or self.metadata == 'preserve' else None
+                    save_params = self.get_metadata_params(img, icc_profile)
+
+                    if self.fast_resize:
+                        # Let libjpeg decode at 1/2, 1/4 or 1/8 scale (DCT-domain downscaling);
+                        # a no-op for formats without draft support. The request is in
+                        # stored pixels, so it is turned along with the image
+                        img.draft(None, oriented_size((int(largest[0] * self.reducing_gap),
+                                                       int(largest[1] * self.reducing_gap)), orientation))
+                    img.load()
+                    clock.lap('decode')
+
+                    # Keep transparency through the resize; it is flattened at target size
+                    img = premultiply_alpha(img)
+                    clock.lap('convert')
+
+                    results = [None] * (len(self.target_sizes) + self.export_pixels)
+                    previous, previous_box = None, None
+                    thumbnail = entropy_thumbnail(img) if self.resize_mode == 'entropy' else None
+                    if thumbnail is not None and transpose is not None:
+                        thumbnail = thumbnail.transpose(transpose)
+                    for k in order:
+                        size = self.target_sizes[k]
+                        # The window is chosen on the upright image and resized in stored pixels
+                        box, resize_size = self.get_resize_window(oriented_size(img.size, orientation), size,
+                                                                  thumbnail)
+                        box = stored_box(box, orientation, img.size)
+                        resize_size = oriented_size(resize_size, orientation)
+
+                        # Resize progressively from the previous variant when it shows the
+                        # same window and is large enough
+                        if previous is not None and previous_box == box and previous.width >= resize_size[0] \
+                                and previous.height >= resize_size[1]:
+                            base, base_box = previous, None
+                        else:
+                            base, base_box = img, box
+
+                        # Resize with high quality; in fast mode box-reduce first and
+                        # only run the filter on the last reducing_gap factor
+                        resized_img = self.resampler.resize(
+                            base, resize_size, self.resample_filter, box=base_box,
+                            reducing_gap=self.reducing_gap if self.fast_resize else None)
+                        clock.lap('resize')
+
+                        upright_img = resized_img
+                        if transpose is not None:
+                            upright_img = upright_img.transpose(transpose)
+                            clock.lap('orient')
+                        if icc_profile and self.to_srgb:
+                            upright_img, converted = convert_to_srgb(upright_img, icc_profile)
+                            if converted and self.metadata == 'preserve':
+                                save_params['icc_profile'] = srgb_profile_bytes()
+                            clock.lap('color')
+
+                        flat_img = composite_background(upright_img, self.background_color)
+                        if self.resize_mode == 'pad':
+                            flat_img = pad_to_size(flat_img, size, self.background_color)
+                        clock.lap('composite')
+
+                        out_img = encodable_image(flat_img, encode_params['format'])
+                        params = save_params
+                        if save_params.get('icc_profile') and len(out_img.getbands()) != len(flat_img.getbands()):
+                            # e.g. a CMYK profile no longer describes the RGB pixels
+                            params = dict(save_params, icc_profile=None)
+                        buffer = io.BytesIO()
+                        out_img.save(buffer, **encode_params, **params)
+                        results[k] = buffer.getvalue()
+                        previous, previous_box = resized_img, box
+                        clock.lap('encode')
+
+                        if self.export_pixels and k == 0:
+                            export_img = scale_to_8bit(flat_img)
+                            if export_img.mode != 'RGB':
+                                export_img = export_img.convert('RGB')
+                            results[-1] = export_img.tobytes()
+                            clock.lap('export')
+
+                    if preview:
+                        # The last variant is the smallest; thumbnail it while it is still decoded
+                        thumbnail = make_preview(flat_img)
+                        clock.lap('preview')
+
+                for key, data in zip(cache_keys, results):
+                    self.cache.put(key, data)
+                if cache_keys:
+                    clock.lap('cache')
+
+                if preview:
+                    results.append(thumbnail)
+                return results
+
+        except Exception as e:
+            clock.lap('error')
+            if source is not None:
+                source.close()
+            print(f"Error resizing image {input_path}: {str(e)}")
+            return None
+
+    def get_metadata_params(self, img: Image.Image, icc_profile: Optional[bytes]) -> dict:
+        """
+        Metadata keyword arguments for ``Image.save``, according to ``self.metadata``
+
+        Stripping passes ``icc_profile=None`` explicitly, since PNG and AVIF
+        would otherwise copy the profile from the image. Preserved EXIF
+        loses its orientation tag, because the pixels are already upright.
+
+        Args:
+            img: Opened source image
+            icc_profile: Embedded colour profile of the source, if any
+
+        Returns:
+            Keyword arguments for ``Image.save``
+        """
+        if self.metadata == 'strip':
+            return {'icc_profile': None}
+
+        params = {'icc_profile': icc_profile}
+        try:
+            exif = img.getexif()
+        except Exception:
+            exif = None
+        if exif:
+            exif.pop(ORIENTATION_TAG, None)
+            params['exif'] = exif.tobytes()
+        return params
+
+    def get_resize_window(self, source_size: Tuple[int, int], target_size: Tuple[int, int],
+                          thumbnail: Optional[Image.Image] = None) -> Tuple[Optional[tuple], Tuple[int, int]]:
+        """
+        Source region and resize size for one variant, according to ``self.resize_mode``
+
+        Args:
+            source_size: Size of the decoded image, upright (after its EXIF orientation)
+            target_size: Size of the variant
+            thumbnail: Grayscale thumbnail of the image (only used by the entropy mode)
+
+        Returns:
+            Tuple of (box for ``Image.resize`` or None for the whole image, size to resize to);
+            in pad mode the size is the fitted size before letterboxing
+        """
+        if self.resize_mode == 'crop':
+            return center_crop_box(source_size, target_size), target_size
+        if self.resize_mode == 'entropy':
+            return entropy_crop_box(source_size, target_size, thumbnail), target_size
+        if self.resize_mode == 'pad':
+            return None, fit_size(source_size, target_size)
+        return None, target_size
+
+    def get_encode_params(self, input_path: str) -> dict:
+        """
+        Determine output format and encoder options for an input image
+
+        Args:
+            input_path: Path or member name of the input image
+
+        Returns:
+            Keyword arguments for ``Image.save``
+        """
+        if self.output_format:
+            output_format = self.output_format
+        else:
+            output_format = 'JPEG' if input_path.lower().endswith(('.jpg', '.jpeg')) else 'PNG'
+
+        return {'format': output_format, **ENCODER_PRESETS[output_format][self.encoder_preset]}
+
+    def get_cache_params(self, encode_params: dict, target_size: Tuple[int, int]) -> dict:
+        """
+        Collect every setting that affects the output bytes, for cache keys
+
+        Args:
+            encode_params: Keyword arguments for ``Image.save``
+            target_size: Size of the variant being cached
+
+        Returns:
+            Dictionary of resize and encode parameters
+        """
+        params = {
+            'target_size': list(target_size),
+            'resample': self.resample_filter.upper(),
+            'fast_resize': self.fast_resize,
+            'encode': encode_params,
+            'background': list(self.background_color),
+            'resize_mode': self.resize_mode,
+            'orientation': 'exif',
+            'metadata': self.metadata,
+            'srgb': self.to_srgb,
+        }
+        if self.fast_resize:
+            params['reducing_gap'] = self.reducing_gap
+        if self.resampler.name != 'pillow':
+            params['resampler'] = self.resampler.name
+        if len(self.target_sizes) > 1:
+            # Smaller variants are resized from larger ones, so the whole set matters
+            params['variants'] = [list(size) for size in self.target_sizes]
+        return params
+
+    def resize_image(self, input_path: str, output_path: str, zip_path: Optional[str] = None) -> bool:
         """
         Resize a single image to target size
 
         Args:
-            input_path: Path to input image
+            input_path: Path to input image, or member name when ``zip_path`` is given
             output_path: Path to save resized image
+            zip_path: Optional ZIP file to read ``input_path`` from
 
         Returns:
             True if successful, False otherwise
         """
-        try:
-            # Open and resize image
-            with Image.open(input_path) as img:
-                # Convert to RGB if necessary (for PNG with transparency)
-                if img.mode in ('RGBA', 'LA', 'P'):
-                    rgb_img = Image.new('RGB', img.size, (255, 255, 255))
-                    if img.mode == 'P':
-                        img = img.convert('RGB')
-                    else:
-                        rgb_img.paste(img, mask=img.split()
-                                      [-1] if img.mode == 'RGBA' else None)
-                        img = rgb_img
-
-                # Resize with high quality
-                resized_img = img.resize(
-                    self.target_size, Image.Resampling.LANCZOS)                # Determine output format and quality
-                output_format = 'JPEG' if input_path.lower().endswith(('.jpg', '.jpeg')) else 'PNG'
-
-                if output_format == 'JPEG':
-                    resized_img.save(
-                        output_path, format=output_format, quality=95, optimize=True)
-                else:
-                    resized_img.save(
-                        output_path, format=output_format, optimize=True)
+        data = self.resize_image_bytes(input_path, zip_path)
+        if data is None:
+            return False
 
-                return True
+        try:
+            with open(output_path, 'wb') as f:
+                f.write(data)
+            return True
 
         except Exception as e:
-            print(f"Error resizing image {input_path}: {str(e)}")
+            print(f"Error saving image {output_path}: {str(e)}")
             return False
 
-    def resize_images_batch(self, image_files: List[str], output_dir: str, prefix: str = "resized", progress_callback=None) -> Tuple[List[str], int, int]:
+    def get_output_filename(self, image_path: str, index: int, prefix: str) -> str:
+        """
+        Build the sequential output filename for the image at position ``index``
+
+        Args:
+            image_path: Path of the source image
+            index: Zero-based position of the image in the batch
+            prefix: Prefix for output filenames
+
+        Returns:
+            Output filename in the form ``{prefix}_{index + 1}{ext}``
+        """
+        filename = os.path.basename(image_path)
+        _, ext = os.path.splitext(filename)
+
+        # Ensure JPEG extension for JPG files
+        if self.output_format:
+            ext = OUTPUT_EXTENSIONS[self.output_format]
+        elif ext.lower() in ['.jpg', '.jpeg']:
+            ext = '.jpg'
+        elif ext.lower() == '.png':
+            ext = '.png'
+
+        return f"{prefix}_{index + 1}{ext}"
+
+    def get_output_names(self, image_path: str, index: int, prefix: str) -> List[str]:
+        """
+        Output names of every size variant of the image at position ``index``
+
+        With several target sizes each variant goes into its own
+        ``{width}x{height}/`` folder; a single size keeps the flat layout.
+        """
+        filename = self.get_output_filename(image_path, index, prefix)
+        if len(self.target_sizes) == 1:
+            return [filename]
+        return [f"{variant_dirname(size)}/{filename}" for size in self.target_sizes]
+
+    def get_settings(self) -> dict:
+        """Every setting that influences output names and bytes, e.g. to validate a checkpoint"""
+        return {
+            'target_sizes': [list(size) for size in self.target_sizes],
+            'fast_resize': self.fast_resize,
+            'reducing_gap': self.reducing_gap,
+            'output_format': self.output_format,
+            'encoder_preset': self.encoder_preset,
+            'background_color': list(self.background_color),
+            'resize_mode': self.resize_mode,
+            'sniff_images': self.sniff_images,
+            'resampler': self.resampler.name,
+            'resample_filter': self.resample_filter,
+            'metadata': self.metadata,
+            'to_srgb': self.to_srgb,
+        }
+
+    def resize_images_batch(self, image_files: List[str], output_dir: str, prefix: str = "resized", progress_callback=None,
+                            zip_path: Optional[str] = None) -> Tuple[List[str], int, int]:
         """
         Resize multiple images in batch
 
+        Images are spread over a process pool when ``self.workers`` is greater
+        than 1. Output numbering always follows the order of ``image_files``.
+
         Args:
-            image_files: List of image file paths to resize
+            image_files: List of image file paths to resize, or member names when ``zip_path`` is given
             output_dir: Directory to save resized images
             prefix: Prefix for output filenames
             progress_callback: Optional callback function for progress updates
+            zip_path: Optional ZIP file to stream ``image_files`` from instead of the filesystem
 
         Returns:
             Tuple of (resized_file_paths, successful_count, failed_count)
         """
-        resized_files = []
-        successful = 0
-        failed = 0
+        with DirectoryWriter(output_dir) as writer:
+            return self.resize_images_to_writer(image_files, writer, prefix, progress_callback, zip_path)
+
+    def resize_images_to_zip(self, image_files: List[str], output_zip_path: str, prefix: str = "resized",
+                             progress_callback=None, zip_path: Optional[str] = None,
+                             store_compressed: bool = True) -> Tuple[List[str], int, int]:
+        """
+        Resize multiple images and stream them straight into a ZIP archive
+
+        Each image is appended to the archive as soon as it is encoded, so no
+        intermediate files are written and no second compression pass is needed.
+
+        Args:
+            image_files: List of image file paths to resize, or member names when ``zip_path`` is given
+            output_zip_path: Path for the output ZIP file
+            prefix: Prefix for output filenames
+            progress_callback: Optional callback function for progress updates
+            zip_path: Optional ZIP file to stream ``image_files`` from instead of the filesystem
+            store_compressed: Store JPEG/PNG entries without DEFLATE (they barely compress)
+
+        Returns:
+            Tuple of (archive_entry_names, successful_count, failed_count)
+        """
+        with ZipStreamWriter(output_zip_path, store_compressed=store_compressed) as writer:
+            return self.resize_images_to_writer(image_files, writer, prefix, progress_callback, zip_path)
+
+    def resize_images_to_writer(self, image_files: List[str], writer, prefix: str = "resized",
+                                progress_callback=None, zip_path: Optional[str] = None,
+                                completed: Optional[dict] = None,
+                                costs: Optional[List[float]] = None, export=None,
+                                previews: int = 0) -> Tuple[List[str], int, int]:
+        """
+        Resize multiple images and hand each encoded result to ``writer``
+
+        With several target sizes every variant is written into its own
+        ``{width}x{height}/`` folder; a single size keeps the flat layout.
+
+        Args:
+            image_files: List of image file paths to resize, or member names when ``zip_path`` is given
+            writer: Output writer with a ``write(name, data)`` method (see ``utils.writers``)
+            prefix: Prefix for output filenames
+            progress_callback: Optional callback function for progress updates
+            zip_path: Optional ZIP file to stream ``image_files`` from instead of the filesystem
+            completed: Outputs already written by an interrupted earlier run, keyed by image
+                position; those images are skipped and counted as successful
+            costs: Optional estimated cost per image (e.g. ``scan_archive`` costs) for the "cost"
+                schedule; without them the costs are estimated from image headers and source sizes
+            export: Optional ``utils.export.ArrayExport`` with one row per image; the pixels of the
+                first target size are stored in it as results arrive
+            previews: Number of images (the first ones still to process) to make preview thumbnails
+                of while they are resized; they end up in ``self.last_previews`` without reading
+                any output back
+
+        Returns:
+            Tuple of (written_outputs, successful_count, failed_count)
+        """
+        completed = completed or {}
+        tasks = [(i, image_path, self.get_output_filename(image_path, i, prefix))
+                 for i, image_path in enumerate(image_files)]
+        sizes = self.get_source_sizes(image_files, zip_path)
+        outputs = dict(completed)
+
+        pending = [task for task in tasks if task[0] not in completed]
+        if completed and progress_callback:
+            # Progress continues from where the earlier run stopped
+            report = progress_callback
+
+            def progress_callback(current, total):
+                report(current + len(completed), len(tasks))
+
+        # Writes run on their own thread behind a bounded queue, so encoding
+        # never waits for disk unless the queue is full
+        background = BackgroundWriter(writer, self.memory_budget // 4, self.metrics.stages)
+
+        preview_images = {}
+
+        def handle_result(i: int, variants: Optional[List[bytes]], timings: dict):
+            self.metrics.record_image(tasks[i][1], timings)
+            if variants is None:
+                return
+            names = self.get_output_names(tasks[i][1], i, prefix)
+            if i in self.preview_indexes:
+                preview_images[i] = (names[0], variants.pop())
+            if export is not None:
+                # The row is in the shared mapping before its entries are queued for writing
+                with timed(self.metrics.stages, 'export'):
+                    export.write(i, names[0], variants[-1])
+            outputs[i] = [background.write(name, data) for name, data in zip(names, variants)]
+
+        if export is not None:
+            for i, names in completed.items():
+                export.mark(i, names[0])
+
+        self.export_pixels = export is not None
+        self.preview_indexes = frozenset(i for i, _, _ in pending[:previews])
+        try:
+            if self.workers > 1 and len(pending) > 1:
+                if self.schedule == 'cost' and costs is None:
+                    costs = self.estimate_costs(image_files, sizes, zip_path, [i for i, _, _ in pending])
+                # Dispatch order changes, output numbering still follows image_files
+                self._run_parallel(pending, sizes, handle_result, progress_callback, zip_path,
+                                   costs if self.schedule == 'cost' else None)
+            elif pending:
+                self._run_serial(pending, sizes, handle_result, progress_callback, zip_path)
+        finally:
+            self.export_pixels = False
+            self.preview_indexes = frozenset()
+            background.close()
+
+        # Entries whose write failed count as failed images
+        failed_writes = {writer.target(name) for name, _ in background.errors}
+        if failed_writes:
+            for i, written in outputs.items():
+                if export is not None and not failed_writes.isdisjoint(written):
+                    export.discard(i)
+            outputs = {i: written for i, written in outputs.items() if failed_writes.isdisjoint(written)}
+
+        if self.cache is not None:
+            self.cache.evict()
+
+        resized_files = [output for i in sorted(outputs) for output in outputs[i]]
+        self.last_previews = [preview_images[i] for i in sorted(preview_images) if i in outputs]
+        successful = len(outputs)
+        failed = len(tasks) - successful
+
+        return resized_files, successful, failed
+
+    def get_source_sizes(self, image_files: List[str], zip_path: Optional[str] = None) -> List[int]:
+        """
+        Uncompressed size of every source, used to bound the data held in flight
 
-        # Create output directory if it doesn't exist
-        os.makedirs(output_dir, exist_ok=True)
+        Args:
+            image_files: List of image file paths, or member names when ``zip_path`` is given
+            zip_path: Optional ZIP file containing ``image_files``
 
-        total_files = len(image_files)
+        Returns:
+            Size in bytes per image (0 when unknown)
+        """
+        if isinstance(zip_path, zipfile.ZipFile):
+            return [zip_path.getinfo(name).file_size for name in image_files]
+        if zip_path:
+            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+                return [zip_ref.getinfo(name).file_size for name in image_files]
 
-        for i, image_path in enumerate(image_files):
+        sizes = []
+        for path in image_files:
             try:
-                # Generate output filename with sequential numbering
-                filename = os.path.basename(image_path)
-                _, ext = os.path.splitext(filename)
-
-                # Ensure JPEG extension for JPG files
-                if ext.lower() in ['.jpg', '.jpeg']:
-                    ext = '.jpg'
-                elif ext.lower() == '.png':
-                    ext = '.png'
-
-                output_filename = f"{prefix}_{i + 1}{ext}"
-                output_path = os.path.join(output_dir, output_filename)
-
-                # Resize the image
-                if self.resize_image(image_path, output_path):
-                    resized_files.append(output_path)
-                    successful += 1
-                else:
-                    failed += 1
+                sizes.append(os.path.getsize(path))
+            except OSError:
+                sizes.append(0)
+        return sizes
+
+    def estimate_costs(self, image_files: List[str], sizes: List[int], zip_path=None,
+                       indexes: Optional[List[int]] = None) -> List[float]:
+        """
+        Estimate the cost of resizing every image from its header and source size
+
+        Only headers are parsed (see ``get_image_info``), on reader threads.
 
-                # Update progress
-                if progress_callback:
-                    progress_callback(i + 1, total_files)
+        Args:
+            image_files: List of image file paths, or member names when ``zip_path`` is given
+            sizes: Source size per image (see ``get_source_sizes``)
+            zip_path: Optional ZIP file (path or open ``zipfile.ZipFile``) containing ``image_files``
+            indexes: Positions to estimate (default: all); the others get a cost of 0
+
+        Returns:
+            ``utils.scheduler.estimate_cost`` per image, in ``image_files`` order
+        """
+        indexes = range(len(image_files)) if indexes is None else indexes
+        costs = [0.0] * len(image_files)
+        with timed(self.metrics.stages, 'schedule'):
+            infos = self.scan_images([image_files[i] for i in indexes], zip_path)
+        for i, info in zip(indexes, infos):
+            costs[i] = estimate_cost(info.get('size'), sizes[i])
+        return costs
+
+    def _run_serial(self, tasks: List[Tuple[int, str, str]], sizes: List[int], handle_result,
+                    progress_callback=None, zip_path: Optional[str] = None):
+        """
+        Resize tasks one by one in the current process, passing each result to ``handle_result``
+
+        Sources are read ahead on a background thread within a quarter of the
+        memory budget, so reading overlaps decoding and resizing.
+        """
+        total_files = len(tasks)
 
+        def read(name: str):
+            with timed(self.metrics.stages, 'read'):
+                return open_zip_member(zip_path, name) if zip_path else open(name, 'rb')
+
+        sources = prefetch(read, [(i, image_path) for i, image_path, _ in tasks], sizes,
+                           max_bytes=self.memory_budget // 4, finalize=_close_zip_handle)
+
+        for done, (i, image_path, source, error) in enumerate(sources, start=1):
+            try:
+                if error is not None:
+                    raise error
+                variants = self.resize_image_variants(image_path, zip_path, source, preview=i in self.preview_indexes)
             except Exception as e:
                 print(f"Error processing {image_path}: {str(e)}")
-                failed += 1
+                variants = None
+            handle_result(i, variants, self.last_timings)
 
-                if progress_callback:
-                    progress_callback(i + 1, total_files)
+            # Update progress
+            if progress_callback:
+                progress_callback(done, total_files)
 
-        return resized_files, successful, failed
+    def _run_parallel(self, tasks: List[Tuple[int, str, str]], sizes: List[int], handle_result,
+                      progress_callback=None, zip_path: Optional[str] = None,
+                      costs: Optional[List[float]] = None):
+        """
+        Resize tasks on a process pool, dispatching them in chunks
+
+        With ``costs`` the chunks come from ``utils.scheduler.plan_chunks``:
+        expensive images alone and first, cheap ones batched, and the last
+        chunks split between idle workers; ``chunk_size`` then only caps the
+        images per chunk. Without them tasks go out in fixed-size chunks in
+        the given order.
+
+        Only a bounded number of chunks (by count and by source bytes, half of
+        the memory budget) is in flight at once; new chunks are submitted as
+        earlier ones complete. Results are passed to ``handle_result`` in the
+        parent process, and progress is reported per image in completion
+        order, so the callback still sees a monotonically increasing count.
+
+        Workers open a ZIP given by path themselves. Members of an open
+        ZipFile (an in-memory upload) are read by the parent and shipped with
+        their chunk, still within the byte budget.
+        """
+        total_files = len(tasks)
+        if costs is not None:
+            with timed(self.metrics.stages, 'schedule'):
+                chunks = ChunkQueue(plan_chunks(tasks, costs, self.workers, self.chunk_size))
+        else:
+            chunk_size = self.chunk_size or max(1, min(32, total_files // (self.workers * 4)))
+            chunks = ChunkQueue(fixed_chunks(tasks, chunk_size), split=False)
+        max_inflight = self.workers * 2
+        budget = ByteBudget(self.memory_budget // 2)
+        done = 0
+
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(chunks)), mp_context=pool_context()) as executor:
+            pending = {}
+
+            while chunks or pending:
+                # Top up in-flight work while both bounds allow it
+                while chunks and len(pending) < max_inflight:
+                    chunk = chunks.take(idle=self.workers - len(pending) - 1)
+                    chunk_bytes = sum(sizes[i] for i, _, _ in chunk)
+                    if pending and not budget.fits(chunk_bytes):
+                        chunks.put_back(chunk)
+                        break
+                    budget.acquire(chunk_bytes)
+                    if isinstance(zip_path, zipfile.ZipFile):
+                        with timed(self.metrics.stages, 'read'):
+                            payloads = [zip_path.read(name) for _, name, _ in chunk]
+                        future = executor.submit(_resize_chunk, self, chunk, None, payloads)
+                    else:
+                        future = executor.submit(_resize_chunk, self, chunk, zip_path)
+                    pending[future] = (chunk, chunk_bytes)
+
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+
+                for future in finished:
+                    chunk, chunk_bytes = pending.pop(future)
+                    budget.release(chunk_bytes)
+                    try:
+                        chunk_results, stats = future.result()
+                    except Exception as e:
+                        print(f"Error processing chunk starting at {chunk[0][1]}: {str(e)}")
+                        chunk_results, stats = [(i, None, {}) for i, _, _ in chunk], {}
+
+                    if self.cache is not None:
+                        self.cache.hits += stats.get('cache_hits', 0)
+                        self.cache.misses += stats.get('cache_misses', 0)
+
+                    for i, variants, timings in chunk_results:
+                        handle_result(i, variants, timings)
+                        done += 1
+
+                        # Update progress
+                        if progress_callback:
+                            progress_callback(done, total_files)
 
     def create_zip(self, files: List[str], zip_path: str) -> bool:
         """
@@ -197,40 +1505,478 @@ class ImageProcessor:
             print(f"Error cleaning up directory {directory}: {str(e)}")
             return False
 
-    def get_image_info(self, image_path: str) -> dict:
+    def get_image_info(self, image_path: str, zip_path=None) -> dict:
         """
-        Get basic information about an image
+        Get basic information about an image from its header
+
+        ``Image.open`` is lazy: it parses the header and stops before decoding
+        pixel data, so this is cheap even for very large images. Files whose
+        header cannot be parsed are reported with an ``error``.
 
         Args:
-            image_path: Path to the image file
+            image_path: Path to the image file, or member name when ``zip_path`` is given
+            zip_path: Optional ZIP file (path or open ``zipfile.ZipFile``) containing ``image_path``
 
         Returns:
             Dictionary with image information
         """
         try:
-            with Image.open(image_path) as img:
-                return {
-                    'filename': os.path.basename(image_path),
-                    'size': img.size,
-                    'mode': img.mode,
-                    'format': img.format,
-                    'file_size': os.path.getsize(image_path)
-                }
+            if zip_path is not None:
+                zip_ref = zip_path if isinstance(zip_path, zipfile.ZipFile) else _get_zip_handle(zip_path)
+                file_size = zip_ref.getinfo(image_path).file_size
+                with zip_ref.open(image_path) as source, Image.open(source) as img:
+                    size, mode, image_format = img.size, img.mode, img.format
+            else:
+                file_size = os.path.getsize(image_path)
+                with Image.open(image_path) as img:
+                    size, mode, image_format = img.size, img.mode, img.format
+
+            return {
+                'filename': os.path.basename(image_path),
+                'path': image_path,
+                'size': size,
+                'mode': mode,
+                'format': image_format,
+                'file_size': file_size
+            }
         except Exception as e:
+            # The default message embeds the repr of the file object, which says nothing useful
+            error = "cannot identify image file" if isinstance(e, Image.UnidentifiedImageError) else str(e)
             return {
                 'filename': os.path.basename(image_path),
-                'error': str(e)
+                'path': image_path,
+                'error': error
             }
 
+    def get_image_hash(self, image_path: str, zip_path=None, method: str = 'dhash') -> Optional[int]:
+        """
+        Perceptual hash of an image from a tiny grayscale decode
+
+        JPEGs are draft-decoded straight to grayscale at the smallest DCT
+        scale that still covers the hash grid, so hashing costs a fraction
+        of a full decode.
+
+        Args:
+            image_path: Path to the image file, or member name when ``zip_path`` is given
+            zip_path: Optional ZIP file (path or open ``zipfile.ZipFile``) containing ``image_path``
+            method: Hash method, one of ``HASH_METHODS``
+
+        Returns:
+            Hash (see ``utils.dedup.perceptual_hash``), or None if the image cannot be decoded
+        """
+        try:
+            if zip_path is not None:
+                zip_ref = zip_path if isinstance(zip_path, zipfile.ZipFile) else _get_zip_handle(zip_path)
+                source = zip_ref.open(image_path)
+            else:
+                source = open(image_path, 'rb')
+            with source, Image.open(source) as img:
+                img.draft('L', (HASH_SIZE * 4, HASH_SIZE * 4))
+                return perceptual_hash(img, method)
+        except Exception as e:
+            print(f"Error hashing {image_path}: {str(e)}")
+            return None
+
+    def scan_images(self, image_files: List[str], zip_path=None, workers: Optional[int] = None) -> List[dict]:
+        """
+        Read the header of every image in parallel, without decoding
+
+        Args:
+            image_files: List of image file paths, or member names when ``zip_path`` is given
+            zip_path: Optional ZIP file (path or open ``zipfile.ZipFile``) containing ``image_files``
+            workers: Reader threads (default: ``self.workers``); an open ZipFile is only read by
+                several threads when it is over a ``BufferReader``
+
+        Returns:
+            ``get_image_info`` results in ``image_files`` order
+        """
+        return self._map_images(self.get_image_info, image_files, zip_path, workers, "resize-scan")
+
+    def hash_images(self, image_files: List[str], zip_path=None, workers: Optional[int] = None,
+                    method: str = 'dhash') -> List[Optional[int]]:
+        """
+        Perceptual hash of every image, computed on threads
+
+        Returns:
+            ``get_image_hash`` results in ``image_files`` order
+        """
+        def image_hash(name: str, source) -> Optional[int]:
+            return self.get_image_hash(name, source, method)
+
+        return self._map_images(image_hash, image_files, zip_path, workers, "resize-hash")
+
+    def _map_images(self, func, image_files: List[str], zip_path, workers: Optional[int],
+                    thread_name_prefix: str) -> list:
+        workers = max(1, min(workers or self.workers, len(image_files)))
+        shared = isinstance(zip_path, zipfile.ZipFile)
+        if shared and not isinstance(zip_path.fp, BufferReader):
+            # A ZipFile reads through one file position, so other files are read by one thread
+            workers = 1
+
+        step = -(-len(image_files) // workers) if image_files else 1
+        slices = [image_files[j:j + step] for j in range(0, len(image_files), step)]
+
+        def map_slice(names: List[str]) -> list:
+            source = zip_path
+            if shared and len(slices) > 1:
+                # An archive of its own over the same buffer; nothing is copied
+                source = zipfile.ZipFile(zip_path.fp.reader(), 'r')
+            try:
+                return [func(name, source) for name in names]
+            finally:
+                if isinstance(zip_path, str):
+                    _close_zip_handle()
+                elif source is not zip_path:
+                    source.close()
+
+        if len(slices) <= 1:
+            return map_slice(image_files)
+
+        # Each thread handles a contiguous slice with its own ZIP handle
+        with ThreadPoolExecutor(max_workers=len(slices), thread_name_prefix=thread_name_prefix) as executor:
+            return [item for items in executor.map(map_slice, slices) for item in items]
+
 
-def process_bulk_resize(uploaded_file, target_size=(224, 224), prefix="resized") -> dict:
+# What run_bulk_resize does with near-duplicate images: list them, or list them and leave them out
+DEDUP_ACTIONS = ('report', 'skip')
+
+
+# Resolution buckets of the scan summary, by megapixels
+RESOLUTION_BUCKETS = ((0.5, '< 0.5 MP'), (2, '0.5-2 MP'), (8, '2-8 MP'), (24, '8-24 MP'), (float('inf'), '>= 24 MP'))
+
+# Work a worker process should get at least to be worth starting, in estimated seconds
+MIN_SECONDS_PER_WORKER = 1.0
+
+
+def summarize_scan(infos: List[dict], seconds_per_megapixel: Optional[float] = None, workers: int = 1) -> dict:
+    """
+    Summarize header scan results into a dry-run plan
+
+    Args:
+        infos: ``get_image_info`` results, in batch order
+        seconds_per_megapixel: Measured processing cost; without it no runtime is estimated
+        workers: Worker processes available
+
+    Returns:
+        Dictionary with counts per format, mode and resolution bucket, the
+        corrupt files, per-image ``costs`` (megapixels, batch order), the
+        recommended number of workers and the estimated runtime in seconds
+    """
+    valid = [info for info in infos if 'error' not in info]
+    costs = [info['size'][0] * info['size'][1] / 1e6 if 'error' not in info else 0.0 for info in infos]
+    formats, modes = {}, {}
+    resolutions = {label: 0 for _, label in RESOLUTION_BUCKETS}
+
+    for info, cost in zip(infos, costs):
+        if 'error' in info:
+            continue
+        formats[info['format']] = formats.get(info['format'], 0) + 1
+        modes[info['mode']] = modes.get(info['mode'], 0) + 1
+        label = next(label for limit, label in RESOLUTION_BUCKETS if cost < limit)
+        resolutions[label] += 1
+
+    megapixels = sum(costs)
+    largest = max(valid, key=lambda info: info['size'][0] * info['size'][1], default=None)
+    summary = {
+        'images': len(infos),
+        'valid': len(valid),
+        'corrupt': [{'file': info['path'], 'error': info['error']} for info in infos if 'error' in info],
+        'formats': formats,
+        'modes': modes,
+        'resolutions': resolutions,
+        'megapixels': megapixels,
+        'largest': {'file': largest['path'], 'size': largest['size']} if largest else None,
+        'input_bytes': sum(info.get('file_size', 0) for info in valid),
+        'costs': costs,
+        'seconds_per_megapixel': seconds_per_megapixel,
+        'recommended_workers': max(1, min(workers, len(valid) or 1)),
+        'estimated_seconds': None,
+    }
+
+    if seconds_per_megapixel is not None:
+        serial_seconds = megapixels * seconds_per_megapixel
+        # Fewer workers when there is too little work to amortize starting them
+        summary['recommended_workers'] = max(1, min(summary['recommended_workers'],
+                                                     math.ceil(serial_seconds / MIN_SECONDS_PER_WORKER)))
+        largest_seconds = max(costs, default=0.0) * seconds_per_megapixel
+        summary['estimated_seconds'] = max(serial_seconds / summary['recommended_workers'], largest_seconds)
+
+    return summary
+
+
+def scan_archive(processor: ImageProcessor, source, calibrate: int = 3) -> dict:
+    """
+    Header-only pre-scan of a ZIP file or directory, for planning before a run
+
+    Only headers are read, in parallel and straight from ZIP members. To
+    estimate the runtime, ``calibrate`` images spread over the size range are
+    fully processed once (without the result cache) and timed.
+
+    Args:
+        processor: Configured ImageProcessor (its settings drive the calibration)
+        source: ZIP file path, directory, or a seekable file object with a ZIP (e.g. an upload)
+        calibrate: Number of images to time; 0 skips the runtime estimate
+
+    Returns:
+        ``summarize_scan`` result plus ``files``, the image list the costs refer to, and
+        ``skipped``, the members left out by discovery with the reason
+    """
+    zip_ref = None
+    if isinstance(source, str) and os.path.isdir(source):
+        image_files = processor.list_directory_images(source)
+        zip_arg = None
+    elif isinstance(source, str):
+        image_files = processor.list_zip_images(source)
+        zip_arg = source
+    else:
+        zip_ref = zipfile.ZipFile(source)
+        image_files = processor.list_zip_images(zip_ref)
+        zip_arg = zip_ref
+    skipped = [{'path': name, 'reason': reason} for name, reason in processor.last_skipped]
+
+    try:
+        with timed(processor.metrics.stages, 'scan'):
+            infos = processor.scan_images(image_files, zip_arg)
+
+        seconds_per_megapixel = None
+        ranked = sorted((info for info in infos if 'error' not in info),
+                        key=lambda info: info['size'][0] * info['size'][1])
+        samples = [ranked[(len(ranked) - 1) * k // max(1, calibrate - 1)] for k in range(calibrate)] \
+            if ranked and calibrate > 0 else []
+        samples = list({info['path']: info for info in samples}.values())
+
+        if samples:
+            sampler = copy.copy(processor)
+            sampler.cache = None
+            start = time.perf_counter()
+            for info in samples:
+                if zip_ref is not None:
+                    sampler.resize_image_variants(info['path'], source=io.BytesIO(zip_ref.read(info['path'])))
+                else:
+                    sampler.resize_image_variants(info['path'], zip_arg)
+            elapsed = time.perf_counter() - start
+            sample_megapixels = sum(info['size'][0] * info['size'][1] / 1e6 for info in samples)
+            seconds_per_megapixel = elapsed / sample_megapixels if sample_megapixels else None
+            if isinstance(zip_arg, str):
+                _close_zip_handle()
+    finally:
+        if zip_ref is not None:
+            zip_ref.close()
+
+    summary = summarize_scan(infos, seconds_per_megapixel, processor.workers)
+    summary['files'] = image_files
+    summary['skipped'] = skipped
+    return summary
+
+
+def run_bulk_resize(processor: ImageProcessor, input_path, output_path: str, prefix: str = "resized",
+                    progress_callback=None, log_metrics: bool = False,
+                    checkpoint_dir: Optional[str] = None, scan: Optional[dict] = None,
+                    dedup: Optional[str] = None, dedup_threshold: int = DEDUP_THRESHOLD,
+                    dedup_method: str = 'dhash', export_path: Optional[str] = None, previews: int = 0) -> dict:
+    """
+    Resize every image of a ZIP file or directory into a ZIP file or directory
+
+    Archives are streamed member by member, from disk or straight from an
+    in-memory buffer, so they are never extracted or copied as a whole. The
+    output is a ZIP when ``output_path`` ends with ``.zip`` and a directory
+    otherwise.
+
+    With ``checkpoint_dir`` (ZIP output only) results are committed to part
+    archives in that directory as they are produced, and a rerun with the
+    same input and settings skips every image an interrupted run completed.
+
+    Args:
+        processor: Configured ImageProcessor
+        input_path: ZIP file or directory with source images, or a seekable file object with a ZIP
+            (e.g. a ``BufferReader`` over an upload)
+        output_path: Output ZIP file or directory
+        prefix: Prefix for output filenames
+        progress_callback: Optional callback function for progress updates
+        log_metrics: Emit the timing summary as a structured log record (logger ``bulk_resize``)
+        checkpoint_dir: Optional job directory for resumable, checkpointed output
+        scan: Optional ``scan_archive`` result for the same input; its costs order the work largest first
+        dedup: Optional duplicate handling, one of ``DEDUP_ACTIONS``: "report" lists exact and
+            near-duplicate images, "skip" also leaves them out (outputs are numbered without gaps)
+        dedup_threshold: Maximum Hamming distance between perceptual hashes of duplicates (0-64)
+        dedup_method: Perceptual hash, one of ``HASH_METHODS`` ("dhash" or "ahash")
+        export_path: Optional .npy file to also store the pixels of the first target size in, as a
+            uint8 array of shape (images, height, width, 3), with a CSV index of filenames and
+            folder labels next to it (see ``utils.export``); needs NumPy
+        previews: Number of preview thumbnails to make during the resize pass
+
+    Returns:
+        Dictionary with counts, output names, elapsed time, byte totals, the
+        number of ``resumed`` images, a ``timings`` breakdown (stage times
+        are cumulative across workers), the ``skipped`` input members with the
+        reason, with ``dedup`` a ``duplicates`` report
+        and with ``export_path`` an ``export`` summary. ``previews`` holds
+        (output name, JPEG thumbnail) pairs
+    """
+    start_time = time.perf_counter()
+    metrics = processor.metrics
+
+    output_is_zip = output_path.lower().endswith('.zip')
+    if checkpoint_dir and not output_is_zip:
+        raise ValueError("Checkpointing requires a ZIP output")
+    if dedup is not None and dedup not in DEDUP_ACTIONS:
+        raise ValueError(f"Unknown dedup action: {dedup}")
+
+    in_memory = not isinstance(input_path, str)
+    with metrics.stage('list'):
+        if in_memory:
+            # One ZipFile over the buffer, shared by the reader threads
+            zip_path = zipfile.ZipFile(input_path, 'r')
+            image_files = processor.list_zip_images(zip_path)
+            input_bytes = sum(zip_path.getinfo(name).file_size for name in image_files)
+        elif os.path.isdir(input_path):
+            zip_path = None
+            image_files = processor.list_directory_images(input_path)
+            input_bytes = sum(os.path.getsize(path) for path in image_files)
+        else:
+            zip_path = input_path
+            image_files = processor.list_zip_images(zip_path)
+            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+                input_bytes = sum(zip_ref.getinfo(name).file_size for name in image_files)
+
+    skipped = [{'path': name, 'reason': reason} for name, reason in processor.last_skipped]
+    costs = scan['costs'] if scan and scan.get('files') == image_files else None
+
+    duplicates = None
+    if dedup:
+        with metrics.stage('dedup'):
+            hashes = processor.hash_images(image_files, zip_path, method=dedup_method)
+            found = find_duplicates(hashes, dedup_threshold)
+        duplicates = duplicates_report(image_files, found, dedup, dedup_method, dedup_threshold)
+        if dedup == 'skip' and found:
+            keep = [i for i in range(len(image_files)) if i not in found]
+            image_files = [image_files[i] for i in keep]
+            costs = [costs[i] for i in keep] if costs else None
+
+    completed = {}
+    if output_is_zip:
+        output_dir = os.path.dirname(output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        if checkpoint_dir:
+            settings = {'input': 'upload' if in_memory else os.path.abspath(input_path), 'input_bytes': input_bytes,
+                        'prefix': prefix, 'dedup': [dedup, dedup_method, dedup_threshold] if dedup == 'skip' else None,
+                        'export': export_path is not None, **processor.get_settings()}
+            writer = CheckpointWriter(checkpoint_dir, settings)
+            done = writer.completed_entries()
+            for i, image_path in enumerate(image_files):
+                names = processor.get_output_names(image_path, i, prefix)
+                if all(name in done for name in names):
+                    completed[i] = names
+        else:
+            writer = ZipStreamWriter(output_path)
+    else:
+        writer = DirectoryWriter(output_path)
+
+    export = None
+    if export_path:
+        root = input_path if not in_memory and zip_path is None else None
+        export = ArrayExport(export_path, len(image_files), processor.target_size, image_files,
+                             [folder_label(path, root) for path in image_files])
+        if not export.reopened:
+            # The array is new and holds no pixels of the earlier run, so those images are resized again
+            completed = {}
+
+    try:
+        try:
+            resized_files, successful, failed = processor.resize_images_to_writer(
+                image_files, writer, prefix, progress_callback, zip_path, completed, costs, export, previews)
+        finally:
+            with metrics.stage('finalize'):
+                writer.close()
+                if export is not None:
+                    export.close()
+
+        if checkpoint_dir:
+            with metrics.stage('merge'):
+                writer.merge(output_path, resized_files)
+    finally:
+        if checkpoint_dir:
+            writer.release()
+        if in_memory:
+            zip_path.close()
+
+    if os.path.isdir(output_path):
+        output_bytes = sum(os.path.getsize(path) for path in resized_files)
+    else:
+        output_bytes = os.path.getsize(output_path)
+
+    result = {
+        'resized_files': resized_files,
+        'total_processed': len(image_files),
+        'successful': successful,
+        'failed': failed,
+        'elapsed': time.perf_counter() - start_time,
+        'input_bytes': input_bytes,
+        'output_bytes': output_bytes,
+        'resumed': len(completed),
+        'skipped': skipped,
+        'previews': processor.last_previews,
+        'cache_hits': processor.cache.hits if processor.cache else 0,
+        'cache_misses': processor.cache.misses if processor.cache else 0,
+        'timings': metrics.summary(),
+    }
+    if duplicates is not None:
+        result['duplicates'] = duplicates
+    if export is not None:
+        result['export'] = {
+            'array_path': export_path,
+            'index_path': index_path(export_path),
+            'shape': [len(image_files), processor.target_size[1], processor.target_size[0], 3],
+            'rows': len(export.rows),
+        }
+
+    if log_metrics:
+        metrics.log(input='upload' if in_memory else input_path, images=len(image_files), successful=successful,
+                    failed=failed, elapsed=result['elapsed'])
+
+    return result
+
+
+def process_bulk_resize(uploaded_file, target_size=(224, 224), prefix="resized", workers=None,
+                        fast_resize=False, use_cache=True, cache_dir="cache",
+                        cache_max_bytes=1024 * 1024 * 1024, progress_callback=None,
+                        log_metrics=False, memory_budget=256 * 1024 * 1024,
+                        background_color=(255, 255, 255), output_format=None,
+                        encoder_preset='balanced', scan=None, resize_mode='stretch', dedup=None,
+                        dedup_threshold=DEDUP_THRESHOLD, export_array=False, previews=48,
+                        resampler='pillow', metadata='strip') -> dict:
     """
     Main function to process bulk image resize
 
+    Progress is checkpointed in ``uploads/job_<key>``, where the key is derived
+    from the upload's content and the settings. If a job is interrupted,
+    submitting the same archive with the same settings resumes it.
+
     Args:
         uploaded_file: Streamlit uploaded file object
-        target_size: Target size for resized images
+        target_size: Target size for resized images, or a list of sizes (one output folder per size)
         prefix: Prefix for output filenames
+        workers: Number of worker processes (default: CPU count)
+        fast_resize: Trade a little quality for speed (JPEG draft decoding and reducing_gap)
+        use_cache: Reuse results of previously processed identical images
+        cache_dir: Directory of the persistent result cache
+        cache_max_bytes: Size budget of the result cache
+        progress_callback: Optional callback function for per-image progress updates
+        log_metrics: Emit the timing breakdown as a structured log record
+        memory_budget: Approximate bytes of image data held in flight by the pipeline
+        background_color: Colour transparent images are flattened onto (red, green, blue)
+        output_format: Output format for every image (see ``OUTPUT_EXTENSIONS``); None keeps the input format
+        encoder_preset: Encoder effort preset: "fast", "balanced" or "smallest"
+        scan: Optional ``scan_archive`` result for the upload; orders the work largest first
+        resize_mode: Aspect ratio handling: "stretch", "crop", "pad" or "entropy"
+        dedup: Optional duplicate handling: "report" lists near-duplicates, "skip" also leaves them out
+        dedup_threshold: Maximum Hamming distance between perceptual hashes of duplicates
+        export_array: Also write the resized pixels as a .npy array with a CSV index of
+            filenames and folder labels (needs NumPy)
+        previews: Number of preview thumbnails to make while resizing
+        resampler: Resampling backend (see ``utils.resamplers``), with its default filter
+        metadata: "strip" leaves EXIF and ICC metadata out of the outputs, "preserve" copies them
 
     Returns:
         Dictionary with results
@@ -238,60 +1984,107 @@ def process_bulk_resize(uploaded_file, target_size=(224, 224), prefix="resized")
     # Generate unique session ID
     session_id = str(uuid.uuid4())[:8]
 
-    # Create temporary directories
-    temp_dir = os.path.join("uploads", f"temp_{session_id}")
-    output_dir = os.path.join("outputs", f"resized_{session_id}")
+    output_zip_name = f"{prefix}_images_{session_id}.zip"
+    output_zip_path = os.path.join("outputs", output_zip_name)
+    export_path = os.path.join("outputs", f"{prefix}_pixels_{session_id}.npy")
+    job_dir = None
 
     try:
         # Create directories
-        os.makedirs(temp_dir, exist_ok=True)
-        os.makedirs(output_dir, exist_ok=True)
-
-        # Save uploaded file temporarily
-        zip_path = os.path.join(temp_dir, "uploaded.zip")
-        with open(zip_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
+        os.makedirs("uploads", exist_ok=True)
+        os.makedirs("outputs", exist_ok=True)
 
         # Initialize processor
-        processor = ImageProcessor(target_size)
+        cache = ResultCache(cache_dir, cache_max_bytes) if use_cache else None
+        processor = ImageProcessor(target_size, workers=workers, fast_resize=fast_resize, cache=cache,
+                                   memory_budget=memory_budget, background_color=background_color,
+                                   output_format=output_format, encoder_preset=encoder_preset,
+                                   resize_mode=resize_mode, resampler=resampler, metadata=metadata)
 
-        # Extract ZIP file
-        extract_dir = os.path.join(temp_dir, "extracted")
-        image_files = processor.extract_zip(zip_path, extract_dir)
+        # Read the archive straight from the upload's buffer; nothing is copied to disk.
+        # For BytesIO uploads getvalue() shares the buffer instead of copying it
+        uploaded_file.seek(0)
+        source = BufferReader(uploaded_file.getvalue() if hasattr(uploaded_file, 'getvalue')
+                              else uploaded_file.read())
 
-        if not image_files:
+        # The job directory is keyed by upload content and settings, so uploading
+        # the same archive again after an interruption resumes the earlier job
+        with processor.metrics.stage('upload_hash'):
+            key = job_key(source, {'prefix': prefix, 'dedup': [dedup, dedup_threshold] if dedup else None,
+                                   'export': export_array, **processor.get_settings()})
+        job_dir = os.path.join("uploads", f"job_{key}")
+        if is_active(job_dir):
+            job_dir = None
             return {
                 'success': False,
-                'error': 'No valid image files found in ZIP',
-                'cleanup_dirs': [temp_dir, output_dir]
-            }        # Resize images
-        resized_files, successful, failed = processor.resize_images_batch(
-            image_files, output_dir, prefix
-        )        # Create output ZIP
-        output_zip_name = f"{prefix}_images_{session_id}.zip"
-        output_zip_path = os.path.join("outputs", output_zip_name)
-
-        if processor.create_zip(resized_files, output_zip_path):
-            return {
-                'success': True,
-                'output_zip_path': output_zip_path,
-                'resized_files': resized_files[:6],  # First 6 for preview
-                'total_processed': len(image_files),
-                'successful': successful,
-                'failed': failed,
-                'cleanup_dirs': [temp_dir],
-                'session_id': session_id
+                'error': 'Arsip yang sama dengan pengaturan yang sama sedang diproses',
+                'cleanup_dirs': []
             }
-        else:
+        os.makedirs(job_dir, exist_ok=True)
+
+        # Resize images straight from the uploaded archive into the output ZIP. The array
+        # export lives in the job directory too, so a resumed job keeps its earlier rows
+        run = run_bulk_resize(processor, source, output_zip_path, prefix, progress_callback, log_metrics,
+                              checkpoint_dir=job_dir, scan=scan, dedup=dedup, dedup_threshold=dedup_threshold,
+                              export_path=os.path.join(job_dir, "pixels.npy") if export_array else None,
+                              previews=previews)
+        resized_files = run['resized_files']
+
+        if 'export' in run:
+            # Same filesystem, so moving the array out of the job directory is a rename
+            os.replace(run['export']['array_path'], export_path)
+            os.replace(run['export']['index_path'], index_path(export_path))
+
+        if not run['total_processed']:
+            os.remove(output_zip_path)
+            for path in (export_path, index_path(export_path)):
+                if os.path.exists(path):
+                    os.remove(path)
             return {
                 'success': False,
-                'error': 'Failed to create output ZIP file',
-                'cleanup_dirs': [temp_dir, output_dir]
+                'error': 'No valid image files found in ZIP',
+                'cleanup_dirs': [job_dir]
             }
 
+        return {
+            'success': True,
+            'output_zip_path': output_zip_path,
+            'resized_files': resized_files[:6],
+            # Thumbnails made during the resize pass; nothing is read back from the output
+            'preview_images': run['previews'],
+            'total_processed': run['total_processed'],
+            'successful': run['successful'],
+            'failed': run['failed'],
+            'cache_hits': run['cache_hits'],
+            'cache_misses': run['cache_misses'],
+            'input_bytes': run['input_bytes'],
+            'output_bytes': run['output_bytes'],
+            'output_format': processor.output_format,
+            'encoder_preset': processor.encoder_preset,
+            'resumed': run['resumed'],
+            'duplicates': run.get('duplicates'),
+            'skipped': run['skipped'],
+            'export': dict(run['export'], array_path=export_path, index_path=index_path(export_path))
+            if 'export' in run else None,
+            'timings': run['timings'],
+            'cleanup_dirs': [job_dir],
+            'session_id': session_id
+        }
+
     except Exception as e:
+        for path in (output_zip_path, export_path, index_path(export_path)):
+            if os.path.exists(path):
+                os.remove(path)
+        # Keep the job directory when it holds completed work, so a retry resumes it
         return {
             'success': False,
             'error': str(e),
-            'cleanup_dirs': [temp_dir, output_dir]
+            'cleanup_dirs': [job_dir] if job_dir and not is_resumable(job_dir) else []
         }
+
+
+if __name__ == "__main__":
+    # Delegate to the CLI module so pool workers unpickle classes from
+    # utils.image_processing rather than from __main__
+    from utils.cli import main
+    sys.exit(main())
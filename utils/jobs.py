@@ -0,0 +1,327 @@
+"""
+Background Jobs for Bulk Image Resizer
+Runs resize jobs on a bounded thread pool so they outlive Streamlit script reruns,
+admitting them within server-wide concurrency, memory and disk budgets
+"""
+
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class Job:
+    def __init__(self, owner: str, description: str = "", memory: int = 0, disk: int = 0):
+        """
+        Initialize Job
+
+        Args:
+            owner: Identifier of the session that submitted the job
+            description: Short human readable label
+            memory: Estimated peak memory of the job in bytes
+            disk: Estimated disk space the job writes in bytes
+        """
+        self.job_id = str(uuid.uuid4())[:8]
+        self.owner = owner
+        self.description = description
+        self.memory = memory
+        self.disk = disk
+        self.status = 'queued'
+        self.current = 0
+        self.total = 0
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def progress(self) -> float:
+        """Fraction of images processed, between 0.0 and 1.0"""
+        return self.current / self.total if self.total else 0.0
+
+    @property
+    def is_active(self) -> bool:
+        """True while the job is queued or running"""
+        return self.status in ('queued', 'running')
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds spent running so far (or in total once finished)"""
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    def update_progress(self, current: int, total: int):
+        """``progress_callback`` compatible hook for per-image progress"""
+        self.current = current
+        self.total = total
+
+
+class JobManager:
+    def __init__(self, max_concurrent_jobs: int = 2, total_workers: Optional[int] = None,
+                 retention_seconds: int = 3600, memory_budget: Optional[int] = None,
+                 disk_budget: Optional[int] = None, disk_path: str = "."):
+        """
+        Initialize JobManager
+
+        The admission controller of the server. A job starts once a slot is
+        free (at most ``max_concurrent_jobs`` run at a time) and its estimated
+        memory and disk use fit next to the jobs already running; until then
+        it waits in the queue. The queue is strictly first come, first
+        served: a large job at the front is not overtaken by smaller ones, so
+        it cannot starve, and each session may only have one active job, so
+        one user cannot crowd out the others. A job larger than a whole budget
+        still runs, alone. The CPU workers are split between the running
+        jobs.
+
+        Disk is checked twice: against ``disk_budget`` for the writes of
+        running jobs, and against the space actually free on ``disk_path``
+        (outputs of finished jobs stay there until they are swept).
+
+        Args:
+            max_concurrent_jobs: Number of jobs processed in parallel
+            total_workers: Worker processes shared by all running jobs (default: CPU count)
+            retention_seconds: How long finished jobs stay in the registry
+            memory_budget: Bytes of estimated memory shared by running jobs (default: unlimited)
+            disk_budget: Bytes of estimated disk writes shared by running jobs (default: unlimited)
+            disk_path: Directory whose file system receives the outputs
+        """
+        self.max_concurrent_jobs = max(1, max_concurrent_jobs)
+        self.total_workers = max(1, total_workers or os.cpu_count() or 1)
+        self.retention_seconds = retention_seconds
+        self.memory_budget = memory_budget
+        self.disk_budget = disk_budget
+        self.disk_path = disk_path
+        self.memory_used = 0
+        self.disk_used = 0
+        self._jobs: Dict[str, Job] = {}
+        self._queue: "deque[Tuple[Job, Callable, tuple, dict]]" = deque()
+        self._running = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent_jobs,
+                                            thread_name_prefix="resize-job")
+
+    @property
+    def workers_per_job(self) -> int:
+        """Worker processes each running job may use"""
+        return max(1, self.total_workers // self.max_concurrent_jobs)
+
+    def submit(self, owner: str, func: Callable, *args, description: str = "", memory: int = 0,
+               disk: int = 0, **kwargs) -> Job:
+        """
+        Queue ``func(*args, progress_callback=..., **kwargs)`` as a background job
+
+        Args:
+            owner: Identifier of the submitting session
+            func: Function to run; it must accept a ``progress_callback`` keyword
+            description: Short human readable label
+            memory: Estimated peak memory of the job in bytes
+            disk: Estimated disk space the job writes in bytes
+
+        Returns:
+            The queued Job
+
+        Raises:
+            RuntimeError: If the owner already has an active job, or the disk does not have
+                room for the job even with nothing else running
+        """
+        self.prune()
+
+        with self._lock:
+            if any(job.owner == owner and job.is_active for job in self._jobs.values()):
+                raise RuntimeError("Masih ada proses yang berjalan untuk sesi ini")
+            if disk > self._free_disk():
+                raise RuntimeError("Ruang disk server tidak cukup untuk proses ini, coba lagi nanti")
+
+            job = Job(owner, description, memory, disk)
+            self._jobs[job.job_id] = job
+            self._queue.append((job, func, args, kwargs))
+
+        self._admit()
+        return job
+
+    def _free_disk(self) -> float:
+        try:
+            return shutil.disk_usage(self.disk_path).free
+        except OSError:
+            return float('inf')
+
+    def _fits(self, job: Job) -> bool:
+        # Called with the lock held
+        if not self._running:
+            return True
+        if self.memory_budget is not None and self.memory_used + job.memory > self.memory_budget:
+            return False
+        if self.disk_budget is not None and self.disk_used + job.disk > self.disk_budget:
+            return False
+        # Writes of running jobs are reserved but not all on disk yet
+        return self.disk_used + job.disk <= self._free_disk()
+
+    def _admit(self):
+        """Start queued jobs, in order, while slots and budgets allow"""
+        with self._lock:
+            while self._queue and self._running < self.max_concurrent_jobs and self._fits(self._queue[0][0]):
+                job, func, args, kwargs = self._queue.popleft()
+                self._running += 1
+                self.memory_used += job.memory
+                self.disk_used += job.disk
+                self._executor.submit(self._run, job, func, args, kwargs)
+
+    def _run(self, job: Job, func: Callable, args: tuple, kwargs: dict):
+        job.status = 'running'
+        job.started_at = time.time()
+        try:
+            job.result = func(*args, progress_callback=job.update_progress, **kwargs)
+            job.status = 'done'
+        except Exception as e:
+            job.error = str(e)
+            job.status = 'failed'
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._running -= 1
+                self.memory_used -= job.memory
+                self.disk_used -= job.disk
+            self._admit()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Look up a job by ID"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs_for(self, owner: str) -> List[Job]:
+        """Return all jobs of one session, oldest first"""
+        with self._lock:
+            return sorted((job for job in self._jobs.values() if job.owner == owner),
+                          key=lambda job: job.created_at)
+
+    def queue_position(self, job: Job) -> int:
+        """
+        Number of queued jobs ahead of ``job`` (0 once it is admitted)
+        """
+        with self._lock:
+            for position, (queued, _, _, _) in enumerate(self._queue):
+                if queued is job:
+                    return position
+        return 0
+
+    def load(self) -> dict:
+        """
+        Current use of the server-wide budgets
+
+        Returns:
+            Dictionary with the ``running`` and ``queued`` job counts and the
+            estimated ``memory_used``/``disk_used`` of running jobs next to
+            their budgets (None when unlimited)
+        """
+        with self._lock:
+            return {
+                'running': self._running,
+                'queued': len(self._queue),
+                'max_concurrent_jobs': self.max_concurrent_jobs,
+                'memory_used': self.memory_used,
+                'memory_budget': self.memory_budget,
+                'disk_used': self.disk_used,
+                'disk_budget': self.disk_budget,
+            }
+
+    def prune(self) -> int:
+        """
+        Drop finished jobs older than the retention period
+
+        Returns:
+            Number of jobs removed
+        """
+        cutoff = time.time() - self.retention_seconds
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if not job.is_active and job.finished_at and job.finished_at < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+        return len(expired)
+
+
+class Sweeper:
+    def __init__(self, func: Callable[[], object], interval_seconds: float = 300,
+                 name: str = "resize-sweeper"):
+        """
+        Initialize Sweeper
+
+        Calls ``func`` on a daemon thread right away and then every
+        ``interval_seconds``, so periodic housekeeping (removing expired
+        files and jobs) runs once per server instead of on every script
+        rerun. Errors are printed and do not stop the thread.
+
+        Args:
+            func: Housekeeping function; its return value is kept in ``last_result``
+            interval_seconds: Pause between runs
+            name: Thread name
+        """
+        self.func = func
+        self.interval_seconds = interval_seconds
+        self.last_run: Optional[float] = None
+        self.last_result = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name=name, daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while True:
+            try:
+                self.last_result = self.func()
+            except Exception as e:
+                print(f"Error during sweep: {str(e)}")
+            self.last_run = time.time()
+            if self._stop.wait(self.interval_seconds):
+                return
+
+    def stop(self):
+        """Stop after the current run"""
+        self._stop.set()
+
+
+class PreviewStore:
+    def __init__(self, max_jobs: int = 16, max_bytes: int = 32 * 1024 * 1024):
+        """
+        Initialize PreviewStore
+
+        A small in-memory LRU of preview thumbnails keyed by job ID. Previews
+        are served from here on every rerun, so they never depend on output
+        files still being on disk; the least recently viewed jobs are evicted
+        once either limit is exceeded.
+
+        Args:
+            max_jobs: Number of jobs whose previews are kept
+            max_bytes: Total thumbnail bytes kept
+        """
+        self.max_jobs = max_jobs
+        self.max_bytes = max_bytes
+        self.bytes_used = 0
+        self._entries: "OrderedDict[str, List[Tuple[str, bytes]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, job_id: str, previews: List[Tuple[str, bytes]]):
+        """Store the (name, JPEG bytes) previews of a job, evicting older jobs as needed"""
+        size = sum(len(data) for _, data in previews)
+        with self._lock:
+            if job_id in self._entries:
+                self.bytes_used -= sum(len(data) for _, data in self._entries.pop(job_id))
+            self._entries[job_id] = previews
+            self.bytes_used += size
+            while len(self._entries) > 1 and (len(self._entries) > self.max_jobs
+                                               or self.bytes_used > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes_used -= sum(len(data) for _, data in evicted)
+
+    def get(self, job_id: str) -> Optional[List[Tuple[str, bytes]]]:
+        """Return the previews of a job and mark it as recently used, or None if evicted"""
+        with self._lock:
+            previews = self._entries.get(job_id)
+            if previews is not None:
+                self._entries.move_to_end(job_id)
+            return previews
@@ -0,0 +1,122 @@
+"""
+Pipeline Metrics for Bulk Image Resizer
+Collects per-stage timings and per-image latency statistics
+"""
+
+import json
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+
+logger = logging.getLogger("bulk_resize")
+
+
+@contextmanager
+def timed(timings: Dict[str, float], stage: str):
+    """Add the wall time of the enclosed block to ``timings[stage]``"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
+
+
+class StageClock:
+    def __init__(self):
+        """
+        Initialize StageClock
+
+        Attributes time to consecutive stages of one image without nesting:
+        each ``lap`` charges the time since the previous lap to a stage.
+        """
+        self.timings: Dict[str, float] = {}
+        self._last = time.perf_counter()
+
+    def lap(self, stage: str):
+        """Charge the time since the previous lap to ``stage``"""
+        now = time.perf_counter()
+        self.timings[stage] = self.timings.get(stage, 0.0) + now - self._last
+        self._last = now
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list
+
+    Args:
+        sorted_values: Values in ascending order
+        fraction: Percentile as a fraction, e.g. 0.95
+
+    Returns:
+        The percentile value, or 0.0 for an empty list
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+class PipelineMetrics:
+    def __init__(self, slowest_count: int = 5):
+        """
+        Initialize PipelineMetrics
+
+        Args:
+            slowest_count: Number of slowest files kept in the summary
+        """
+        self.slowest_count = slowest_count
+        self.stages: Dict[str, float] = {}
+        # Images that went through each stage; cache hits and resumed images never reach "encode"
+        self.stage_images: Dict[str, int] = {}
+        self.latencies: List[Tuple[float, str]] = []
+
+    def add_stage(self, stage: str, seconds: float):
+        """Add time to one stage"""
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def stage(self, stage: str):
+        """Context manager timing a block into ``stage``"""
+        return timed(self.stages, stage)
+
+    def record_image(self, name: str, timings: Dict[str, float]):
+        """
+        Record the stage timings of one image and its total latency
+
+        Args:
+            name: Source file or member name
+            timings: Seconds per stage for this image
+        """
+        for stage, seconds in timings.items():
+            self.add_stage(stage, seconds)
+            self.stage_images[stage] = self.stage_images.get(stage, 0) + 1
+        self.latencies.append((sum(timings.values()), name))
+
+    def summary(self) -> dict:
+        """
+        Summarize collected metrics
+
+        Returns:
+            Dictionary with cumulative stage times, the number of images per stage, latency
+            percentiles and the slowest files
+        """
+        values = sorted(latency for latency, _ in self.latencies)
+        slowest = sorted(self.latencies, reverse=True)[:self.slowest_count]
+        return {
+            'stages': dict(sorted(self.stages.items(), key=lambda item: item[1], reverse=True)),
+            'stage_images': dict(self.stage_images),
+            'latency': {
+                'count': len(values),
+                'mean': sum(values) / len(values) if values else 0.0,
+                'p50': percentile(values, 0.50),
+                'p95': percentile(values, 0.95),
+                'max': values[-1] if values else 0.0,
+            },
+            'slowest': [{'file': name, 'seconds': latency} for latency, name in slowest],
+        }
+
+    def log(self, event: str = "bulk_resize_metrics", **fields):
+        """Emit the summary as one structured (JSON) log record"""
+        record = {'event': event, **fields, **self.summary()}
+        logger.info(json.dumps(record, default=str))
@@ -0,0 +1,173 @@
+"""
+Pipeline Stages for Bulk Image Resizer
+Bounded queues that let reading, resizing and writing overlap with backpressure
+"""
+
+import queue
+import threading
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from utils.metrics import timed
+
+
+class ByteBudget:
+    def __init__(self, limit: int):
+        """
+        Initialize ByteBudget
+
+        A counting semaphore measured in bytes. ``acquire`` blocks while the
+        budget is exhausted, except that a single item larger than the whole
+        budget is let through when nothing else is held, so it cannot deadlock.
+
+        Args:
+            limit: Maximum number of bytes held at once
+        """
+        self.limit = limit
+        self.used = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, size: int):
+        """Block until ``size`` bytes fit in the budget, then take them"""
+        with self._condition:
+            while self.used and self.used + size > self.limit:
+                self._condition.wait()
+            self.used += size
+
+    def fits(self, size: int) -> bool:
+        """Check without blocking whether ``size`` bytes would fit right now"""
+        with self._condition:
+            return not self.used or self.used + size <= self.limit
+
+    def release(self, size: int):
+        """Return ``size`` bytes to the budget"""
+        with self._condition:
+            self.used -= size
+            self._condition.notify_all()
+
+
+class BackgroundWriter:
+    def __init__(self, writer, max_pending_bytes: int = 64 * 1024 * 1024, timings: Optional[dict] = None):
+        """
+        Initialize BackgroundWriter
+
+        Wraps an output writer (see ``utils.writers``) so that writes happen on
+        a dedicated thread. ``write`` only blocks when more than
+        ``max_pending_bytes`` are waiting, which pushes back on the producers.
+
+        Args:
+            writer: Underlying writer with ``write(name, data)``, ``target(name)`` and ``close()``
+            max_pending_bytes: Bytes that may be queued before ``write`` blocks
+            timings: Optional dictionary that receives the time spent writing under ``write``
+        """
+        self.writer = writer
+        self.timings = timings if timings is not None else {}
+        self.errors: List[Tuple[str, str]] = []
+        self._budget = ByteBudget(max_pending_bytes)
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._drain, name="resize-writer", daemon=True)
+        self._thread.start()
+
+    def _drain(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            name, data = item
+            try:
+                with timed(self.timings, 'write'):
+                    self.writer.write(name, data)
+            except Exception as e:
+                print(f"Error writing {name}: {str(e)}")
+                self.errors.append((name, str(e)))
+            finally:
+                self._budget.release(len(data))
+
+    def write(self, name: str, data: bytes) -> str:
+        """
+        Queue one encoded image for writing
+
+        Returns:
+            What the underlying writer will return for ``name`` (path or entry name)
+        """
+        self._budget.acquire(len(data))
+        self._queue.put((name, data))
+        return self.writer.target(name)
+
+    def flush(self):
+        """Wait until every queued write has been performed"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def close(self):
+        """Flush pending writes; the underlying writer is left open for its owner"""
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def prefetch(read, items: List[Tuple[int, str]], sizes: List[int], max_items: int = 8,
+             max_bytes: int = 64 * 1024 * 1024,
+             finalize: Optional[Callable[[], None]] = None) -> Iterator[Tuple[int, str, object, Optional[Exception]]]:
+    """
+    Read sources on a background thread ahead of the consumer
+
+    Args:
+        read: Function turning a source name into a file object (e.g. ``open_zip_member``)
+        items: (index, source_name) pairs in processing order
+        sizes: Estimated size in bytes of each source, indexed like the batch
+        max_items: Sources that may be buffered ahead
+        max_bytes: Bytes that may be buffered ahead
+        finalize: Optional function run on the reader thread when it is done (e.g. to close handles)
+
+    Yields:
+        (index, source_name, file_object_or_None, read_error_or_None) in ``items`` order
+    """
+    budget = ByteBudget(max_bytes)
+    buffered = queue.Queue(maxsize=max_items)
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for index, name in items:
+                budget.acquire(sizes[index])
+                if stop.is_set():
+                    budget.release(sizes[index])
+                    break
+                try:
+                    buffered.put((index, name, read(name), None))
+                except Exception as e:
+                    buffered.put((index, name, None, e))
+        finally:
+            if finalize is not None:
+                finalize()
+            buffered.put(None)
+
+    thread = threading.Thread(target=produce, name="resize-reader", daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            item = buffered.get()
+            if item is None:
+                return
+            try:
+                yield item
+            finally:
+                budget.release(sizes[item[0]])
+    finally:
+        # Unblock and drain the producer if the consumer stops early
+        stop.set()
+        while thread.is_alive():
+            try:
+                item = buffered.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is not None:
+                if item[2] is not None:
+                    item[2].close()
+                budget.release(sizes[item[0]])
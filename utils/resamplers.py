@@ -0,0 +1,207 @@
+"""
+Resampling Backends for Bulk Image Resizer
+Pillow by default, Pillow-SIMD when it replaces Pillow, and OpenCV's INTER_AREA
+when opencv-python is installed; optional engines are found without importing them
+"""
+
+import importlib
+import importlib.util
+import math
+import random
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import PIL
+from PIL import Image, ImageChops, ImageFilter, ImageStat
+
+
+RESAMPLER_NAMES = ('pillow', 'pillow-simd', 'opencv')
+
+# Filters by name; not every backend has every filter
+RESAMPLE_FILTERS = ('lanczos', 'bicubic', 'bilinear', 'area')
+
+PILLOW_FILTERS = {
+    'lanczos': Image.Resampling.LANCZOS,
+    'bicubic': Image.Resampling.BICUBIC,
+    'bilinear': Image.Resampling.BILINEAR,
+    # Pillow's box filter averages the covered source pixels, like INTER_AREA
+    'area': Image.Resampling.BOX,
+}
+
+# cv2 interpolation flag per filter. Only area averaging is offered: OpenCV's
+# linear, cubic and Lanczos kernels do not widen when downscaling and alias
+OPENCV_FILTERS = {'area': 'INTER_AREA'}
+
+# Modes OpenCV can take as 8-bit arrays; anything else is resized by Pillow
+OPENCV_MODES = frozenset({'L', 'RGB', 'RGBa', 'RGBA'})
+
+# Parity check: smallest PSNR against Pillow with the same filter, in dB
+PARITY_MIN_PSNR = 40.0
+
+
+def is_pillow_simd() -> bool:
+    """True if the installed PIL is a Pillow-SIMD build (versioned like ``9.5.0.post1``)"""
+    return '.post' in PIL.__version__
+
+
+def is_opencv_installed() -> bool:
+    """Check for OpenCV and NumPy without importing them (importing cv2 takes a noticeable fraction of a second)"""
+    return importlib.util.find_spec('cv2') is not None and importlib.util.find_spec('numpy') is not None
+
+
+def available_resamplers() -> List[str]:
+    """Names of the backends usable in this environment, in ``RESAMPLER_NAMES`` order"""
+    available = {'pillow': True, 'pillow-simd': is_pillow_simd(), 'opencv': is_opencv_installed()}
+    return [name for name in RESAMPLER_NAMES if available[name]]
+
+
+class PillowResampler:
+    name = 'pillow'
+    filters = tuple(PILLOW_FILTERS)
+
+    def resize(self, img: Image.Image, size: Tuple[int, int], resample: str = 'lanczos',
+               box: Optional[tuple] = None, reducing_gap: Optional[float] = None) -> Image.Image:
+        """
+        Resize ``img`` (or its ``box`` region) to ``size``
+
+        Args:
+            img: Decoded image
+            size: Output size (width, height)
+            resample: Filter name, one of ``self.filters``
+            box: Optional source region (left, upper, right, lower), as for ``Image.resize``
+            reducing_gap: Optional ``Image.resize`` reducing gap (box-reduce first, then resample)
+
+        Returns:
+            Resized image in the mode of ``img``
+        """
+        return img.resize(size, PILLOW_FILTERS[resample], box=box, reducing_gap=reducing_gap)
+
+
+class PillowSIMDResampler(PillowResampler):
+    # Pillow-SIMD installs as ``PIL``, so the same calls take its vectorized paths
+    name = 'pillow-simd'
+
+
+class OpenCVResampler(PillowResampler):
+    name = 'opencv'
+    filters = tuple(OPENCV_FILTERS)
+
+    def __init__(self):
+        """
+        Initialize OpenCVResampler
+
+        Resizes with ``cv2.resize`` on a NumPy view of the image. The import
+        of cv2 happens on the first resize, in the process doing the work.
+        Images in modes OpenCV has no 8-bit equivalent for (16-bit, float,
+        CMYK) are resized by Pillow with its box filter. ``reducing_gap`` is
+        ignored: area averaging is already a single box pass.
+        """
+        self._cv2 = None
+
+    def __getstate__(self) -> dict:
+        # Module objects do not pickle; pool workers import cv2 themselves
+        return {'_cv2': None}
+
+    def resize(self, img: Image.Image, size: Tuple[int, int], resample: str = 'area',
+               box: Optional[tuple] = None, reducing_gap: Optional[float] = None) -> Image.Image:
+        if img.mode not in OPENCV_MODES:
+            return super().resize(img, size, resample, box, reducing_gap)
+        if self._cv2 is None:
+            self._cv2 = importlib.import_module('cv2')
+        np = importlib.import_module('numpy')
+
+        pixels = np.asarray(img)
+        if box is not None:
+            # Whole-pixel crop; the fractional part of a box is below what area averaging resolves
+            left, upper, right, lower = (int(round(value)) for value in box)
+            pixels = pixels[upper:lower, left:right]
+        resized = self._cv2.resize(pixels, size, interpolation=getattr(self._cv2, OPENCV_FILTERS[resample]))
+        return Image.frombytes(img.mode, size, np.ascontiguousarray(resized).tobytes())
+
+
+RESAMPLERS = {'pillow': PillowResampler, 'pillow-simd': PillowSIMDResampler, 'opencv': OpenCVResampler}
+
+
+def get_resampler(name: str = 'pillow'):
+    """
+    Create a resampling backend
+
+    Raises:
+        ValueError: If the backend is unknown or not installed
+    """
+    if name not in RESAMPLERS:
+        raise ValueError(f"Unknown resampler: {name}")
+    if name not in available_resamplers():
+        raise ValueError(f"Resampler {name} is not available in this environment")
+    return RESAMPLERS[name]()
+
+
+def psnr(reference: Image.Image, candidate: Image.Image) -> float:
+    """Peak signal-to-noise ratio between two images of the same size and mode, in dB"""
+    diff = ImageChops.difference(reference, candidate)
+    mse = sum(value ** 2 for value in ImageStat.Stat(diff).rms) / len(diff.getbands())
+    return float('inf') if mse == 0 else 10 * math.log10(255 ** 2 / mse)
+
+
+def parity_image(size: Tuple[int, int] = (1280, 960), seed: int = 0) -> Image.Image:
+    """Test image with smooth gradients, fine detail and hard edges, the content resamplers differ on"""
+    rng = random.Random(seed)
+    gradient = Image.linear_gradient('L').resize(size)
+    # Slightly blurred like sensor noise after demosaicing; independent per-pixel
+    # noise would mostly measure how filters alias content no photo has
+    noise = Image.effect_noise(size, 40).filter(ImageFilter.GaussianBlur(1))
+    img = Image.merge('RGB', (gradient, noise, gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+    for _ in range(8):
+        left, upper = rng.randrange(size[0] // 2), rng.randrange(size[1] // 2)
+        img.paste((rng.randrange(256), rng.randrange(256), rng.randrange(256)),
+                  (left, upper, left + size[0] // 4, upper + size[1] // 4))
+    return img
+
+
+def check_parity(name: str, resample: str, sizes: Tuple[Tuple[int, int], ...] = ((640, 480), (224, 224), (97, 61)),
+                 min_psnr: float = PARITY_MIN_PSNR) -> Dict[str, object]:
+    """
+    Compare a backend against Pillow with the same filter
+
+    Downscales ``parity_image`` to integer and fractional scale factors and
+    measures the PSNR of every result against Pillow's.
+
+    Args:
+        name: Backend name
+        resample: Filter name
+        sizes: Output sizes to compare
+        min_psnr: Smallest PSNR that counts as matching
+
+    Returns:
+        Dictionary with the lowest ``psnr`` in dB and whether it is ``ok``
+    """
+    backend = get_resampler(name)
+    reference = PillowResampler()
+    img = parity_image()
+    lowest = min(psnr(reference.resize(img, size, resample), backend.resize(img, size, resample))
+                 for size in sizes)
+    return {'resampler': name, 'filter': resample, 'psnr': lowest, 'ok': lowest >= min_psnr}
+
+
+@lru_cache(maxsize=None)
+def verify_resampler(name: str, resample: str) -> float:
+    """
+    Check once per process that a backend supports a filter and matches Pillow
+
+    Returns:
+        The lowest PSNR against Pillow in dB (infinite for Pillow itself)
+
+    Raises:
+        ValueError: If the backend is unavailable, lacks the filter or does not match
+    """
+    backend = get_resampler(name)
+    if resample not in backend.filters:
+        raise ValueError(f"Resampler {name} does not support the {resample} filter "
+                         f"(available: {', '.join(backend.filters)})")
+    if name == 'pillow':
+        return float('inf')
+    result = check_parity(name, resample)
+    if not result['ok']:
+        raise ValueError(f"Resampler {name} differs from Pillow with the {resample} filter "
+                         f"(PSNR {result['psnr']:.1f} dB)")
+    return result['psnr']
@@ -0,0 +1,129 @@
+"""
+Work Scheduling for Bulk Image Resizer
+Estimates the cost of every image and groups the batch into chunks for the
+process pool: expensive images first and alone, cheap ones batched together
+"""
+
+from collections import deque
+from typing import List, Optional, Sequence, Tuple
+
+
+# How the pool receives work: "cost" plans chunks from estimated costs,
+# "order" dispatches fixed-size chunks in input order
+SCHEDULES = ('cost', 'order')
+
+# Decoding cost of one megabyte of encoded data, in megapixels. Entropy
+# decoding scales with the encoded size, so noisy photos and large PNGs cost
+# more than their resolution alone suggests
+ENCODED_MB_COST = 0.5
+
+# Chunks planned per worker; more chunks balance better but cost more round trips
+CHUNKS_PER_WORKER = 4
+
+# Largest number of images batched into one chunk
+MAX_CHUNK_IMAGES = 32
+
+Task = Tuple[int, str, str]
+
+
+def estimate_cost(size: Optional[Tuple[int, int]], encoded_bytes: int) -> float:
+    """
+    Estimated cost of resizing one image, in megapixel equivalents
+
+    Args:
+        size: Dimensions from the image header (width, height), None if the header could not be read
+        encoded_bytes: Size of the encoded image (file size or ZIP member size)
+
+    Returns:
+        Megapixels to decode plus ``ENCODED_MB_COST`` per encoded megabyte
+    """
+    megapixels = size[0] * size[1] / 1e6 if size else 0.0
+    return megapixels + ENCODED_MB_COST * encoded_bytes / 1e6
+
+
+def plan_chunks(tasks: Sequence[Task], costs: Sequence[float], workers: int,
+                max_images: Optional[int] = None) -> List[List[Task]]:
+    """
+    Group tasks into chunks of roughly even cost, most expensive first
+
+    Every worker should get about ``CHUNKS_PER_WORKER`` chunks' worth of the
+    total cost. Tasks at least that expensive get a chunk of their own and are
+    dispatched first, so the largest images never start last and stretch the
+    tail of the batch. Cheaper tasks are packed, largest first, into chunks up
+    to that cost, which keeps the per-chunk overhead of many tiny images low
+    and leaves the cheapest chunks for the end, where they fill the gaps.
+
+    Args:
+        tasks: (index, input_path, output_name) tasks
+        costs: Estimated cost per image, indexed by the task index
+        workers: Worker processes the chunks are spread over
+        max_images: Most tasks per chunk (default: ``MAX_CHUNK_IMAGES``)
+
+    Returns:
+        Chunks in dispatch order
+    """
+    max_images = max_images or MAX_CHUNK_IMAGES
+    ordered = sorted(tasks, key=lambda task: (-costs[task[0]], task[0]))
+    target = sum(costs[task[0]] for task in ordered) / max(1, workers * CHUNKS_PER_WORKER)
+
+    chunks = []
+    chunk, chunk_cost = [], 0.0
+    for task in ordered:
+        cost = costs[task[0]]
+        if chunk and (chunk_cost + cost > target or len(chunk) >= max_images):
+            chunks.append(chunk)
+            chunk, chunk_cost = [], 0.0
+        chunk.append(task)
+        chunk_cost += cost
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def fixed_chunks(tasks: Sequence[Task], chunk_size: int) -> List[List[Task]]:
+    """Split tasks into chunks of ``chunk_size`` in input order"""
+    return [list(tasks[j:j + chunk_size]) for j in range(0, len(tasks), chunk_size)]
+
+
+class ChunkQueue:
+    def __init__(self, chunks: List[List[Task]], split: bool = True):
+        """
+        Initialize ChunkQueue
+
+        The chunks waiting for the pool. Workers pull from one shared queue,
+        so whichever worker frees up first takes the next chunk. When fewer
+        chunks are left than workers sitting idle, ``take`` splits the next
+        chunk in half instead of handing all of it to one worker; the other
+        half stays at the front for the next idle worker. This is what work
+        stealing achieves with per-worker queues: no worker idles at the end
+        of the batch while another still has several images queued.
+
+        Args:
+            chunks: Chunks in dispatch order
+            split: Split chunks at the end of the batch (see above)
+        """
+        self._chunks = deque(chunks)
+        self.split = split
+        self.splits = 0
+
+    def __len__(self) -> int:
+        return len(self._chunks)
+
+    def take(self, idle: int) -> List[Task]:
+        """
+        Remove the next chunk
+
+        Args:
+            idle: Workers that would have nothing to do after this chunk is handed out
+        """
+        chunk = self._chunks.popleft()
+        if self.split and len(chunk) > 1 and len(self._chunks) < idle:
+            half = len(chunk) // 2
+            self._chunks.appendleft(chunk[half:])
+            chunk = chunk[:half]
+            self.splits += 1
+        return chunk
+
+    def put_back(self, chunk: List[Task]):
+        """Return a chunk taken but not dispatched to the front of the queue"""
+        self._chunks.appendleft(chunk)
@@ -0,0 +1,111 @@
+"""
+Output Writers for Bulk Image Resizer
+Write encoded images to a directory or stream them into a ZIP archive
+"""
+
+import os
+import zipfile
+from typing import Optional
+
+
+# Formats whose payload is already entropy-coded; DEFLATE gains almost nothing on them
+COMPRESSED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.avif'}
+
+
+class DirectoryWriter:
+    def __init__(self, output_dir: str):
+        """
+        Initialize DirectoryWriter
+
+        Args:
+            output_dir: Directory to save encoded images to
+        """
+        self.output_dir = output_dir
+        os.makedirs(output_dir, exist_ok=True)
+
+    def target(self, name: str) -> str:
+        """Return the path ``write`` produces for ``name``"""
+        return os.path.join(self.output_dir, name)
+
+    def write(self, name: str, data: bytes) -> str:
+        """
+        Write one encoded image
+
+        Args:
+            name: Output filename, relative to the output directory
+            data: Encoded image bytes
+
+        Returns:
+            Path of the written file
+        """
+        output_path = self.target(name)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        with open(output_path, 'wb') as f:
+            f.write(data)
+        return output_path
+
+    def close(self):
+        """Nothing to finalize for plain files"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ZipStreamWriter:
+    def __init__(self, zip_path: str, store_compressed: bool = True, compresslevel: Optional[int] = None):
+        """
+        Initialize ZipStreamWriter
+
+        Entries are appended as soon as they are written, so no intermediate
+        files are needed and the archive is complete once ``close`` returns.
+
+        Args:
+            zip_path: Path for the output ZIP file
+            store_compressed: Store already-compressed formats (JPEG/PNG/WebP/AVIF) without DEFLATE
+            compresslevel: DEFLATE level for entries that are compressed
+        """
+        self.zip_path = zip_path
+        self.store_compressed = store_compressed
+        self.compresslevel = compresslevel
+        self.bytes_written = 0
+        self._zip = zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED)
+
+    def compression_for(self, name: str) -> int:
+        """Pick the ZIP compression method for an entry name"""
+        _, ext = os.path.splitext(name)
+        if self.store_compressed and ext.lower() in COMPRESSED_EXTENSIONS:
+            return zipfile.ZIP_STORED
+        return zipfile.ZIP_DEFLATED
+
+    def target(self, name: str) -> str:
+        """Return the entry name ``write`` produces for ``name``"""
+        return name
+
+    def write(self, name: str, data: bytes) -> str:
+        """
+        Append one encoded image to the archive
+
+        Args:
+            name: Name of the entry inside the archive
+            data: Encoded image bytes
+
+        Returns:
+            Name of the written entry
+        """
+        self._zip.writestr(name, data, compress_type=self.compression_for(name),
+                           compresslevel=self.compresslevel)
+        self.bytes_written += len(data)
+        return name
+
+    def close(self):
+        """Write the central directory and close the archive"""
+        self._zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()